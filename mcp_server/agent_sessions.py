@@ -0,0 +1,72 @@
+"""
+Agent 会话管理 - 按 chat 维护独立的对话记忆窗口，LRU 淘汰 + 空闲超时
+"""
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Optional
+
+
+class AgentSession:
+    """单个 chat 的会话：独立的 Agent 执行器与记忆"""
+
+    def __init__(self, session_id: str, agent: Any, memory: Any):
+        self.session_id = session_id
+        self.agent = agent
+        self.memory = memory
+        self.last_used = time.monotonic()
+
+
+class SessionManager:
+    """会话管理器
+
+    - 会话按最近使用排序，超过 max_sessions 时淘汰最久未用的会话
+    - 空闲超过 idle_timeout 秒的会话在下次访问时清理
+    - 内存占用随活跃用户数增长，而非随总消息量增长
+    """
+
+    def __init__(self, factory: Callable[[str], AgentSession], max_sessions: Optional[int] = None,
+                 idle_timeout: Optional[float] = None):
+        self.factory = factory
+        self.max_sessions = max_sessions or int(os.getenv("AGENT_MAX_SESSIONS", "200"))
+        self.idle_timeout = idle_timeout if idle_timeout is not None \
+            else float(os.getenv("AGENT_SESSION_IDLE_MIN", "30")) * 60
+        self._sessions: "OrderedDict[str, AgentSession]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, session_id: str) -> AgentSession:
+        """获取（或创建）会话，并标记为最近使用"""
+        now = time.monotonic()
+        with self._lock:
+            self._evict_idle(now)
+            session = self._sessions.get(session_id)
+            if session is None:
+                session = self.factory(session_id)
+                self._sessions[session_id] = session
+                while len(self._sessions) > self.max_sessions:
+                    evicted_id, _ = self._sessions.popitem(last=False)
+                    print(f"[会话] 会话数超过上限 {self.max_sessions}，淘汰 {evicted_id}")
+            else:
+                self._sessions.move_to_end(session_id)
+            session.last_used = now
+            return session
+
+    def clear(self, session_id: Optional[str] = None):
+        """清除指定会话；不指定时清除全部会话"""
+        with self._lock:
+            if session_id is None:
+                self._sessions.clear()
+            else:
+                self._sessions.pop(session_id, None)
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+    def _evict_idle(self, now: float):
+        # 按最近使用排序，最久未用的在最前面
+        while self._sessions:
+            session_id, session = next(iter(self._sessions.items()))
+            if now - session.last_used <= self.idle_timeout:
+                break
+            del self._sessions[session_id]
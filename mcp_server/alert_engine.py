@@ -0,0 +1,152 @@
+"""
+提醒规则引擎 - 将全部用户的有效提醒装入列式数组，一次向量化比较得出触发结果；
+价格提醒另有按股票有序的阈值索引，二分查找得到被突破的提醒
+"""
+from bisect import bisect_left, bisect_right
+from typing import Dict, List, Set, Tuple
+
+import numpy as np
+
+ALERT_TYPES = ("price_above", "price_below", "rsi_above", "rsi_below")
+_TYPE_CODES = {alert_type: code for code, alert_type in enumerate(ALERT_TYPES)}
+_PRICE_ABOVE, _PRICE_BELOW, _RSI_ABOVE, _RSI_BELOW = range(len(ALERT_TYPES))
+PRICE_ALERT_TYPES = ("price_above", "price_below")
+RSI_ALERT_TYPES = ("rsi_above", "rsi_below")
+
+
+class AlertRuleSet:
+    """列式提醒规则集
+
+    entries 为 (user_id, alert) 列表，展开为等长数组：
+    - symbol_ids: 股票在 symbols 中的下标
+    - type_codes: 提醒类型编码（未知类型为 -1，永不触发）
+    - thresholds: 阈值
+    """
+
+    def __init__(self, entries: List[Tuple[str, Dict]]):
+        self.entries = entries
+        self.symbols: List[str] = sorted({alert["symbol"] for _, alert in entries})
+        index = {symbol: i for i, symbol in enumerate(self.symbols)}
+        self.symbol_ids = np.array([index[alert["symbol"]] for _, alert in entries], dtype=np.int32)
+        self.type_codes = np.array([_TYPE_CODES.get(alert["type"], -1) for _, alert in entries], dtype=np.int8)
+        self.thresholds = np.array([float(alert["threshold"]) for _, alert in entries], dtype=float)
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def rsi_symbols(self) -> Set[str]:
+        """有 RSI 提醒的股票（只有这些股票需要同步指标状态）"""
+        is_rsi = (self.type_codes == _RSI_ABOVE) | (self.type_codes == _RSI_BELOW)
+        return {self.symbols[i] for i in np.unique(self.symbol_ids[is_rsi])}
+
+    def evaluate(self, prices: Dict[str, float], rsis: Dict[str, float]) -> Tuple[np.ndarray, np.ndarray]:
+        """按最新价格/RSI 评估全部规则（缺少行情的股票不触发）
+
+        Returns:
+            (触发规则的下标数组, 每条规则对应的当前值数组)
+        """
+        if not self.entries:
+            return np.empty(0, dtype=np.intp), np.empty(0)
+        price_vec = np.array([prices.get(symbol, np.nan) for symbol in self.symbols], dtype=float)
+        rsi_vec = np.array([rsis.get(symbol, np.nan) for symbol in self.symbols], dtype=float)
+
+        is_price = (self.type_codes == _PRICE_ABOVE) | (self.type_codes == _PRICE_BELOW)
+        values = np.where(is_price, price_vec[self.symbol_ids], rsi_vec[self.symbol_ids])
+        above = (self.type_codes == _PRICE_ABOVE) | (self.type_codes == _RSI_ABOVE)
+        below = (self.type_codes == _PRICE_BELOW) | (self.type_codes == _RSI_BELOW)
+        # NaN 参与比较恒为 False
+        with np.errstate(invalid="ignore"):
+            hit = (above & (values > self.thresholds)) | (below & (values < self.thresholds))
+        return np.flatnonzero(hit), values
+
+
+class ThresholdIndex:
+    """有序阈值索引（默认索引 price_above / price_below 提醒）
+
+    每个 (股票, 类型) 维护按阈值升序的两个并行列表：阈值、(user_id, alert)
+    - above：当前值 > 阈值即触发，被突破的是前缀 [0, bisect_left(value))
+    - below：当前值 < 阈值即触发，被突破的是后缀 [bisect_right(value), n)
+    查询 O(log n + k)；增删为二分定位后的列表插入/删除，无需重新排序
+    """
+
+    def __init__(self, alert_types: Tuple[str, str] = PRICE_ALERT_TYPES):
+        self.above_type, self.below_type = alert_types
+        self._books: Dict[Tuple[str, str], Tuple[List[float], List[Tuple[str, Dict]]]] = {}
+
+    def add(self, user_id: str, alert: Dict) -> bool:
+        """加入索引（其他类型的提醒忽略）"""
+        if alert["type"] not in (self.above_type, self.below_type):
+            return False
+        thresholds, entries = self._books.setdefault((alert["symbol"], alert["type"]), ([], []))
+        threshold = float(alert["threshold"])
+        i = bisect_right(thresholds, threshold)
+        thresholds.insert(i, threshold)
+        entries.insert(i, (user_id, alert))
+        return True
+
+    def remove(self, user_id: str, alert: Dict) -> bool:
+        """从索引中移除（按阈值二分定位后比对 id）"""
+        key = (alert["symbol"], alert["type"])
+        book = self._books.get(key)
+        if book is None:
+            return False
+        thresholds, entries = book
+        threshold = float(alert["threshold"])
+        for i in range(bisect_left(thresholds, threshold), bisect_right(thresholds, threshold)):
+            if entries[i][0] == user_id and entries[i][1]["id"] == alert["id"]:
+                del thresholds[i]
+                del entries[i]
+                if not thresholds:
+                    del self._books[key]
+                return True
+        return False
+
+    def remove_user(self, user_id: str):
+        """移除某个用户的全部提醒"""
+        for key, (thresholds, entries) in list(self._books.items()):
+            kept = [i for i, (owner, _) in enumerate(entries) if owner != user_id]
+            if len(kept) == len(entries):
+                continue
+            if not kept:
+                del self._books[key]
+            else:
+                self._books[key] = ([thresholds[i] for i in kept], [entries[i] for i in kept])
+
+    def crossed(self, symbol: str, value: float) -> List[Tuple[str, Dict]]:
+        """当前值 value 下该股票被突破/跌破的提醒"""
+        result: List[Tuple[str, Dict]] = []
+        above = self._books.get((symbol, self.above_type))
+        if above:
+            result.extend(above[1][:bisect_left(above[0], value)])
+        below = self._books.get((symbol, self.below_type))
+        if below:
+            result.extend(below[1][bisect_right(below[0], value):])
+        return result
+
+    def symbols(self) -> Set[str]:
+        return {symbol for symbol, _ in self._books}
+
+    def alert_keys(self) -> Dict[str, Set[Tuple[str, str]]]:
+        """每只股票当前索引中的提醒 {symbol: {(user_id, alert_id), ...}}"""
+        keys: Dict[str, Set[Tuple[str, str]]] = {}
+        for (symbol, _), (_, entries) in self._books.items():
+            keys.setdefault(symbol, set()).update((user_id, alert["id"]) for user_id, alert in entries)
+        return keys
+
+    def __len__(self) -> int:
+        return sum(len(thresholds) for thresholds, _ in self._books.values())
+
+
+def trigger_message(alert: Dict, value: float) -> str:
+    """生成触发通知文案"""
+    symbol, threshold = alert["symbol"], alert["threshold"]
+    alert_type = alert["type"]
+    if alert_type == "price_above":
+        return f"{symbol} 价格 ${value:.2f} 已突破 ${threshold:.2f}"
+    if alert_type == "price_below":
+        return f"{symbol} 价格 ${value:.2f} 已跌破 ${threshold:.2f}"
+    if alert_type == "rsi_above":
+        return f"{symbol} RSI {value:.1f} 已超过 {threshold}"
+    if alert_type == "rsi_below":
+        return f"{symbol} RSI {value:.1f} 已低于 {threshold}"
+    return f"{symbol} {alert_type} {threshold} 已触发"
@@ -1,36 +1,27 @@
 """
 智能提醒管理模块
 """
-import json
+import math
+import threading
 from datetime import datetime
-from typing import Dict, List
-from pathlib import Path
-import yfinance as yf
+from typing import Dict, List, Optional, Set, Tuple
+from .alert_engine import PRICE_ALERT_TYPES, RSI_ALERT_TYPES, AlertRuleSet, ThresholdIndex, trigger_message
+from .alert_store import AlertStore
+from .quote_snapshot import QuoteSnapshot
+from .tools.data_providers.technical_data_provider import TechnicalDataProvider
 
 class AlertManager:
     """提醒管理器"""
     
-    def __init__(self, data_dir: str = "data/alerts"):
-        self.data_dir = Path(data_dir)
-        self.data_dir.mkdir(parents=True, exist_ok=True)
-    
-    def _get_user_file(self, user_id: str) -> Path:
-        """获取用户提醒文件路径"""
-        return self.data_dir / f"{user_id}.json"
-    
-    def _load_alerts(self, user_id: str) -> List[Dict]:
-        """加载用户提醒"""
-        file_path = self._get_user_file(user_id)
-        if file_path.exists():
-            with open(file_path, 'r', encoding='utf-8') as f:
-                return json.load(f)
-        return []
-    
-    def _save_alerts(self, user_id: str, alerts: List[Dict]):
-        """保存用户提醒"""
-        file_path = self._get_user_file(user_id)
-        with open(file_path, 'w', encoding='utf-8') as f:
-            json.dump(alerts, f, ensure_ascii=False, indent=2)
+    def __init__(self, db_path: str = "data/alerts.db", legacy_dir: Optional[str] = "data/alerts"):
+        # 旧版 data/alerts/{user_id}.json 首次启动时导入 SQLite
+        self.store = AlertStore(db_path, legacy_dir=legacy_dir)
+        self.tech_provider = TechnicalDataProvider()
+        # 价格/RSI 提醒的有序阈值索引：本进程的增删直接更新，其他进程写入后（revision 跳变）整体重建
+        self._price_index = ThresholdIndex(PRICE_ALERT_TYPES)
+        self._rsi_index = ThresholdIndex(RSI_ALERT_TYPES)
+        self._index_revision: Optional[int] = None
+        self._index_lock = threading.Lock()
     
     def add_alert(self, user_id: str, symbol: str, alert_type: str, 
                   threshold: float, message: str = None) -> Dict:
@@ -43,8 +34,6 @@ class AlertManager:
             threshold: 阈值
             message: 自定义消息
         """
-        alerts = self._load_alerts(user_id)
-        
         alert = {
             "id": f"{symbol}_{alert_type}_{threshold}_{datetime.now().timestamp()}",
             "symbol": symbol.upper(),
@@ -55,8 +44,8 @@ class AlertManager:
             "triggered": False
         }
         
-        alerts.append(alert)
-        self._save_alerts(user_id, alerts)
+        revision = self.store.add(user_id, alert)
+        self._apply_to_index(revision, user_id, added=[alert])
         
         return {
             "success": True,
@@ -66,109 +55,172 @@ class AlertManager:
     
     def remove_alert(self, user_id: str, alert_id: str = None, symbol: str = None) -> Dict:
         """移除提醒"""
-        alerts = self._load_alerts(user_id)
-        
         if alert_id:
-            alerts = [a for a in alerts if a["id"] != alert_id]
+            removed, revision = self.store.remove(user_id, alert_id=alert_id)
             message = f"已移除提醒 {alert_id}"
         elif symbol:
             symbol = symbol.upper()
-            original_count = len(alerts)
-            alerts = [a for a in alerts if a["symbol"] != symbol]
-            removed_count = original_count - len(alerts)
-            message = f"已移除 {symbol} 的 {removed_count} 个提醒"
+            removed, revision = self.store.remove(user_id, symbol=symbol)
+            message = f"已移除 {symbol} 的 {len(removed)} 个提醒"
         else:
             return {"success": False, "message": "需要提供 alert_id 或 symbol"}
         
-        self._save_alerts(user_id, alerts)
+        self._apply_to_index(revision, user_id, removed=[a for a in removed if not a.get("triggered", False)])
         return {"success": True, "message": message}
     
     def get_alerts(self, user_id: str, active_only: bool = True) -> List[Dict]:
         """获取用户提醒"""
-        alerts = self._load_alerts(user_id)
-        if active_only:
-            alerts = [a for a in alerts if not a.get("triggered", False)]
-        return alerts
+        return self.store.for_user(user_id, active_only=active_only)
+    
+    def get_symbol_alerts(self, symbol: str) -> List[Tuple[str, Dict]]:
+        """某只股票的全部有效提醒 (user_id, alert)"""
+        return self.store.active_for_symbol(symbol)
     
-    def check_alerts(self, user_id: str) -> List[Dict]:
+    def check_alerts(self, user_id: str, snapshot: Optional[QuoteSnapshot] = None) -> List[Dict]:
         """检查并触发提醒
         
+        Args:
+            snapshot: 本轮共享的行情快照（多个用户共用时每只股票只获取一次），不传则新建
+        
         Returns:
             被触发的提醒列表
         """
-        alerts = self.get_alerts(user_id, active_only=True)
-        triggered = []
+        return self._check(self.store.active([user_id]), snapshot).get(user_id, [])
+    
+    def check_all_alerts(self, snapshot: Optional[QuoteSnapshot] = None) -> Dict[str, List[Dict]]:
+        """一次检查所有用户的提醒：行情按全部股票的并集批量获取一次
+        
+        Returns:
+            {user_id: 被触发的提醒列表}，无触发的用户不在结果中
+        """
+        return self._check(self.store.active(), snapshot)
+    
+    def new_snapshot(self) -> QuoteSnapshot:
+        """创建一轮检查共用的行情快照"""
+        return QuoteSnapshot(self.tech_provider)
+    
+    def list_users(self) -> List[str]:
+        """有提醒的用户"""
+        return self.store.users()
+    
+    def _check(self, entries: List[Tuple[str, Dict]],
+               snapshot: Optional[QuoteSnapshot] = None) -> Dict[str, List[Dict]]:
+        """评估规则并按用户写回触发状态
+        
+        - 价格提醒：有序阈值索引二分查找，每只股票 O(log n + k)
+        - RSI 提醒：列式数组向量化比较
+        """
+        if not entries:
+            return {}
+        price_entries = [(u, a) for u, a in entries if a["type"] in PRICE_ALERT_TYPES]
+        rules = AlertRuleSet([(u, a) for u, a in entries if a["type"] not in PRICE_ALERT_TYPES])
         
-        # 按股票分组
-        symbols = list(set(a["symbol"] for a in alerts))
+        if snapshot is None:
+            snapshot = self.new_snapshot()
+        snapshot.ensure({a["symbol"] for _, a in entries}, rules.rsi_symbols())
         
-        for symbol in symbols:
-            try:
-                # 获取当前数据
-                ticker = yf.Ticker(symbol)
-                hist = ticker.history(period="5d")
-                
-                if hist.empty:
+        hits: List[Tuple[str, Dict, float]] = []
+        wanted = {(u, a["id"]) for u, a in price_entries}
+        self._sync_index()
+        with self._index_lock:
+            for symbol in sorted({a["symbol"] for _, a in price_entries}):
+                price = snapshot.prices.get(symbol)
+                if price is None or math.isnan(price):
                     continue
-                
-                current_price = hist['Close'].iloc[-1]
-                
-                # 计算 RSI
-                try:
-                    import pandas_ta as ta
-                    rsi = ta.rsi(hist['Close'], length=14).iloc[-1]
-                except:
-                    rsi = None
-                
-                # 检查每个提醒
-                symbol_alerts = [a for a in alerts if a["symbol"] == symbol]
-                
-                for alert in symbol_alerts:
-                    alert_type = alert["type"]
-                    threshold = alert["threshold"]
-                    
-                    should_trigger = False
-                    
-                    if alert_type == "price_above" and current_price > threshold:
-                        should_trigger = True
-                        alert["trigger_value"] = current_price
-                        alert["trigger_message"] = f"{symbol} 价格 ${current_price:.2f} 已突破 ${threshold:.2f}"
-                    
-                    elif alert_type == "price_below" and current_price < threshold:
-                        should_trigger = True
-                        alert["trigger_value"] = current_price
-                        alert["trigger_message"] = f"{symbol} 价格 ${current_price:.2f} 已跌破 ${threshold:.2f}"
-                    
-                    elif alert_type == "rsi_above" and rsi and rsi > threshold:
-                        should_trigger = True
-                        alert["trigger_value"] = rsi
-                        alert["trigger_message"] = f"{symbol} RSI {rsi:.1f} 已超过 {threshold}"
-                    
-                    elif alert_type == "rsi_below" and rsi and rsi < threshold:
-                        should_trigger = True
-                        alert["trigger_value"] = rsi
-                        alert["trigger_message"] = f"{symbol} RSI {rsi:.1f} 已低于 {threshold}"
-                    
-                    if should_trigger:
-                        alert["triggered"] = True
-                        alert["triggered_at"] = datetime.now().isoformat()
-                        triggered.append(alert)
-            
-            except Exception as e:
-                print(f"检查 {symbol} 提醒时出错: {str(e)}")
-                continue
+                hits.extend((u, a, price) for u, a in self._price_index.crossed(symbol, price)
+                            if (u, a["id"]) in wanted)
+        
+        rule_hits, values = rules.evaluate(snapshot.prices, snapshot.rsis)
+        hits.extend((*rules.entries[i], float(values[i])) for i in rule_hits)
+        return self._trigger(hits)
+    
+    def on_price_update(self, symbol: str, price: float, rsi: Optional[float] = None) -> Dict[str, List[Dict]]:
+        """行情事件入口：只评估该股票的提醒（阈值索引二分查找）
+        
+        Args:
+            rsi: 最新 RSI，不传时只评估价格提醒
+        
+        Returns:
+            {user_id: 被触发的提醒列表}
+        """
+        symbol = symbol.upper()
+        hits: List[Tuple[str, Dict, float]] = []
+        self._sync_index()
+        with self._index_lock:
+            if price is not None and not math.isnan(price):
+                hits.extend((u, a, price) for u, a in self._price_index.crossed(symbol, price))
+            if rsi is not None and not math.isnan(rsi):
+                hits.extend((u, a, rsi) for u, a in self._rsi_index.crossed(symbol, rsi))
+        return self._trigger(hits)
+    
+    def watched_symbols(self) -> Tuple[Set[str], Set[str], Dict[str, frozenset]]:
+        """有效提醒涉及的股票
         
-        # 更新提醒状态
-        if triggered:
-            all_alerts = self._load_alerts(user_id)
-            for alert in all_alerts:
-                for t in triggered:
-                    if alert["id"] == t["id"]:
-                        alert["triggered"] = True
-                        alert["triggered_at"] = t["triggered_at"]
-            self._save_alerts(user_id, all_alerts)
+        Returns:
+            (全部股票, 有 RSI 提醒的股票, {symbol: 该股票有效提醒的标识集合})
+            标识集合变化（新增/移除提醒）时行情推送流会重新推送该股票的当前行情
+        """
+        self._sync_index()
+        with self._index_lock:
+            rsi_symbols = self._rsi_index.symbols()
+            signatures = self._price_index.alert_keys()
+            for symbol, keys in self._rsi_index.alert_keys().items():
+                signatures.setdefault(symbol, set()).update(keys)
+            return (self._price_index.symbols() | rsi_symbols, rsi_symbols,
+                    {symbol: frozenset(keys) for symbol, keys in signatures.items()})
+    
+    def _trigger(self, hits: List[Tuple[str, Dict, float]]) -> Dict[str, List[Dict]]:
+        """标记触发并生成通知文案，按用户写回"""
+        triggered: Dict[str, List[Dict]] = {}
+        triggered_at = datetime.now().isoformat()
+        for user_id, alert, value in hits:
+            alert = dict(alert)
+            alert["trigger_value"] = value
+            alert["trigger_message"] = trigger_message(alert, value)
+            alert["triggered"] = True
+            alert["triggered_at"] = triggered_at
+            triggered.setdefault(user_id, []).append(alert)
         
-        return triggered
+        # 更新提醒状态（已被其他进程标记触发的提醒不再重复通知）
+        marked: Dict[str, List[Dict]] = {}
+        for user_id, user_triggered in triggered.items():
+            user_marked = self._mark_triggered(user_id, user_triggered)
+            if user_marked:
+                marked[user_id] = user_marked
+        return marked
+    
+    def _mark_triggered(self, user_id: str, triggered: List[Dict]) -> List[Dict]:
+        marked, revision = self.store.mark_triggered(user_id, triggered)
+        self._apply_to_index(revision, user_id, removed=triggered)
+        return marked
+    
+    # ---------- 阈值索引 ----------
+    
+    def _apply_to_index(self, revision: int, user_id: str, added: List[Dict] = (),
+                        removed: List[Dict] = ()):
+        """本进程的写入增量更新阈值索引；期间有其他写入（revision 不连续）时留给 _sync_index 重建"""
+        with self._index_lock:
+            if self._index_revision is None or revision != self._index_revision + 1:
+                return
+            for index in (self._price_index, self._rsi_index):
+                for alert in removed:
+                    index.remove(user_id, alert)
+                for alert in added:
+                    index.add(user_id, alert)
+            self._index_revision = revision
+    
+    def _sync_index(self):
+        """其他进程（或本进程其他写入）使索引过期时，从有效提醒整体重建"""
+        with self._index_lock:
+            revision = self.store.revision()
+            if revision == self._index_revision:
+                return
+            self._price_index = ThresholdIndex(PRICE_ALERT_TYPES)
+            self._rsi_index = ThresholdIndex(RSI_ALERT_TYPES)
+            for user_id, alert in self.store.active():
+                self._price_index.add(user_id, alert)
+                self._rsi_index.add(user_id, alert)
+            self._index_revision = revision
     
     def _format_alert_type(self, alert_type: str) -> str:
         """格式化提醒类型"""
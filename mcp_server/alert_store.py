@@ -0,0 +1,193 @@
+"""
+提醒存储 - SQLite（data/alerts.db），按 (symbol, triggered) 与用户建索引
+
+增删提醒、标记触发都是单行写入的短事务；检查服务可直接查询某只股票的全部有效提醒。
+"""
+import json
+import os
+import sqlite3
+import threading
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS alerts (
+    user_id TEXT NOT NULL,
+    id TEXT NOT NULL,
+    symbol TEXT NOT NULL,
+    type TEXT NOT NULL,
+    threshold REAL NOT NULL,
+    message TEXT,
+    created_at TEXT NOT NULL,
+    triggered INTEGER NOT NULL DEFAULT 0,
+    triggered_at TEXT,
+    trigger_value REAL,
+    trigger_message TEXT,
+    PRIMARY KEY (user_id, id)
+);
+CREATE INDEX IF NOT EXISTS idx_alerts_symbol_triggered ON alerts(symbol, triggered);
+CREATE INDEX IF NOT EXISTS idx_alerts_user_triggered ON alerts(user_id, triggered);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value INTEGER NOT NULL
+);
+INSERT OR IGNORE INTO meta (key, value) VALUES ('revision', 0);
+"""
+
+_COLUMNS = ("user_id", "id", "symbol", "type", "threshold", "message", "created_at",
+            "triggered", "triggered_at", "trigger_value", "trigger_message")
+_SELECT = f"SELECT {', '.join(_COLUMNS)} FROM alerts"
+_OPTIONAL = ("triggered_at", "trigger_value", "trigger_message")
+
+
+def _row_to_alert(row: Tuple) -> Tuple[str, Dict[str, Any]]:
+    """数据库行 -> (user_id, 提醒字典)，字段与旧版 JSON 文件一致"""
+    record = dict(zip(_COLUMNS, row))
+    user_id = record.pop("user_id")
+    record["triggered"] = bool(record["triggered"])
+    for key in _OPTIONAL:
+        if record[key] is None:
+            del record[key]
+    return user_id, record
+
+
+class AlertStore:
+    """提醒存储
+
+    - 主键 (user_id, id)；(symbol, triggered) 索引服务于 "某只股票的全部有效提醒" 查询
+    - 每次写入在同一事务内递增 meta.revision，读者据此判断内存中的派生数据（阈值索引）是否过期
+    - 首次打开时自动导入旧版 data/alerts/{user_id}.json，导入后改名为 .json.migrated
+    """
+
+    def __init__(self, db_path: str, legacy_dir: Optional[str] = None):
+        self.db_path = db_path
+        os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
+        self._local = threading.local()
+        with self._connect() as conn:
+            conn.executescript(SCHEMA)
+        if legacy_dir and os.path.isdir(legacy_dir):
+            self._migrate_json_dir(legacy_dir)
+
+    def _connect(self) -> sqlite3.Connection:
+        """每个线程复用一个连接"""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    @staticmethod
+    def _bump(conn: sqlite3.Connection) -> int:
+        conn.execute("UPDATE meta SET value = value + 1 WHERE key = 'revision'")
+        return conn.execute("SELECT value FROM meta WHERE key = 'revision'").fetchone()[0]
+
+    # ---------- 写入 ----------
+
+    def add(self, user_id: str, alert: Dict[str, Any]) -> int:
+        """新增一条提醒，返回写入后的 revision"""
+        conn = self._connect()
+        with conn:
+            self._insert(conn, user_id, alert)
+            return self._bump(conn)
+
+    def remove(self, user_id: str, alert_id: Optional[str] = None,
+               symbol: Optional[str] = None) -> Tuple[List[Dict[str, Any]], int]:
+        """按 id 或股票代码删除用户的提醒
+
+        Returns:
+            (被删除的提醒, 写入后的 revision)
+        """
+        where, params = ("user_id = ? AND id = ?", (user_id, alert_id)) if alert_id \
+            else ("user_id = ? AND symbol = ?", (user_id, (symbol or "").upper()))
+        conn = self._connect()
+        with conn:
+            removed = [_row_to_alert(row)[1] for row in conn.execute(f"{_SELECT} WHERE {where}", params)]
+            conn.execute(f"DELETE FROM alerts WHERE {where}", params)
+            return removed, self._bump(conn)
+
+    def mark_triggered(self, user_id: str, triggered: Iterable[Dict[str, Any]]) -> Tuple[List[Dict[str, Any]], int]:
+        """标记触发（只更新尚未触发的提醒）
+
+        Returns:
+            (本次实际标记的提醒（已被其他进程标记的除外）, 写入后的 revision)
+        """
+        marked = []
+        conn = self._connect()
+        with conn:
+            for alert in triggered:
+                cursor = conn.execute(
+                    "UPDATE alerts SET triggered = 1, triggered_at = ?, trigger_value = ?, trigger_message = ? "
+                    "WHERE user_id = ? AND id = ? AND triggered = 0",
+                    (alert.get("triggered_at"), alert.get("trigger_value"), alert.get("trigger_message"),
+                     user_id, alert["id"]),
+                )
+                if cursor.rowcount:
+                    marked.append(alert)
+            return marked, self._bump(conn)
+
+    # ---------- 查询 ----------
+
+    def for_user(self, user_id: str, active_only: bool = True) -> List[Dict[str, Any]]:
+        """用户的提醒（按创建时间）"""
+        sql = f"{_SELECT} WHERE user_id = ?" + (" AND triggered = 0" if active_only else "")
+        rows = self._connect().execute(sql + " ORDER BY created_at", (user_id,)).fetchall()
+        return [_row_to_alert(row)[1] for row in rows]
+
+    def active(self, user_ids: Optional[Iterable[str]] = None) -> List[Tuple[str, Dict[str, Any]]]:
+        """有效提醒 (user_id, alert)；不指定用户时返回全部用户"""
+        if user_ids is None:
+            rows = self._connect().execute(f"{_SELECT} WHERE triggered = 0").fetchall()
+        else:
+            user_ids = list(user_ids)
+            if not user_ids:
+                return []
+            placeholders = ",".join("?" * len(user_ids))
+            rows = self._connect().execute(
+                f"{_SELECT} WHERE user_id IN ({placeholders}) AND triggered = 0", user_ids
+            ).fetchall()
+        return [_row_to_alert(row) for row in rows]
+
+    def active_for_symbol(self, symbol: str) -> List[Tuple[str, Dict[str, Any]]]:
+        """某只股票的全部有效提醒（走 (symbol, triggered) 索引）"""
+        rows = self._connect().execute(
+            f"{_SELECT} WHERE symbol = ? AND triggered = 0", (symbol.upper(),)
+        ).fetchall()
+        return [_row_to_alert(row) for row in rows]
+
+    def users(self) -> List[str]:
+        return [row[0] for row in self._connect().execute("SELECT DISTINCT user_id FROM alerts ORDER BY user_id")]
+
+    def revision(self) -> int:
+        return self._connect().execute("SELECT value FROM meta WHERE key = 'revision'").fetchone()[0]
+
+    # ---------- 迁移 ----------
+
+    @staticmethod
+    def _insert(conn: sqlite3.Connection, user_id: str, alert: Dict[str, Any]):
+        conn.execute(
+            "INSERT OR IGNORE INTO alerts (user_id, id, symbol, type, threshold, message, created_at, "
+            "triggered, triggered_at, trigger_value, trigger_message) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (user_id, alert["id"], alert["symbol"].upper(), alert["type"], float(alert["threshold"]),
+             alert.get("message"), alert.get("created_at", ""), int(bool(alert.get("triggered"))),
+             alert.get("triggered_at"), alert.get("trigger_value"), alert.get("trigger_message")),
+        )
+
+    def _migrate_json_dir(self, legacy_dir: str):
+        for name in sorted(os.listdir(legacy_dir)):
+            if not name.endswith(".json"):
+                continue
+            path = os.path.join(legacy_dir, name)
+            user_id = name[:-len(".json")]
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    alerts = json.load(f)
+                conn = self._connect()
+                with conn:
+                    for alert in alerts:
+                        self._insert(conn, user_id, alert)
+                    self._bump(conn)
+                os.replace(path, path + ".migrated")
+                print(f"[提醒存储] 已从 {name} 导入 {len(alerts)} 条提醒")
+            except Exception as e:
+                print(f"[提醒存储] 导入 {name} 失败: {e}")
@@ -2,7 +2,7 @@ import os
 from typing import Dict, Any, List
 from langchain.agents import initialize_agent, AgentType
 from langchain_openai import ChatOpenAI, OpenAI
-from langchain.memory import ConversationBufferMemory
+from langchain.memory import ConversationBufferWindowMemory
 from langchain.schema import BaseMessage
 from langchain.tools import BaseTool
 from .tools.funnel_strategy_tool_v2 import FunnelStrategyToolV2
@@ -10,6 +10,7 @@ from .tools.news_tool import NewsRetrievalTool, MarketNewsAnalysisTool
 from .tools.portfolio_tool import PortfolioManagementTool
 from .tools.alert_tool import SmartAlertTool
 from .tools.chart_tool import ChartGeneratorTool
+from .agent_sessions import AgentSession, SessionManager
 
 class EquiMindAgent:
     """EquiMind 智能投资 Agent"""
@@ -107,63 +108,57 @@ class EquiMindAgent:
             "你可以根据用户需求灵活调用这些工具，提供专业的投资分析和建议。"
         )
         
-        # 初始化记忆
-        self.memory = ConversationBufferMemory(
+        # 每个 chat 独立的记忆窗口（只保留近 N 轮）；LLM 与工具在所有会话间共享
+        self.memory_window = int(os.getenv("AGENT_MEMORY_WINDOW", "10"))
+        self.sessions = SessionManager(self._create_session)
+
+    def _create_session(self, session_id: str) -> AgentSession:
+        """创建会话：独立记忆 + 绑定该记忆的 Agent 执行器"""
+        memory = ConversationBufferWindowMemory(
             memory_key="chat_history",
             return_messages=True,
-            k=10   # 只保留近10轮
+            k=self.memory_window,
         )
-        
-        # 初始化 Agent
-        self.agent = initialize_agent(
+        agent = initialize_agent(
             tools=self.tools,
             llm=self.llm,
             agent=AgentType.STRUCTURED_CHAT_ZERO_SHOT_REACT_DESCRIPTION,
-            memory=self.memory,
+            memory=memory,
             verbose=True,
             handle_parsing_errors=True,
             agent_kwargs={
                 "prefix": self.system_prompt
             }
         )
+        return AgentSession(session_id, agent, memory)
+
+    def _session_id(self, context: Dict[str, Any] = None) -> str:
+        """会话键：优先 chat_id，其次 user_id"""
+        context = context or {}
+        return str(context.get("chat_id") or context.get("user_id") or "default")
     
     def handle_query(self, user_query: str, context: Dict[str, Any] = None) -> Dict[str, Any]:
         """处理用户查询"""
         try:
             # print("User query:", user_query)    
-            # 构建带上下文的查询
-            if context:
-                context_str = f"用户上下文: {context}\n"
-                full_query = context_str + user_query
-            else:
-                full_query = user_query
-            
             # 执行 Agent
-            agent_result = self.agent.invoke({"input": full_query})
-            
-
-            # 提取结果和中间步骤
-            output_text = ""
-            intermediate_steps = []
-            
-            if isinstance(agent_result, dict):
-                output_text = agent_result.get("output", str(agent_result))
-                intermediate_steps = agent_result.get("intermediate_steps", [])
-            else:
-                output_text = str(agent_result)
-            
-            print("Agent LLM result:", output_text)  # 调试输出
-            
-            # 检查结果是否为空或无效
-            if not output_text or not output_text.strip():
-                output_text = "抱歉，我无法为您提供完整的分析结果。请稍后再试或换个问题。"
+            session = self.sessions.get(self._session_id(context))
+            agent_result = session.agent.invoke({"input": self._build_query(user_query, context)})
+            return self._format_result(agent_result, context)
             
+        except Exception as e:
             return {
-                "success": True,
-                "response": output_text.strip(),
-                "intermediate_steps": intermediate_steps,
+                "success": False,
+                "error": str(e),
                 "context": context
             }
+
+    async def ahandle_query(self, user_query: str, context: Dict[str, Any] = None) -> Dict[str, Any]:
+        """异步处理用户查询：LLM 调用与工具执行（_arun）均不阻塞事件循环"""
+        try:
+            session = self.sessions.get(self._session_id(context))
+            agent_result = await session.agent.ainvoke({"input": self._build_query(user_query, context)})
+            return self._format_result(agent_result, context)
             
         except Exception as e:
             return {
@@ -172,10 +167,45 @@ class EquiMindAgent:
                 "context": context
             }
 
+    def _build_query(self, user_query: str, context: Dict[str, Any] = None) -> str:
+        """构建带上下文的查询"""
+        if context:
+            context_str = f"用户上下文: {context}\n"
+            return context_str + user_query
+        return user_query
+
+    def _format_result(self, agent_result: Any, context: Dict[str, Any] = None) -> Dict[str, Any]:
+        """提取结果和中间步骤"""
+        output_text = ""
+        intermediate_steps = []
+        
+        if isinstance(agent_result, dict):
+            output_text = agent_result.get("output", str(agent_result))
+            intermediate_steps = agent_result.get("intermediate_steps", [])
+        else:
+            output_text = str(agent_result)
+        
+        print("Agent LLM result:", output_text)  # 调试输出
+        
+        # 检查结果是否为空或无效
+        if not output_text or not output_text.strip():
+            output_text = "抱歉，我无法为您提供完整的分析结果。请稍后再试或换个问题。"
+        
+        return {
+            "success": True,
+            "response": output_text.strip(),
+            "intermediate_steps": intermediate_steps,
+            "context": context
+        }
+
     def simple_reply(self, user_query: str) -> str:
         """直接调用底层 LLM，返回最简单的问答结果，不走工具和 Agent。"""
         # 这里不包装上下文，也不调用任何工具，只做纯模型问答
         return self.llm.predict(user_query)
+
+    async def asimple_reply(self, user_query: str) -> str:
+        """simple_reply 的异步版本"""
+        return await self.llm.apredict(user_query)
     
     def get_available_tools(self) -> List[Dict[str, str]]:
         """获取可用工具列表"""
@@ -187,9 +217,9 @@ class EquiMindAgent:
             })
         return tools_info
     
-    def clear_memory(self):
-        """清除对话记忆"""
-        self.memory.clear()
+    def clear_memory(self, session_id: str = None):
+        """清除对话记忆；不指定 session_id（chat_id）时清除所有会话"""
+        self.sessions.clear(session_id)
 
 # 全局 Agent 实例
 equimind_agent = EquiMindAgent() 
\ No newline at end of file
@@ -0,0 +1,67 @@
+"""
+新闻去重 - 内存 + 持久化的已见集合，拉取到的条目在写入前过滤掉已处理过的
+
+持久化的去重键由 NewsStore.append_many 与新闻在同一事务内写入；写入成功后再调用 mark() 更新内存集合
+"""
+import os
+import threading
+import time
+from typing import Dict, List
+
+from .news_store import NewsStore
+
+
+class SeenSet:
+    """已见去重键集合
+
+    - 内存中保存 {dedup_key: 首次见到的时间}，启动时从 news_store 的 seen 表加载
+    - 超过 ttl 的键过期；ttl 不短于新闻保留期（NEWS_RETENTION_DAYS），否则键过期且新闻已被清理归档后，
+      源中仍在的旧条目会被重新写入并在下次清理时重复归档
+    """
+
+    def __init__(self, store: NewsStore, ttl_days: float = None):
+        self.store = store
+        ttl_days = ttl_days if ttl_days is not None else float(os.getenv("NEWS_SEEN_TTL_DAYS", "45"))
+        retention_days = float(os.getenv("NEWS_RETENTION_DAYS", "30"))
+        self.ttl = max(ttl_days, retention_days) * 86400
+        self._seen: Dict[str, float] = store.load_seen(time.time() - self.ttl)
+        self._lock = threading.Lock()
+        self._last_prune = time.time()
+
+    def filter_new(self, events: List[Dict]) -> List[Dict]:
+        """返回未见过的条目（同一批次内重复的也只保留第一条）；不标记已见，入库成功后调用 mark()"""
+        now = time.time()
+        fresh: Dict[str, Dict] = {}
+        with self._lock:
+            for event in events:
+                key = event.get("dedup_key")
+                if not key or key in fresh:
+                    continue
+                seen_ts = self._seen.get(key)
+                if seen_ts is not None and now - seen_ts <= self.ttl:
+                    continue
+                fresh[key] = event
+            if now - self._last_prune > 3600:
+                self._prune(now)
+        return list(fresh.values())
+
+    def mark(self, events: List[Dict]):
+        """入库事务提交后，将条目记入内存集合（持久化部分已由 append_many 写入）"""
+        now = time.time()
+        with self._lock:
+            for event in events:
+                if event.get("dedup_key"):
+                    self._seen[event["dedup_key"]] = now
+
+    def __contains__(self, key: str) -> bool:
+        seen_ts = self._seen.get(key)
+        return seen_ts is not None and time.time() - seen_ts <= self.ttl
+
+    def __len__(self) -> int:
+        return len(self._seen)
+
+    def _prune(self, now: float):
+        cutoff = now - self.ttl
+        self._seen = {key: ts for key, ts in self._seen.items() if ts >= cutoff}
+        self.store.prune_seen(cutoff)
+        self._last_prune = now
@@ -1,12 +1,17 @@
+import asyncio
 import hashlib
 import os
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timezone
-from typing import Dict, List
+from typing import Dict, List, Optional, Tuple
 
 import feedparser
+import httpx
 import requests
 
-from .state_store import append_news_event
+from .news_dedup import SeenSet
+from .state_store import append_news_events, news_store
+from .ticker_tagger import get_tagger
 
 
 DEFAULT_SOURCES = {
@@ -17,6 +22,13 @@ DEFAULT_SOURCES = {
 }
 
 
+# 单个源的拉取结果：(新闻事件, {'etag', 'last_modified'})；未更新或失败时为 None
+FeedResult = Optional[Tuple[List[Dict], Dict[str, Optional[str]]]]
+
+# 已处理过的新闻去重键，写入前过滤，重复拉取到的旧条目不再写入
+seen_set = SeenSet(news_store)
+
+
 def _parse_sources_from_env() -> Dict[str, str]:
     env_val = os.getenv("NEWS_RSS_SOURCES", "yahoo,nasdaq,seekingalpha,sec")
     selected = [s.strip().lower() for s in env_val.split(",") if s.strip()]
@@ -28,60 +40,170 @@ def _dedup_key(title: str, link: str) -> str:
     return hashlib.sha1(raw.encode("utf-8")).hexdigest()
 
 
+def _entries_to_events(source_name: str, feed) -> List[Dict]:
+    """将 RSS 条目转换为新闻事件"""
+    events: List[Dict] = []
+    for entry in feed.entries:
+        title = entry.get("title", "").strip()
+        link = entry.get("link", "").strip()
+        if not title or not link:
+            continue
+        published = entry.get("published", "") or entry.get("updated", "")
+        try:
+            # Normalize to ISO8601
+            published_dt = datetime(*entry.published_parsed[:6], tzinfo=timezone.utc).isoformat() if hasattr(entry, "published_parsed") else datetime.utcnow().replace(tzinfo=timezone.utc).isoformat()
+        except Exception:
+            published_dt = datetime.utcnow().replace(tzinfo=timezone.utc).isoformat()
+
+        dedup = _dedup_key(title, link)
+        events.append({
+            "title": title,
+            "summary": entry.get("summary", "")[:500],
+            "links": [link],
+            "source": source_name,
+            "published_at": published_dt,
+            "tickers": [],  # 入库前由 ticker_tagger 填充
+            "event_type": "news",
+            "severity": "normal",
+            "heat_score": 1,
+            "impact_summary": "",
+            "confidence": 0.5,
+            "dedup_key": dedup,
+        })
+    return events
+
+
+def _store_new_events(events: List[Dict]) -> List[Dict]:
+    """过滤掉已见过的条目，新条目标注股票代码后一次事务批量写入，返回新条目
+
+    去重键随新闻在同一事务内持久化，提交成功后才记入内存已见集合；写入失败的条目下次拉取时会重试
+    """
+    fresh = seen_set.filter_new(events)
+    tagger = get_tagger()
+    for event in fresh:
+        tagger.tag_event(event)
+    append_news_events(fresh)
+    seen_set.mark(fresh)
+    print(f"[新闻拉取] 本次 {len(events)} 条条目中新条目 {len(fresh)} 条")
+    return fresh
+
+
+def _conditional_headers(validators: Dict[str, str]) -> Dict[str, str]:
+    """根据上次保存的 ETag / Last-Modified 构造条件请求头"""
+    headers = {}
+    if validators.get("etag"):
+        headers["If-None-Match"] = validators["etag"]
+    if validators.get("last_modified"):
+        headers["If-Modified-Since"] = validators["last_modified"]
+    return headers
+
+
+def _response_validators(headers) -> Dict[str, str]:
+    return {"etag": headers.get("ETag"), "last_modified": headers.get("Last-Modified")}
+
+
+def _load_validators(sources: Dict[str, str]) -> Dict[str, Dict[str, Optional[str]]]:
+    return {name: news_store.get_feed_validators(name, url) for name, url in sources.items()}
+
+
+def _fetch_feed(session: requests.Session, source_name: str, url: str,
+                validators: Dict[str, Optional[str]]) -> FeedResult:
+    """拉取并解析单个 RSS 源（条件 GET），返回 (新闻事件, 新的校验值)；未变化或失败时返回 None"""
+    print(f"[新闻拉取] 正在处理源: {source_name} ({url})")
+    try:
+        # proxies=None：不使用环境代理（如环境有代理问题，可设置 NO_PROXY）
+        response = session.get(url, timeout=10, proxies={"http": None, "https": None},
+                               headers=_conditional_headers(validators))
+        if response.status_code == 304:
+            print(f"[新闻拉取] {source_name} 未更新（304）")
+            return None
+        response.raise_for_status()
+        feed = feedparser.parse(response.content)
+    except requests.exceptions.Timeout:
+        print(f"[新闻拉取] 超时: {source_name}")
+        return None
+    except requests.exceptions.RequestException as e:
+        print(f"[新闻拉取] 请求失败 {source_name}: {e}")
+        return None
+    except Exception as e:
+        print(f"[新闻拉取] 解析失败 {source_name}: {e}")
+        return None
+
+    print(f"[新闻拉取] {source_name} 获取到 {len(feed.entries)} 条条目")
+    return _entries_to_events(source_name, feed), _response_validators(response.headers)
+
+
+def _store_results(sources: Dict[str, str], results: List[FeedResult]) -> List[Dict]:
+    """写入新条目后再保存各源的校验值（写入失败时下次仍会完整拉取）"""
+    collected: List[Dict] = []
+    for result in results:
+        if result is not None:
+            collected.extend(result[0])
+    fresh = _store_new_events(collected)
+
+    for (source_name, url), result in zip(sources.items(), results):
+        if result is not None:
+            news_store.save_feed_validators(source_name, url, **result[1])
+    return fresh
+
+
 def ingest_once() -> List[Dict]:
+    """拉取所有新闻源（并发 + 条件 GET），返回新写入的新闻"""
     sources = _parse_sources_from_env()
-    collected: List[Dict] = []
+    if not sources:
+        return []
 
-    for source_name, url in sources.items():
-        print(f"[新闻拉取] 正在处理源: {source_name} ({url})")
-        try:
-            # 使用 requests 获取 RSS，设置超时和代理控制
-            # 如果环境有代理问题，可以设置 NO_PROXY 或使用 requests 的 proxies 参数
-            response = requests.get(url, timeout=10, proxies={"http": None, "https": None})
-            response.raise_for_status()
-            feed = feedparser.parse(response.content)
-        except requests.exceptions.Timeout:
-            print(f"[新闻拉取] 超时: {source_name}")
-            continue
-        except requests.exceptions.RequestException as e:
-            print(f"[新闻拉取] 请求失败 {source_name}: {e}")
-            continue
-        except Exception as e:
-            print(f"[新闻拉取] 解析失败 {source_name}: {e}")
-            continue
-        
-        print(f"[新闻拉取] {source_name} 获取到 {len(feed.entries)} 条条目")
-        for entry in feed.entries:
-            title = entry.get("title", "").strip()
-            link = entry.get("link", "").strip()
-            if not title or not link:
-                continue
-            published = entry.get("published", "") or entry.get("updated", "")
-            try:
-                # Normalize to ISO8601
-                published_dt = datetime(*entry.published_parsed[:6], tzinfo=timezone.utc).isoformat() if hasattr(entry, "published_parsed") else datetime.utcnow().replace(tzinfo=timezone.utc).isoformat()
-            except Exception:
-                published_dt = datetime.utcnow().replace(tzinfo=timezone.utc).isoformat()
-
-            dedup = _dedup_key(title, link)
-            event = {
-                "title": title,
-                "summary": entry.get("summary", "")[:500],
-                "links": [link],
-                "source": source_name,
-                "published_at": published_dt,
-                "tickers": [],  # 可后续通过简单规则或实体识别填充
-                "event_type": "news",
-                "severity": "normal",
-                "heat_score": 1,
-                "impact_summary": "",
-                "confidence": 0.5,
-                "dedup_key": dedup,
-            }
-            append_news_event(event)
-            collected.append(event)
-    
-    print(f"[新闻拉取] 完成，共收集 {len(collected)} 条新闻")
+    validators = _load_validators(sources)
+    with requests.Session() as session, ThreadPoolExecutor(max_workers=len(sources)) as executor:
+        results = list(executor.map(
+            lambda item: _fetch_feed(session, item[0], item[1], validators[item[0]]), sources.items()
+        ))
+
+    collected = _store_results(sources, results)
+    print(f"[新闻拉取] 完成，共收集 {len(collected)} 条新新闻")
     return collected
 
 
+async def _fetch_feed_async(client: httpx.AsyncClient, source_name: str, url: str,
+                            validators: Dict[str, Optional[str]]) -> FeedResult:
+    """_fetch_feed 的异步版本"""
+    print(f"[新闻拉取] 正在处理源: {source_name} ({url})")
+    try:
+        response = await client.get(url, headers=_conditional_headers(validators))
+        if response.status_code == 304:
+            print(f"[新闻拉取] {source_name} 未更新（304）")
+            return None
+        response.raise_for_status()
+        # feedparser 解析为 CPU 计算，放到线程中执行
+        feed = await asyncio.to_thread(feedparser.parse, response.content)
+    except httpx.TimeoutException:
+        print(f"[新闻拉取] 超时: {source_name}")
+        return None
+    except httpx.HTTPError as e:
+        print(f"[新闻拉取] 请求失败 {source_name}: {e}")
+        return None
+    except Exception as e:
+        print(f"[新闻拉取] 解析失败 {source_name}: {e}")
+        return None
+
+    print(f"[新闻拉取] {source_name} 获取到 {len(feed.entries)} 条条目")
+    return _entries_to_events(source_name, feed), _response_validators(response.headers)
+
+
+async def ingest_once_async() -> List[Dict]:
+    """ingest_once 的异步版本：非阻塞 HTTP，各源并发拉取"""
+    sources = _parse_sources_from_env()
+    if not sources:
+        return []
+
+    validators = await asyncio.to_thread(_load_validators, sources)
+    # trust_env=False 与同步版本的 proxies=None 一致，不使用环境代理
+    async with httpx.AsyncClient(timeout=10, trust_env=False, follow_redirects=True) as client:
+        results = await asyncio.gather(
+            *(_fetch_feed_async(client, name, url, validators[name]) for name, url in sources.items())
+        )
+
+    # 写入数据库为阻塞 I/O，放到线程中执行
+    collected = await asyncio.to_thread(_store_results, sources, list(results))
+    print(f"[新闻拉取] 完成，共收集 {len(collected)} 条新新闻")
+    return collected
@@ -0,0 +1,380 @@
+"""
+新闻存储 - SQLite（data/news.db），按发布时间、来源、去重键建索引
+
+"最近 H 小时内最新 N 条" 查询沿 published_ts 索引倒序读取，耗时与历史数据量无关。
+"""
+import gzip
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, List, Optional, Set
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS news (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    dedup_key TEXT NOT NULL UNIQUE,
+    source TEXT,
+    published_at TEXT,
+    published_ts REAL NOT NULL,
+    event TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_news_published_ts ON news(published_ts);
+CREATE INDEX IF NOT EXISTS idx_news_source_ts ON news(source, published_ts);
+CREATE TABLE IF NOT EXISTS news_tickers (
+    ticker TEXT NOT NULL,
+    published_ts REAL NOT NULL,
+    news_id INTEGER NOT NULL,
+    PRIMARY KEY (ticker, published_ts, news_id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_news_tickers_news_id ON news_tickers(news_id);
+CREATE TABLE IF NOT EXISTS news_terms (
+    term TEXT NOT NULL,
+    published_ts REAL NOT NULL,
+    news_id INTEGER NOT NULL,
+    PRIMARY KEY (term, published_ts, news_id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_news_terms_news_id ON news_terms(news_id);
+CREATE TABLE IF NOT EXISTS seen (
+    dedup_key TEXT PRIMARY KEY,
+    seen_ts REAL NOT NULL
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_seen_ts ON seen(seen_ts);
+CREATE TABLE IF NOT EXISTS feed_state (
+    source TEXT PRIMARY KEY,
+    url TEXT NOT NULL,
+    etag TEXT,
+    last_modified TEXT,
+    updated_ts REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+"""
+
+
+_TOKEN = re.compile(r"[a-z0-9]+")
+
+# 不建索引的高频虚词
+STOPWORDS = {
+    "a", "an", "and", "are", "as", "at", "be", "by", "for", "from", "has", "have", "in", "is", "it",
+    "its", "of", "on", "or", "that", "the", "this", "to", "was", "were", "will", "with",
+}
+
+
+def tokenize(text: str) -> List[str]:
+    """小写后按字母/数字切分"""
+    return _TOKEN.findall(text.lower()) if text else []
+
+
+def _index_terms(event: Dict[str, Any]) -> Set[str]:
+    tokens = tokenize(f"{event.get('title', '')} {event.get('summary', '')}")
+    return {token for token in tokens if token not in STOPWORDS}
+
+
+def _published_ts(published_at: str) -> float:
+    """ISO8601 发布时间 -> UTC 时间戳（无时区按 UTC 处理，解析失败取当前时间）"""
+    try:
+        dt = datetime.fromisoformat(published_at.replace("Z", "+00:00"))
+        if dt.tzinfo is None:
+            dt = dt.replace(tzinfo=timezone.utc)
+        return dt.timestamp()
+    except Exception:
+        return time.time()
+
+
+class NewsStore:
+    """新闻存储
+
+    - 每条新闻以完整 JSON 保存在 event 列，另存 dedup_key / source / published_ts 供索引查询
+    - dedup_key 唯一，重复写入同一条新闻会被忽略
+    - news_tickers 为 股票代码 -> 新闻 的索引，按代码查询最新新闻无需扫描全文
+    - news_terms 为 词 -> 新闻 的倒排索引（标题 + 摘要），关键词查询为倒排表的交/并运算
+    - 打开时导入旧版 news_events.jsonl（原文件保留，按大小/修改时间记录已导入，文件不变时不再重复导入）
+    """
+
+    def __init__(self, db_path: str, legacy_jsonl_path: Optional[str] = None):
+        self.db_path = db_path
+        os.makedirs(os.path.dirname(db_path), exist_ok=True)
+        self._local = threading.local()
+        with self._connect() as conn:
+            conn.executescript(SCHEMA)
+            # 旧库中已有的新闻视为已见
+            conn.execute(
+                "INSERT OR IGNORE INTO seen (dedup_key, seen_ts) "
+                "SELECT dedup_key, ? FROM news WHERE NOT EXISTS (SELECT 1 FROM seen)",
+                (time.time(),),
+            )
+        self._backfill_terms()
+        if legacy_jsonl_path and os.path.exists(legacy_jsonl_path):
+            self._migrate_jsonl(legacy_jsonl_path)
+
+    def _connect(self) -> sqlite3.Connection:
+        """每个线程复用一个连接"""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    # ---------- 写入 ----------
+
+    def append_many(self, events: Iterable[Dict[str, Any]]) -> int:
+        """批量写入（单个事务，同时记入已见去重键），返回实际新增的条数"""
+        events = [event for event in events if event.get("dedup_key")]
+        if not events:
+            return 0
+        added = 0
+        conn = self._connect()
+        with conn:
+            # 去重键与新闻在同一事务内提交：写入失败时不会留下 "已见但未入库" 的条目
+            conn.executemany(
+                "INSERT OR REPLACE INTO seen (dedup_key, seen_ts) VALUES (?, ?)",
+                [(event["dedup_key"], time.time()) for event in events],
+            )
+            for event in events:
+                published_ts = _published_ts(event.get("published_at", ""))
+                cursor = conn.execute(
+                    "INSERT OR IGNORE INTO news (dedup_key, source, published_at, published_ts, event) "
+                    "VALUES (?, ?, ?, ?, ?)",
+                    (event["dedup_key"], event.get("source"), event.get("published_at", ""),
+                     published_ts, json.dumps(event, ensure_ascii=False)),
+                )
+                if cursor.rowcount != 1:
+                    continue
+                added += 1
+                conn.executemany(
+                    "INSERT OR IGNORE INTO news_terms (term, published_ts, news_id) VALUES (?, ?, ?)",
+                    [(term, published_ts, cursor.lastrowid) for term in _index_terms(event)],
+                )
+                tickers = set(event.get("tickers") or [])
+                if tickers:
+                    conn.executemany(
+                        "INSERT OR IGNORE INTO news_tickers (ticker, published_ts, news_id) VALUES (?, ?, ?)",
+                        [(ticker.upper(), published_ts, cursor.lastrowid) for ticker in tickers],
+                    )
+        return added
+
+    def append(self, event: Dict[str, Any]) -> bool:
+        return self.append_many([event]) > 0
+
+    # ---------- 查询 ----------
+
+    def latest(self, limit: int = 50, hours: Optional[float] = None,
+               source: Optional[str] = None, ticker: Optional[str] = None) -> List[Dict[str, Any]]:
+        """按发布时间倒序返回最新 limit 条（可限定最近 hours 小时、来源、股票代码）"""
+        if ticker:
+            return self._latest_by_ticker(ticker, limit, hours)
+        clauses, params = [], []
+        if hours is not None:
+            clauses.append("published_ts >= ?")
+            params.append(time.time() - hours * 3600)
+        if source:
+            clauses.append("source = ?")
+            params.append(source)
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        params.append(limit)
+        rows = self._connect().execute(
+            f"SELECT event FROM news {where} ORDER BY published_ts DESC LIMIT ?", params
+        ).fetchall()
+        return [json.loads(row[0]) for row in rows]
+
+    def _latest_by_ticker(self, ticker: str, limit: int, hours: Optional[float]) -> List[Dict[str, Any]]:
+        since = time.time() - hours * 3600 if hours is not None else float("-inf")
+        rows = self._connect().execute(
+            "SELECT n.event FROM news_tickers t JOIN news n ON n.id = t.news_id "
+            "WHERE t.ticker = ? AND t.published_ts >= ? ORDER BY t.published_ts DESC LIMIT ?",
+            (ticker.upper(), since, limit),
+        ).fetchall()
+        return [json.loads(row[0]) for row in rows]
+
+    def search(self, phrases: Iterable[str], limit: int = 50, hours: Optional[float] = None,
+               ticker: Optional[str] = None) -> List[Dict[str, Any]]:
+        """关键词检索：返回包含任一短语的最新 limit 条新闻（可限定提及的股票代码）
+
+        每个短语切分为词，词的倒排表取交集（短语中的词都出现）；多个短语之间取并集。
+        """
+        since = time.time() - hours * 3600 if hours is not None else float("-inf")
+        groups = [[t for t in tokenize(phrase) if t not in STOPWORDS] for phrase in phrases]
+        groups = [terms for terms in groups if terms]
+        if not groups:
+            return []
+
+        selects, params = [], []
+        for terms in groups:
+            selects.append(" INTERSECT ".join(
+                ["SELECT news_id FROM news_terms WHERE term = ? AND published_ts >= ?"] * len(terms)
+            ))
+            for term in terms:
+                params.extend([term, since])
+        matched = " UNION ".join(f"SELECT news_id FROM ({sql})" for sql in selects)
+        if ticker:
+            matched = f"SELECT news_id FROM ({matched}) INTERSECT " \
+                      "SELECT news_id FROM news_tickers WHERE ticker = ? AND published_ts >= ?"
+            params.extend([ticker.upper(), since])
+        rows = self._connect().execute(
+            f"SELECT event FROM news WHERE id IN ({matched}) ORDER BY published_ts DESC LIMIT ?",
+            params + [limit],
+        ).fetchall()
+        return [json.loads(row[0]) for row in rows]
+
+    def term_hits(self, terms: Iterable[str], hours: Optional[float] = None) -> Dict[str, Set[str]]:
+        """查询时间范围内出现了哪些词
+
+        Returns:
+            {dedup_key: 该新闻中出现的词集合}，只包含至少出现一个词的新闻
+        """
+        terms = sorted({t for term in terms for t in tokenize(term)})
+        if not terms:
+            return {}
+        since = time.time() - hours * 3600 if hours is not None else float("-inf")
+        placeholders = ",".join("?" * len(terms))
+        rows = self._connect().execute(
+            f"SELECT n.dedup_key, t.term FROM news_terms t JOIN news n ON n.id = t.news_id "
+            f"WHERE t.term IN ({placeholders}) AND t.published_ts >= ?",
+            terms + [since],
+        ).fetchall()
+        hits: Dict[str, Set[str]] = {}
+        for dedup_key, term in rows:
+            hits.setdefault(dedup_key, set()).add(term)
+        return hits
+
+    # ---------- 已见去重键 ----------
+
+    def mark_seen(self, keys: Iterable[str], seen_ts: Optional[float] = None):
+        """记录已处理过的去重键（独立于 news 表，新闻被清理后仍可识别）"""
+        seen_ts = seen_ts if seen_ts is not None else time.time()
+        conn = self._connect()
+        with conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO seen (dedup_key, seen_ts) VALUES (?, ?)",
+                [(key, seen_ts) for key in keys],
+            )
+
+    def load_seen(self, since_ts: float) -> Dict[str, float]:
+        rows = self._connect().execute(
+            "SELECT dedup_key, seen_ts FROM seen WHERE seen_ts >= ?", (since_ts,)
+        ).fetchall()
+        return dict(rows)
+
+    def prune_seen(self, before_ts: float) -> int:
+        conn = self._connect()
+        with conn:
+            return conn.execute("DELETE FROM seen WHERE seen_ts < ?", (before_ts,)).rowcount
+
+    # ---------- RSS 条件请求校验值 ----------
+
+    def get_feed_validators(self, source: str, url: str) -> Dict[str, Optional[str]]:
+        """读取该源上次响应的 ETag / Last-Modified（源地址变化时视为无）"""
+        row = self._connect().execute(
+            "SELECT url, etag, last_modified FROM feed_state WHERE source = ?", (source,)
+        ).fetchone()
+        if row is None or row[0] != url:
+            return {}
+        return {"etag": row[1], "last_modified": row[2]}
+
+    def save_feed_validators(self, source: str, url: str, etag: Optional[str] = None,
+                             last_modified: Optional[str] = None):
+        conn = self._connect()
+        with conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO feed_state (source, url, etag, last_modified, updated_ts) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (source, url, etag, last_modified, time.time()),
+            )
+
+    def count(self) -> int:
+        return self._connect().execute("SELECT COUNT(*) FROM news").fetchone()[0]
+
+    # ---------- 保留期与归档 ----------
+
+    def compact(self, retention_days: float, archive_dir: str) -> Dict[str, int]:
+        """将发布时间早于保留期的新闻移入按月分段的 gzip 归档，并回收数据库空间
+
+        归档文件为 {archive_dir}/news_YYYY-MM.jsonl.gz，每次追加一个 gzip 成员（可直接整体解压）。
+        dedup_key 唯一约束保证库内无重复，因此只需处理过期数据。
+
+        Returns:
+            {'archived': 归档条数, 'segments': 涉及的归档文件数, 'remaining': 库内剩余条数}
+        """
+        cutoff = time.time() - retention_days * 86400
+        conn = self._connect()
+        # 只处理开始时已存在的行，期间新写入的（即使发布时间很早）留到下次处理
+        max_id = conn.execute("SELECT COALESCE(MAX(id), 0) FROM news").fetchone()[0]
+
+        segments: Dict[str, List[str]] = {}
+        cursor = conn.execute(
+            "SELECT published_ts, event FROM news WHERE published_ts < ? AND id <= ? ORDER BY published_ts",
+            (cutoff, max_id),
+        )
+        for published_ts, event in cursor:
+            month = datetime.fromtimestamp(published_ts, tz=timezone.utc).strftime("%Y-%m")
+            segments.setdefault(month, []).append(event)
+
+        archived = sum(len(events) for events in segments.values())
+        if archived:
+            os.makedirs(archive_dir, exist_ok=True)
+            for month, events in segments.items():
+                with gzip.open(os.path.join(archive_dir, f"news_{month}.jsonl.gz"), "at", encoding="utf-8") as f:
+                    f.write("\n".join(events) + "\n")
+            # 归档写入成功后再删除
+            with conn:
+                for table in ("news_tickers", "news_terms"):
+                    conn.execute(
+                        f"DELETE FROM {table} WHERE news_id IN "
+                        "(SELECT id FROM news WHERE published_ts < ? AND id <= ?)",
+                        (cutoff, max_id),
+                    )
+                conn.execute("DELETE FROM news WHERE published_ts < ? AND id <= ?", (cutoff, max_id))
+            conn.execute("VACUUM")
+
+        return {"archived": archived, "segments": len(segments), "remaining": self.count()}
+
+    # ---------- 迁移 ----------
+
+    def _backfill_terms(self):
+        """为建立倒排索引之前写入的新闻补建索引（仅在索引为空时执行一次）"""
+        conn = self._connect()
+        if conn.execute("SELECT 1 FROM news_terms LIMIT 1").fetchone():
+            return
+        rows = conn.execute("SELECT id, published_ts, event FROM news").fetchall()
+        if not rows:
+            return
+        with conn:
+            for news_id, published_ts, event in rows:
+                conn.executemany(
+                    "INSERT OR IGNORE INTO news_terms (term, published_ts, news_id) VALUES (?, ?, ?)",
+                    [(term, published_ts, news_id) for term in _index_terms(json.loads(event))],
+                )
+        print(f"[新闻存储] 已为 {len(rows)} 条新闻建立关键词索引")
+
+    def _migrate_jsonl(self, path: str):
+        """导入旧版 JSONL（幂等：重复写入的 dedup_key 被忽略，多个进程同时启动时也安全）"""
+        try:
+            stat = os.stat(path)
+            marker_key = f"legacy_import:{os.path.basename(path)}"
+            marker = f"{stat.st_size}:{stat.st_mtime_ns}"
+            conn = self._connect()
+            row = conn.execute("SELECT value FROM meta WHERE key = ?", (marker_key,)).fetchone()
+            if row and row[0] == marker:
+                return
+
+            events = []
+            with open(path, "r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        events.append(json.loads(line))
+                    except Exception:
+                        continue
+            added = self.append_many(events)
+            with conn:
+                conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (marker_key, marker))
+            print(f"[新闻存储] 已从 {os.path.basename(path)} 导入 {added} 条新闻（原文件共 {len(events)} 行）")
+        except Exception as e:
+            print(f"[新闻存储] 导入 {os.path.basename(path)} 失败: {e}")
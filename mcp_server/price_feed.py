@@ -0,0 +1,120 @@
+"""
+行情推送流 - 将最新价格以事件形式推给提醒管理器（AlertManager.on_price_update）
+
+- PollingPriceFeed：轮询适配器，按间隔批量获取被关注股票的行情，只推送有变化的股票
+- ReplayPriceFeed：回放本地 JSONL 行情文件，用于测试与复盘
+"""
+import json
+import math
+import os
+import threading
+import time
+from dataclasses import dataclass
+from typing import Callable, Dict, Hashable, Iterator, Optional, Set, Tuple
+
+from .quote_snapshot import QuoteSnapshot
+from .tools.data_providers.technical_data_provider import TechnicalDataProvider
+
+
+@dataclass
+class PriceUpdate:
+    """单只股票的一次行情更新"""
+    symbol: str
+    price: float
+    timestamp: float
+    rsi: Optional[float] = None
+
+
+class PollingPriceFeed:
+    """轮询行情适配器
+
+    每隔 interval 秒（默认 ALERT_POLL_INTERVAL_SEC）获取 watched() 返回的股票行情，
+    行情与提醒都没有变化的股票不推送，提醒只针对有变化的股票评估。
+    watched() 返回 (需要价格的股票, 需要 RSI 的股票, {symbol: 提醒标识})，每轮重新获取；
+    某只股票的提醒标识变化（如新增了提醒）时，即使价格不变（盘后、停牌）也会重新推送当前行情。
+    """
+
+    def __init__(self, watched: Callable[[], Tuple[Set[str], Set[str], Dict[str, Hashable]]],
+                 interval: Optional[float] = None,
+                 tech_provider: Optional[TechnicalDataProvider] = None):
+        self.watched = watched
+        self.interval = interval if interval is not None else float(os.getenv("ALERT_POLL_INTERVAL_SEC", "60"))
+        self.tech_provider = tech_provider or TechnicalDataProvider()
+        self._last: Dict[str, Tuple[float, Optional[float], Hashable]] = {}
+        self._stop = threading.Event()
+
+    def updates(self) -> Iterator[PriceUpdate]:
+        while not self._stop.is_set():
+            started = time.monotonic()
+            try:
+                yield from self.poll_once()
+            except Exception as e:
+                print(f"[行情推送] 轮询出错: {e}")
+            self._stop.wait(max(0.0, self.interval - (time.monotonic() - started)))
+
+    def poll_once(self) -> Iterator[PriceUpdate]:
+        """获取一轮行情，返回有变化的股票"""
+        symbols, rsi_symbols, signatures = self.watched()
+        if not symbols:
+            return
+        snapshot = QuoteSnapshot(self.tech_provider)
+        snapshot.ensure(symbols, rsi_symbols)
+        now = time.time()
+        for symbol in sorted(snapshot.prices):
+            price, rsi = snapshot.prices[symbol], snapshot.rsis.get(symbol)
+            state = (price, rsi, signatures.get(symbol))
+            if self._last.get(symbol) == state:
+                continue
+            self._last[symbol] = state
+            yield PriceUpdate(symbol, price, now, rsi)
+        # 不再关注的股票不保留上次的值
+        for symbol in set(self._last) - set(symbols):
+            del self._last[symbol]
+
+    def stop(self):
+        self._stop.set()
+
+
+class ReplayPriceFeed:
+    """回放本地行情文件
+
+    每行一个 JSON：{"symbol": "NVDA", "price": 120.5, "ts": 1700000000, "rsi": 71.2}（rsi 可选，ts 缺省为读取时间）。
+    speed=0 时不等待立即回放；speed=1 按原始时间间隔回放，speed=10 为 10 倍速。
+    """
+
+    def __init__(self, path: str, speed: float = 0.0):
+        self.path = path
+        self.speed = speed
+        self._stop = threading.Event()
+
+    def updates(self) -> Iterator[PriceUpdate]:
+        previous_ts = None
+        with open(self.path, "r", encoding="utf-8") as f:
+            for line_no, line in enumerate(f, 1):
+                if self._stop.is_set():
+                    return
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    record = json.loads(line)
+                    rsi = record.get("rsi")
+                    update = PriceUpdate(
+                        symbol=str(record["symbol"]).upper(),
+                        price=float(record["price"]),
+                        timestamp=float(record.get("ts") or time.time()),
+                        rsi=float(rsi) if rsi is not None else None,
+                    )
+                except (ValueError, KeyError, TypeError, AttributeError) as e:
+                    print(f"[行情回放] 跳过第 {line_no} 行: {e}")
+                    continue
+                if math.isnan(update.price):
+                    continue
+
+                if self.speed > 0 and previous_ts is not None and update.timestamp > previous_ts:
+                    self._stop.wait((update.timestamp - previous_ts) / self.speed)
+                previous_ts = update.timestamp
+                yield update
+
+    def stop(self):
+        self._stop.set()
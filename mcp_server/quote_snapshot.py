@@ -0,0 +1,63 @@
+"""
+行情快照 - 一轮提醒检查内共享的价格/RSI，每只股票只批量获取一次
+"""
+import time
+from typing import Dict, Iterable, Optional, Set
+
+import pandas as pd
+
+from .tools.data_providers.price_cache import price_cache
+from .tools.data_providers.technical_data_provider import TechnicalDataProvider
+
+
+class QuoteSnapshot:
+    """单轮检查的行情快照
+
+    - ensure() 只为快照中还没有的股票联网，缺失的股票合并为一次 get_bulk_history 批量请求
+    - 多个用户（或多次 check_alerts 调用）共用同一快照时，同一股票不会重复下载
+    - 获取失败的股票记入 missing，本轮不再重试
+    """
+
+    def __init__(self, tech_provider: Optional[TechnicalDataProvider] = None):
+        self.tech_provider = tech_provider or TechnicalDataProvider()
+        self.prices: Dict[str, float] = {}
+        self.rsis: Dict[str, float] = {}
+        self.missing: Set[str] = set()
+        self.created_at = time.time()
+        self._history: Dict[str, pd.DataFrame] = {}
+        self._rsi_synced: Set[str] = set()
+
+    def ensure(self, symbols: Iterable[str], rsi_symbols: Iterable[str] = ()):
+        """确保快照包含 symbols 的最新价格，以及 rsi_symbols 的 RSI"""
+        symbols = {s.upper() for s in symbols}
+        rsi_symbols = {s.upper() for s in rsi_symbols}
+        pending = sorted((symbols | rsi_symbols) - set(self._history) - self.missing)
+        if pending:
+            try:
+                frames = price_cache.get_bulk_history(pending, period="5d")
+            except Exception as e:
+                print(f"[行情快照] 批量获取 {len(pending)} 只股票失败: {e}")
+                frames = {}
+            for symbol in pending:
+                hist = frames.get(symbol)
+                if hist is None or hist.empty:
+                    self.missing.add(symbol)
+                    continue
+                self._history[symbol] = hist
+                self.prices[symbol] = float(hist['Close'].iloc[-1])
+
+        # RSI 由滚动指标状态增量更新，无需重读 200+ 根K线
+        for symbol in sorted(rsi_symbols - self._rsi_synced):
+            self._rsi_synced.add(symbol)
+            hist = self._history.get(symbol)
+            if hist is None:
+                continue
+            try:
+                live = self.tech_provider.sync_live_indicators(symbol, hist)
+                if live and not pd.isna(live.rsi):
+                    self.rsis[symbol] = float(live.rsi)
+            except Exception as e:
+                print(f"[行情快照] 同步 {symbol} 指标失败: {e}")
+
+    def __len__(self) -> int:
+        return len(self.prices)
@@ -1,3 +1,4 @@
+import asyncio
 import os
 from datetime import datetime
 from typing import List, Dict
@@ -5,9 +6,11 @@ from apscheduler.schedulers.asyncio import AsyncIOScheduler
 from apscheduler.triggers.cron import CronTrigger
 from apscheduler.triggers.interval import IntervalTrigger
 
-from .news_ingestor import ingest_once
-from .telegram_bot import get_default_chat_id, send_telegram_message
-from .state_store import get_alert_rules, read_latest_news, get_watchlist
+from .news_ingestor import ingest_once_async
+from .telegram_bot import get_default_chat_id
+from .telegram_dispatcher import outbound_dispatcher
+from .state_store import get_alert_rules, read_latest_news, get_watchlist, compact_news
+from .tools.funnel_strategy_tool_v2 import run_screen
 
 scheduler = AsyncIOScheduler()
 
@@ -33,7 +36,7 @@ async def job_auto_ingest_news():
     """定时自动拉取新闻任务"""
     print(f"[定时任务] {datetime.now()} 开始自动拉取新闻...")
     try:
-        items = ingest_once()
+        items = await ingest_once_async()
         print(f"[定时任务] 拉取完成，共 {len(items)} 条新闻")
     except Exception as e:
         print(f"[定时任务] 拉取失败: {e}")
@@ -44,14 +47,7 @@ async def job_morning_digest():
     print(f"[定时任务] {datetime.now()} 发送晨报...")
     try:
         # 获取最近24小时的新闻
-        news_items = read_latest_news(limit=20)
-        # 过滤最近24小时
-        cutoff = datetime.utcnow().timestamp() - 86400
-        recent = [
-            item for item in news_items
-            if item.get("published_at") and 
-            datetime.fromisoformat(item["published_at"].replace("Z", "+00:00")).timestamp() > cutoff
-        ]
+        recent = read_latest_news(limit=20, hours=24)
         
         if recent:
             body = _format_digest(recent, max_items=10)
@@ -60,11 +56,9 @@ async def job_morning_digest():
             if not chat_id:
                 print("[定时任务] 未配置 TELEGRAM_CHAT_ID，跳过晨报推送")
                 return
-            result = send_telegram_message(chat_id, digest_text)
-            if result.get("success"):
-                print(f"[定时任务] 晨报已通过 Telegram 发送，包含 {len(recent)} 条新闻")
-            else:
-                print(f"[定时任务] 晨报发送失败: {result.get('error')}")
+            # 交由推送调度器限速发送，失败时自动重试
+            outbound_dispatcher.enqueue(chat_id, digest_text)
+            print(f"[定时任务] 晨报已加入 Telegram 推送队列，包含 {len(recent)} 条新闻")
         else:
             print(f"[定时任务] 晨报：无新新闻，跳过推送")
     except Exception as e:
@@ -76,14 +70,7 @@ async def job_evening_digest():
     print(f"[定时任务] {datetime.now()} 发送晚报...")
     try:
         # 获取最近12小时的新闻
-        news_items = read_latest_news(limit=20)
-        # 过滤最近12小时
-        cutoff = datetime.utcnow().timestamp() - 43200
-        recent = [
-            item for item in news_items
-            if item.get("published_at") and 
-            datetime.fromisoformat(item["published_at"].replace("Z", "+00:00")).timestamp() > cutoff
-        ]
+        recent = read_latest_news(limit=20, hours=12)
         
         if recent:
             body = _format_digest(recent, max_items=10)
@@ -92,17 +79,39 @@ async def job_evening_digest():
             if not chat_id:
                 print("[定时任务] 未配置 TELEGRAM_CHAT_ID，跳过晚报推送")
                 return
-            result = send_telegram_message(chat_id, digest_text)
-            if result.get("success"):
-                print(f"[定时任务] 晚报已通过 Telegram 发送，包含 {len(recent)} 条新闻")
-            else:
-                print(f"[定时任务] 晚报发送失败: {result.get('error')}")
+            # 交由推送调度器限速发送，失败时自动重试
+            outbound_dispatcher.enqueue(chat_id, digest_text)
+            print(f"[定时任务] 晚报已加入 Telegram 推送队列，包含 {len(recent)} 条新闻")
         else:
             print(f"[定时任务] 晚报：无新新闻，跳过推送")
     except Exception as e:
         print(f"[定时任务] 晚报发送失败: {e}")
 
 
+async def job_nightly_screen():
+    """盘后选股扫描任务：结果保存为快照，供 Agent 即时读取"""
+    universes = [u.strip().lower() for u in os.getenv("NIGHTLY_SCREEN_UNIVERSES", "moat").split(",") if u.strip()]
+    for universe in universes:
+        print(f"[定时任务] {datetime.now()} 开始盘后扫描: {universe}")
+        try:
+            # 扫描耗时较长，放到线程中执行，避免阻塞事件循环中的其他任务；大股票池走多进程分片扫描（可续扫）
+            results = await asyncio.to_thread(run_screen, universe, sharded=True)
+            buy_count = sum(1 for r in results if r.action == 'buy')
+            print(f"[定时任务] 盘后扫描完成: {universe}，共 {len(results)} 只，买入信号 {buy_count} 个")
+        except Exception as e:
+            print(f"[定时任务] 盘后扫描失败 {universe}: {e}")
+
+
+async def job_compact_news():
+    """新闻保留期清理：过期新闻移入压缩归档，热数据只保留最近一段时间"""
+    print(f"[定时任务] {datetime.now()} 开始清理过期新闻...")
+    try:
+        stats = await asyncio.to_thread(compact_news)
+        print(f"[定时任务] 新闻清理完成：归档 {stats['archived']} 条（{stats['segments']} 个分段），剩余 {stats['remaining']} 条")
+    except Exception as e:
+        print(f"[定时任务] 新闻清理失败: {e}")
+
+
 def start_scheduler():
     """启动所有定时任务"""
     rules = get_alert_rules()
@@ -139,6 +148,31 @@ def start_scheduler():
     )
     print(f"[定时任务] 已启动晚报任务（每天 {evening_time}）")
     
+    # 盘后选股扫描（美东时间，工作日）
+    screen_time = os.getenv("NIGHTLY_SCREEN_TIME", "16:30")
+    hour, minute = map(int, screen_time.split(":"))
+    scheduler.add_job(
+        job_nightly_screen,
+        trigger=CronTrigger(day_of_week="mon-fri", hour=hour, minute=minute, timezone="America/New_York"),
+        id="nightly_screen",
+        replace_existing=True,
+    )
+    print(f"[定时任务] 已启动盘后扫描任务（工作日美东时间 {screen_time}）")
+    
+    # 新闻保留期清理（每天固定时间）
+    compact_time = os.getenv("NEWS_COMPACT_TIME", "03:30")
+    hour, minute = map(int, compact_time.split(":"))
+    scheduler.add_job(
+        job_compact_news,
+        trigger=CronTrigger(hour=hour, minute=minute),
+        id="compact_news",
+        replace_existing=True,
+    )
+    print(f"[定时任务] 已启动新闻清理任务（每天 {compact_time}）")
+    
+    # 推送调度器后台线程（限速 + 重试），同时补发上次退出时未发出的消息
+    outbound_dispatcher.start()
+    
     scheduler.start()
     print("[定时任务] 所有定时任务已启动")
 
@@ -146,5 +180,6 @@ def start_scheduler():
 def stop_scheduler():
     """停止定时任务"""
     scheduler.shutdown()
+    outbound_dispatcher.stop()
     print("[定时任务] 定时任务已停止")
 
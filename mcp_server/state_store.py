@@ -1,13 +1,19 @@
 import json
 import os
-from typing import Any, Dict, List
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional, Set
+
+from .news_store import NewsStore
 
 DATA_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), "data")
 os.makedirs(DATA_DIR, exist_ok=True)
 
 WATCHLIST_FILE = os.path.join(DATA_DIR, "watchlist.json")
 ALERT_RULES_FILE = os.path.join(DATA_DIR, "alert_rules.json")
-NEWS_EVENTS_FILE = os.path.join(DATA_DIR, "news_events.jsonl")
+NEWS_EVENTS_FILE = os.path.join(DATA_DIR, "news_events.jsonl")  # 旧版存储，首次启动时导入 NEWS_DB_FILE
+NEWS_DB_FILE = os.path.join(DATA_DIR, "news.db")
+NEWS_ARCHIVE_DIR = os.path.join(DATA_DIR, "news_archive")
+SCREEN_SNAPSHOT_FILE = os.path.join(DATA_DIR, "screen_snapshot.json")  # 旧版（全部股票池共用一个文件），仅读取
 
 
 def _read_json(path: str, default: Any):
@@ -55,22 +61,65 @@ def set_alert_rules(rules: Dict[str, Any]) -> Dict[str, Any]:
     return get_alert_rules()
 
 
+news_store = NewsStore(NEWS_DB_FILE, legacy_jsonl_path=NEWS_EVENTS_FILE)
+
+
 def append_news_event(event: Dict[str, Any]) -> None:
-    with open(NEWS_EVENTS_FILE, "a", encoding="utf-8") as f:
-        f.write(json.dumps(event, ensure_ascii=False) + "\n")
+    news_store.append(event)
+
+
+def append_news_events(events: Iterable[Dict[str, Any]]) -> int:
+    """批量写入新闻（单个事务），返回新增条数（已存在的 dedup_key 会被忽略）"""
+    return news_store.append_many(events)
+
+
+def compact_news(retention_days: Optional[float] = None) -> Dict[str, int]:
+    """清理超过保留期（默认 NEWS_RETENTION_DAYS 天）的新闻，移入 data/news_archive/ 压缩归档"""
+    if retention_days is None:
+        retention_days = float(os.getenv("NEWS_RETENTION_DAYS", "30"))
+    return news_store.compact(retention_days, NEWS_ARCHIVE_DIR)
+
 
+def read_latest_news(limit: int = 50, hours: Optional[float] = None,
+                     ticker: Optional[str] = None) -> List[Dict[str, Any]]:
+    """按发布时间倒序返回最新 limit 条新闻，可限定最近 hours 小时、提及的股票代码"""
+    return news_store.latest(limit=limit, hours=hours, ticker=ticker)
 
-def read_latest_news(limit: int = 50) -> List[Dict[str, Any]]:
-    if not os.path.exists(NEWS_EVENTS_FILE):
-        return []
-    items: List[Dict[str, Any]] = []
-    with open(NEWS_EVENTS_FILE, "r", encoding="utf-8") as f:
-        for line in f:
-            try:
-                items.append(json.loads(line))
-            except Exception:
-                continue
-    items.sort(key=lambda x: x.get("published_at", ""), reverse=True)
-    return items[:limit]
 
+def search_news(keywords: Iterable[str], limit: int = 50, hours: Optional[float] = None,
+                ticker: Optional[str] = None) -> List[Dict[str, Any]]:
+    """关键词检索（倒排索引）：返回包含任一关键词（短语需全部词出现）的最新 limit 条新闻，可限定股票代码"""
+    return news_store.search(keywords, limit=limit, hours=hours, ticker=ticker)
 
+
+def news_term_hits(terms: Iterable[str], hours: Optional[float] = None) -> Dict[str, Set[str]]:
+    """返回最近 hours 小时内每条新闻命中的词 {dedup_key: {term, ...}}"""
+    return news_store.term_hits(terms, hours=hours)
+
+
+def _screen_snapshot_file(universe: str) -> str:
+    return os.path.join(DATA_DIR, f"screen_snapshot_{universe}.json")
+
+
+def save_screen_snapshot(universe: str, results: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """保存选股扫描快照（全部结果 + 生成时间）
+
+    每个股票池单独一个文件：夜间任务与按需扫描不同股票池并发写入时互不覆盖
+    """
+    snapshot = {
+        "universe": universe,
+        "generated_at": datetime.now().isoformat(),
+        "results": results,
+    }
+    path = _screen_snapshot_file(universe)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    _write_json(tmp_path, snapshot)
+    os.replace(tmp_path, path)
+    return snapshot
+
+
+def load_screen_snapshot(universe: str) -> Optional[Dict[str, Any]]:
+    snapshot = _read_json(_screen_snapshot_file(universe), None)
+    if snapshot is None:
+        snapshot = _read_json(SCREEN_SNAPSHOT_FILE, {}).get(universe)
+    return snapshot
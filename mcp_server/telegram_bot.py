@@ -6,13 +6,10 @@ from __future__ import annotations
 
 import os
 import re
-from typing import Any, Dict, Optional, List
-
-import requests
+from typing import Any, Dict, Optional, List, Tuple
 
 from .langchain_agent import equimind_agent
-
-TELEGRAM_API_BASE = "https://api.telegram.org"
+from .telegram_client import telegram_client
 
 
 def _extract_chart_paths(text: str) -> List[str]:
@@ -67,28 +64,22 @@ def send_telegram_message(
         parse_mode: MarkdownV2 / HTML / Markdown（可选）
         disable_web_page_preview: 是否禁用链接预览
     """
-    token = _get_bot_token()
-    if not token:
-        return {"success": False, "error": "TELEGRAM_BOT_TOKEN 未配置"}
-
-    url = f"{TELEGRAM_API_BASE}/bot{token}/sendMessage"
-    payload: Dict[str, Any] = {
-        "chat_id": chat_id,
-        "text": text,
-        "disable_web_page_preview": disable_web_page_preview,
-    }
-    if parse_mode:
-        payload["parse_mode"] = parse_mode
-
-    try:
-        resp = requests.post(url, json=payload, timeout=10)
-        resp.raise_for_status()
-        data = resp.json()
-        if data.get("ok"):
-            return {"success": True, "result": data.get("result")}
-        return {"success": False, "error": data.get("description", "未知错误")}
-    except requests.RequestException as exc:
-        return {"success": False, "error": str(exc)}
+    return telegram_client.send_message(
+        chat_id, text, parse_mode=parse_mode, disable_web_page_preview=disable_web_page_preview
+    )
+
+
+async def async_send_telegram_message(
+    chat_id: str,
+    text: str,
+    *,
+    parse_mode: Optional[str] = None,
+    disable_web_page_preview: bool = True,
+) -> Dict[str, Any]:
+    """send_telegram_message 的异步版本（共享 httpx 连接池）。"""
+    return await telegram_client.asend_message(
+        chat_id, text, parse_mode=parse_mode, disable_web_page_preview=disable_web_page_preview
+    )
 
 
 def send_telegram_photo(
@@ -107,47 +98,33 @@ def send_telegram_photo(
         caption: 图片说明文字（可选）
         parse_mode: MarkdownV2 / HTML / Markdown（可选）
     """
-    token = _get_bot_token()
-    if not token:
-        return {"success": False, "error": "TELEGRAM_BOT_TOKEN 未配置"}
+    return telegram_client.send_photo(chat_id, photo_path, caption=caption, parse_mode=parse_mode)
 
-    url = f"{TELEGRAM_API_BASE}/bot{token}/sendPhoto"
-    
-    # 检查文件是否存在
-    if not os.path.exists(photo_path):
-        return {"success": False, "error": f"图片文件不存在: {photo_path}"}
-    
-    try:
-        with open(photo_path, 'rb') as photo_file:
-            files = {'photo': photo_file}
-            data: Dict[str, Any] = {'chat_id': chat_id}
-            
-            if caption:
-                data['caption'] = caption
-            if parse_mode:
-                data['parse_mode'] = parse_mode
-            
-            resp = requests.post(url, data=data, files=files, timeout=30)
-            resp.raise_for_status()
-            result = resp.json()
-            
-            if result.get("ok"):
-                return {"success": True, "result": result.get("result")}
-            return {"success": False, "error": result.get("description", "未知错误")}
-    except requests.RequestException as exc:
-        return {"success": False, "error": str(exc)}
-    except Exception as exc:
-        return {"success": False, "error": f"读取图片失败: {str(exc)}"}
+
+async def async_send_telegram_photo(
+    chat_id: str,
+    photo_path: str,
+    *,
+    caption: Optional[str] = None,
+    parse_mode: Optional[str] = None,
+) -> Dict[str, Any]:
+    """send_telegram_photo 的异步版本（共享 httpx 连接池）。"""
+    return await telegram_client.asend_photo(chat_id, photo_path, caption=caption, parse_mode=parse_mode)
 
 
-def handle_telegram_update(update: Dict[str, Any]) -> Dict[str, Any]:
+def _parse_update(update: Dict[str, Any]) -> Dict[str, Any]:
     """
-    处理 Telegram Webhook 更新。
-    自动调用 Agent 生成回复并回发给用户。
+    解析 Telegram 更新并决定处理方式（不执行任何阻塞操作）。
+
+    Returns:
+        {"action": "done", "result": ...}                       无需回复
+        {"action": "notice", "chat_id", "text", "result"}         回复固定文案
+        {"action": "agent", "chat_id", "user_id", "query"}        走完整 Agent
+        {"action": "simple", "chat_id", "text"}                   走简单 LLM 问答
     """
     token = _get_bot_token()
     if not token:
-        return {"success": False, "error": "TELEGRAM_BOT_TOKEN 未配置"}
+        return {"action": "done", "result": {"success": False, "error": "TELEGRAM_BOT_TOKEN 未配置"}}
 
     message = (
         update.get("message")
@@ -156,12 +133,12 @@ def handle_telegram_update(update: Dict[str, Any]) -> Dict[str, Any]:
         or update.get("edited_channel_post")
     )
     if not message:
-        return {"success": True, "message": "无文本消息，跳过"}
+        return {"action": "done", "result": {"success": True, "message": "无文本消息，跳过"}}
 
     chat = message.get("chat", {})
     chat_id = chat.get("id")
     if not chat_id:
-        return {"success": False, "error": "无法解析 chat_id"}
+        return {"action": "done", "result": {"success": False, "error": "无法解析 chat_id"}}
 
     from_user = message.get("from", {}) or {}
     user_id = from_user.get("id")
@@ -169,9 +146,12 @@ def handle_telegram_update(update: Dict[str, Any]) -> Dict[str, Any]:
     text = message.get("text", "") or ""
 
     if not text.strip():
-        reply = "目前仅支持文本消息，请输入您的问题。"
-        send_telegram_message(str(chat_id), reply)
-        return {"success": True, "message": "非文本消息已提示"}
+        return {
+            "action": "notice",
+            "chat_id": str(chat_id),
+            "text": "目前仅支持文本消息，请输入您的问题。",
+            "result": {"success": True, "message": "非文本消息已提示"},
+        }
 
     stripped = text.strip()
     if stripped.lower() in ("/start", "/help"):
@@ -179,74 +159,149 @@ def handle_telegram_update(update: Dict[str, Any]) -> Dict[str, Any]:
             "👋 欢迎使用 EquiMind 投资助手！\n"
             "发送您的投资问题，例如：“帮我推荐 5 个当前值得关注的美股”。"
         )
-        send_telegram_message(str(chat_id), welcome)
-        return {"success": True, "message": "发送欢迎语"}
+        return {
+            "action": "notice",
+            "chat_id": str(chat_id),
+            "text": welcome,
+            "result": {"success": True, "message": "发送欢迎语"},
+        }
 
     print(f"[Telegram] 收到消息: {stripped} (来自: {user_id} / {username})")
 
     # 如果以 /agent 开头，则走完整 Agent 工作流（带工具、多步骤推理）
     if stripped.lower().startswith("/agent"):
         query = stripped[len("/agent"):].strip() or "请根据当前市场情况，给出一份投资分析。"
-        result = equimind_agent.handle_query(
-            user_query=query,
-            context={"user_id": str(user_id or ""), "platform": "telegram", "chat_id": str(chat_id)},
-        )
+        return {"action": "agent", "chat_id": str(chat_id), "user_id": str(user_id or ""), "query": query}
+
+    # 默认：走简单 LLM 问答，响应更快，不使用工具
+    return {"action": "simple", "chat_id": str(chat_id), "text": stripped}
 
-        if result.get("success"):
-            reply_text = result.get("response", "抱歉，我暂时无法给出投资建议。")
-            
-            # 从回复文本和中间步骤中提取图表路径
-            chart_paths = _extract_chart_paths(reply_text)
-            
-            # 如果文本中没有路径，尝试从中间步骤中提取
-            if not chart_paths:
-                intermediate_steps = result.get("intermediate_steps", [])
-                for step in intermediate_steps:
-                    if len(step) >= 2:
-                        # step[1] 是工具的返回结果
-                        tool_output = str(step[1])
-                        chart_paths.extend(_extract_chart_paths(tool_output))
-            
-            # 先发送文本消息
-            send_result = send_telegram_message(str(chat_id), reply_text)
-            if send_result.get("success"):
-                print(f"[Telegram] [Agent] 已回复消息到 {chat_id}")
-            else:
-                print(f"[Telegram] [Agent] 回复失败: {send_result.get('error')}")
-            
-            # 如果有图表，发送图片
-            if chart_paths:
-                for chart_path in chart_paths:
-                    photo_result = send_telegram_photo(
-                        str(chat_id),
-                        chart_path,
-                        caption=f"📊 {os.path.basename(chart_path)}"
-                    )
-                    if photo_result.get("success"):
-                        print(f"[Telegram] [Agent] 已发送图表: {chart_path}")
-                    else:
-                        print(f"[Telegram] [Agent] 图表发送失败: {photo_result.get('error')}")
-            
-            return {"success": True, "message": "Agent 消息已处理", "response": reply_text}
 
+def _agent_context(parsed: Dict[str, Any]) -> Dict[str, Any]:
+    return {"user_id": parsed["user_id"], "platform": "telegram", "chat_id": parsed["chat_id"]}
+
+
+def _agent_reply_parts(result: Dict[str, Any]) -> Tuple[str, List[str]]:
+    """从 Agent 结果中取出回复文本和图表路径"""
+    reply_text = result.get("response", "抱歉，我暂时无法给出投资建议。")
+    
+    # 从回复文本和中间步骤中提取图表路径
+    chart_paths = _extract_chart_paths(reply_text)
+    
+    # 如果文本中没有路径，尝试从中间步骤中提取
+    if not chart_paths:
+        intermediate_steps = result.get("intermediate_steps", [])
+        for step in intermediate_steps:
+            if len(step) >= 2:
+                # step[1] 是工具的返回结果
+                tool_output = str(step[1])
+                chart_paths.extend(_extract_chart_paths(tool_output))
+    return reply_text, chart_paths
+
+
+def _log_send(prefix: str, chat_id: str, send_result: Dict[str, Any]):
+    if send_result.get("success"):
+        print(f"{prefix} 已回复消息到 {chat_id}")
+    else:
+        print(f"{prefix} 回复失败: {send_result.get('error')}")
+
+
+def _log_photo(chart_path: str, photo_result: Dict[str, Any]):
+    if photo_result.get("success"):
+        print(f"[Telegram] [Agent] 已发送图表: {chart_path}")
+    else:
+        print(f"[Telegram] [Agent] 图表发送失败: {photo_result.get('error')}")
+
+
+def _deliver_agent_result(chat_id: str, result: Dict[str, Any]) -> Dict[str, Any]:
+    """将 Agent 结果（文本 + 图表）发送给用户"""
+    if not result.get("success"):
         error_msg = result.get("error", "unknown error")
-        send_telegram_message(str(chat_id), f"Agent 处理失败：{error_msg}")
+        send_telegram_message(chat_id, f"Agent 处理失败：{error_msg}")
         return {"success": False, "error": error_msg}
 
-    # 默认：走简单 LLM 问答，响应更快，不使用工具
-    try:
-        reply_text = equimind_agent.simple_reply(stripped)
-    except Exception as e:
-        error_msg = str(e)
-        send_telegram_message(str(chat_id), f"处理失败：{error_msg}")
+    reply_text, chart_paths = _agent_reply_parts(result)
+    # 先发送文本消息，再发送图表
+    _log_send("[Telegram] [Agent]", chat_id, send_telegram_message(chat_id, reply_text))
+    for chart_path in chart_paths:
+        photo_result = send_telegram_photo(chat_id, chart_path, caption=f"📊 {os.path.basename(chart_path)}")
+        _log_photo(chart_path, photo_result)
+    return {"success": True, "message": "Agent 消息已处理", "response": reply_text}
+
+
+async def _adeliver_agent_result(chat_id: str, result: Dict[str, Any]) -> Dict[str, Any]:
+    """_deliver_agent_result 的异步版本"""
+    if not result.get("success"):
+        error_msg = result.get("error", "unknown error")
+        await async_send_telegram_message(chat_id, f"Agent 处理失败：{error_msg}")
         return {"success": False, "error": error_msg}
 
-    send_result = send_telegram_message(str(chat_id), reply_text or "抱歉，我暂时无法回答这个问题。")
-    if send_result.get("success"):
-        print(f"[Telegram] 已回复消息到 {chat_id}")
-    else:
-        print(f"[Telegram] 回复失败: {send_result.get('error')}")
-    return {"success": True, "message": "消息已处理", "response": reply_text}
+    reply_text, chart_paths = _agent_reply_parts(result)
+    _log_send("[Telegram] [Agent]", chat_id, await async_send_telegram_message(chat_id, reply_text))
+    for chart_path in chart_paths:
+        photo_result = await async_send_telegram_photo(chat_id, chart_path, caption=f"📊 {os.path.basename(chart_path)}")
+        _log_photo(chart_path, photo_result)
+    return {"success": True, "message": "Agent 消息已处理", "response": reply_text}
+
+
+def handle_telegram_update(update: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    处理 Telegram Webhook 更新。
+    自动调用 Agent 生成回复并回发给用户。
+    """
+    parsed = _parse_update(update)
+    action = parsed["action"]
+
+    if action == "notice":
+        send_telegram_message(parsed["chat_id"], parsed["text"])
+        return parsed["result"]
+
+    if action == "agent":
+        result = equimind_agent.handle_query(user_query=parsed["query"], context=_agent_context(parsed))
+        return _deliver_agent_result(parsed["chat_id"], result)
+
+    if action == "simple":
+        try:
+            reply_text = equimind_agent.simple_reply(parsed["text"])
+        except Exception as e:
+            error_msg = str(e)
+            send_telegram_message(parsed["chat_id"], f"处理失败：{error_msg}")
+            return {"success": False, "error": error_msg}
+        send_result = send_telegram_message(parsed["chat_id"], reply_text or "抱歉，我暂时无法回答这个问题。")
+        _log_send("[Telegram]", parsed["chat_id"], send_result)
+        return {"success": True, "message": "消息已处理", "response": reply_text}
+
+    return parsed["result"]
+
+
+async def ahandle_telegram_update(update: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    handle_telegram_update 的异步版本。
+    Agent / LLM 调用与消息发送均在事件循环中等待，单个事件循环即可并发处理多个会话。
+    """
+    parsed = _parse_update(update)
+    action = parsed["action"]
+
+    if action == "notice":
+        await async_send_telegram_message(parsed["chat_id"], parsed["text"])
+        return parsed["result"]
+
+    if action == "agent":
+        result = await equimind_agent.ahandle_query(user_query=parsed["query"], context=_agent_context(parsed))
+        return await _adeliver_agent_result(parsed["chat_id"], result)
+
+    if action == "simple":
+        try:
+            reply_text = await equimind_agent.asimple_reply(parsed["text"])
+        except Exception as e:
+            error_msg = str(e)
+            await async_send_telegram_message(parsed["chat_id"], f"处理失败：{error_msg}")
+            return {"success": False, "error": error_msg}
+        send_result = await async_send_telegram_message(parsed["chat_id"], reply_text or "抱歉，我暂时无法回答这个问题。")
+        _log_send("[Telegram]", parsed["chat_id"], send_result)
+        return {"success": True, "message": "消息已处理", "response": reply_text}
+
+    return parsed["result"]
 
 
 def broadcast_digest(text: str) -> Dict[str, Any]:
@@ -0,0 +1,201 @@
+"""
+Telegram Bot API 客户端 - 复用 keep-alive 连接池（同步 requests.Session / 异步 httpx.AsyncClient）
+"""
+from __future__ import annotations
+
+import asyncio
+import os
+import threading
+from typing import Any, Dict, Optional
+
+import httpx
+import requests
+from requests.adapters import HTTPAdapter
+
+TELEGRAM_API_BASE = "https://api.telegram.org"
+
+
+def _parse_response(status_code: int, data: Any) -> Dict[str, Any]:
+    """将 Bot API 响应转换为 {"success": ..., "result"/"error": ...}"""
+    if isinstance(data, dict) and data.get("ok"):
+        return {"success": True, "result": data.get("result")}
+
+    data = data if isinstance(data, dict) else {}
+    response: Dict[str, Any] = {
+        "success": False,
+        "error": data.get("description") or f"HTTP {status_code}",
+        "error_code": data.get("error_code", status_code),
+    }
+    retry_after = (data.get("parameters") or {}).get("retry_after")
+    if retry_after is not None:
+        response["retry_after"] = retry_after
+    return response
+
+
+class TelegramClient:
+    """共享的 Telegram 客户端
+
+    - 同步调用共用一个 requests.Session（连接池大小 TELEGRAM_POOL_SIZE）
+    - 异步调用共用一个 httpx.AsyncClient（按事件循环懒加载）
+    - 所有调用返回 {"success": True, "result": ...} 或 {"success": False, "error": ...}
+    """
+
+    def __init__(self, token: Optional[str] = None, pool_size: Optional[int] = None):
+        self._token = token
+        self.pool_size = pool_size or int(os.getenv("TELEGRAM_POOL_SIZE", "10"))
+        self._session: Optional[requests.Session] = None
+        self._async_client: Optional[httpx.AsyncClient] = None
+        self._async_loop: Optional[asyncio.AbstractEventLoop] = None
+        self._lock = threading.Lock()
+
+    @property
+    def token(self) -> Optional[str]:
+        token = self._token or os.getenv("TELEGRAM_BOT_TOKEN")
+        return token.strip() if token else None
+
+    def _url(self, method: str) -> str:
+        return f"{TELEGRAM_API_BASE}/bot{self.token}/{method}"
+
+    # ---------- 同步 ----------
+
+    @property
+    def session(self) -> requests.Session:
+        with self._lock:
+            if self._session is None:
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.pool_size)
+                session.mount("https://", adapter)
+                self._session = session
+            return self._session
+
+    def request(self, method: str, *, json: Optional[Dict[str, Any]] = None,
+                data: Optional[Dict[str, Any]] = None, files: Optional[Dict[str, Any]] = None,
+                params: Optional[Dict[str, Any]] = None, timeout: float = 10) -> Dict[str, Any]:
+        """调用任意 Bot API 方法"""
+        if not self.token:
+            return {"success": False, "error": "TELEGRAM_BOT_TOKEN 未配置"}
+        try:
+            resp = self.session.post(self._url(method), json=json, data=data, files=files,
+                                     params=params, timeout=timeout)
+            try:
+                payload = resp.json()
+            except ValueError:
+                resp.raise_for_status()
+                payload = None
+            return _parse_response(resp.status_code, payload)
+        except requests.RequestException as exc:
+            return {"success": False, "error": str(exc)}
+
+    def send_message(self, chat_id: str, text: str, *, parse_mode: Optional[str] = None,
+                     disable_web_page_preview: bool = True) -> Dict[str, Any]:
+        return self.request("sendMessage", json=self._message_payload(
+            chat_id, text, parse_mode, disable_web_page_preview))
+
+    def send_photo(self, chat_id: str, photo_path: str, *, caption: Optional[str] = None,
+                   parse_mode: Optional[str] = None) -> Dict[str, Any]:
+        if not os.path.exists(photo_path):
+            return {"success": False, "error": f"图片文件不存在: {photo_path}"}
+        try:
+            with open(photo_path, 'rb') as photo_file:
+                return self.request("sendPhoto", data=self._photo_payload(chat_id, caption, parse_mode),
+                                    files={'photo': photo_file}, timeout=30)
+        except OSError as exc:
+            return {"success": False, "error": f"读取图片失败: {str(exc)}"}
+
+    def get_updates(self, offset: Optional[int] = None, timeout: int = 30) -> Dict[str, Any]:
+        """长轮询获取更新（HTTP 超时略大于长轮询时间）"""
+        params: Dict[str, Any] = {"timeout": timeout}
+        if offset is not None:
+            params["offset"] = offset
+        return self.request("getUpdates", json=params, timeout=timeout + 5)
+
+    # ---------- 异步 ----------
+
+    @property
+    def async_client(self) -> httpx.AsyncClient:
+        # httpx.AsyncClient 绑定创建时的事件循环，事件循环变化时重新创建
+        loop = asyncio.get_running_loop()
+        if self._async_client is None or self._async_loop is not loop:
+            self._async_client = httpx.AsyncClient(
+                limits=httpx.Limits(max_connections=self.pool_size, max_keepalive_connections=self.pool_size),
+            )
+            self._async_loop = loop
+        return self._async_client
+
+    async def arequest(self, method: str, *, json: Optional[Dict[str, Any]] = None,
+                       data: Optional[Dict[str, Any]] = None, files: Optional[Dict[str, Any]] = None,
+                       timeout: float = 10) -> Dict[str, Any]:
+        """异步调用任意 Bot API 方法"""
+        if not self.token:
+            return {"success": False, "error": "TELEGRAM_BOT_TOKEN 未配置"}
+        try:
+            resp = await self.async_client.post(self._url(method), json=json, data=data, files=files,
+                                                timeout=timeout)
+            try:
+                payload = resp.json()
+            except ValueError:
+                resp.raise_for_status()
+                payload = None
+            return _parse_response(resp.status_code, payload)
+        except httpx.HTTPError as exc:
+            return {"success": False, "error": str(exc)}
+
+    async def asend_message(self, chat_id: str, text: str, *, parse_mode: Optional[str] = None,
+                            disable_web_page_preview: bool = True) -> Dict[str, Any]:
+        return await self.arequest("sendMessage", json=self._message_payload(
+            chat_id, text, parse_mode, disable_web_page_preview))
+
+    async def asend_photo(self, chat_id: str, photo_path: str, *, caption: Optional[str] = None,
+                          parse_mode: Optional[str] = None) -> Dict[str, Any]:
+        if not os.path.exists(photo_path):
+            return {"success": False, "error": f"图片文件不存在: {photo_path}"}
+        try:
+            content = await asyncio.to_thread(self._read_file, photo_path)
+        except OSError as exc:
+            return {"success": False, "error": f"读取图片失败: {str(exc)}"}
+        return await self.arequest("sendPhoto", data=self._photo_payload(chat_id, caption, parse_mode),
+                                   files={'photo': (os.path.basename(photo_path), content)}, timeout=30)
+
+    async def aclose(self):
+        if self._async_client is not None:
+            await self._async_client.aclose()
+            self._async_client = None
+            self._async_loop = None
+
+    def close(self):
+        with self._lock:
+            if self._session is not None:
+                self._session.close()
+                self._session = None
+
+    # ---------- 请求体 ----------
+
+    @staticmethod
+    def _message_payload(chat_id: str, text: str, parse_mode: Optional[str],
+                         disable_web_page_preview: bool) -> Dict[str, Any]:
+        payload: Dict[str, Any] = {
+            "chat_id": chat_id,
+            "text": text,
+            "disable_web_page_preview": disable_web_page_preview,
+        }
+        if parse_mode:
+            payload["parse_mode"] = parse_mode
+        return payload
+
+    @staticmethod
+    def _photo_payload(chat_id: str, caption: Optional[str], parse_mode: Optional[str]) -> Dict[str, Any]:
+        data: Dict[str, Any] = {'chat_id': chat_id}
+        if caption:
+            data['caption'] = caption
+        if parse_mode:
+            data['parse_mode'] = parse_mode
+        return data
+
+    @staticmethod
+    def _read_file(path: str) -> bytes:
+        with open(path, 'rb') as f:
+            return f.read()
+
+
+# 全局实例
+telegram_client = TelegramClient()
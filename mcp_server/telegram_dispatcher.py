@@ -0,0 +1,293 @@
+"""
+Telegram 推送调度器 - 令牌桶限速、按 chat 合并消息、持久化重试队列
+
+用于批量推送（提醒通知、晨报/晚报），交互式回复仍直接调用 send_telegram_message。
+"""
+import json
+import os
+import threading
+import time
+import uuid
+from typing import Any, Dict, List, Optional
+
+from .telegram_client import telegram_client
+
+# Telegram 单条消息长度上限
+MAX_MESSAGE_LENGTH = 4096
+COALESCE_SEPARATOR = "\n\n"
+
+
+class TokenBucket:
+    """令牌桶：以 rate 个/秒补充，最多积攒 capacity 个"""
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+
+    def _refill(self, now: float):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self) -> float:
+        """距离下一个令牌可用的秒数（0 表示当前可用）"""
+        self._refill(time.monotonic())
+        return 0.0 if self.tokens >= 1 else (1 - self.tokens) / self.rate
+
+    def consume(self):
+        self._refill(time.monotonic())
+        self.tokens -= 1
+
+    def pause(self, seconds: float):
+        """清空令牌并暂停 seconds 秒（收到 429 retry_after 时使用）"""
+        self._refill(time.monotonic())
+        self.tokens = min(self.tokens, 1 - seconds * self.rate)
+
+    @property
+    def is_full(self) -> bool:
+        self._refill(time.monotonic())
+        return self.tokens >= self.capacity
+
+
+class OutboundDispatcher:
+    """推送调度器
+
+    - 全局限速 TELEGRAM_GLOBAL_RATE 条/秒；单个私聊 TELEGRAM_CHAT_RATE 条/秒，
+      群组（chat_id 以 '-' 开头）TELEGRAM_GROUP_RATE_PER_MIN 条/分钟
+    - 同一 chat 尚未发出的消息合并为一条（不超过 4096 字符）
+    - 待发送队列持久化到 outbox_path；429 按 retry_after 延后，网络/服务端错误指数退避，
+      超过 TELEGRAM_MAX_ATTEMPTS 次或其他 4xx 错误时丢弃
+    """
+
+    def __init__(self, outbox_path: str = "data/outbox/telegram.json"):
+        self.outbox_path = outbox_path
+        os.makedirs(os.path.dirname(outbox_path), exist_ok=True)
+        self.global_rate = float(os.getenv("TELEGRAM_GLOBAL_RATE", "30"))
+        self.chat_rate = float(os.getenv("TELEGRAM_CHAT_RATE", "1"))
+        self.group_rate = float(os.getenv("TELEGRAM_GROUP_RATE_PER_MIN", "20")) / 60
+        self.max_attempts = int(os.getenv("TELEGRAM_MAX_ATTEMPTS", "5"))
+        self.backoff_base = 2.0
+
+        self._global_bucket = TokenBucket(self.global_rate, self.global_rate)
+        self._chat_buckets: Dict[str, TokenBucket] = {}
+        self._queue: List[Dict[str, Any]] = self._load()
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._worker: Optional[threading.Thread] = None
+        self._stopping = False
+
+    # ---------- 入队 ----------
+
+    def enqueue(self, chat_id: str, text: str, parse_mode: Optional[str] = None) -> str:
+        """加入待发送队列（与该 chat 尚未发出的同类消息合并）
+
+        Returns:
+            消息所在的队列项 id
+        """
+        chat_id = str(chat_id)
+        with self._lock:
+            for item in reversed(self._queue):
+                if item["chat_id"] != chat_id:
+                    continue
+                if item.get("sending"):
+                    break
+                merged_len = len(item["text"]) + len(COALESCE_SEPARATOR) + len(text)
+                if item["parse_mode"] == parse_mode and merged_len <= MAX_MESSAGE_LENGTH:
+                    item["text"] += COALESCE_SEPARATOR + text
+                    item["coalesced"] = item.get("coalesced", 1) + 1
+                    self._save()
+                    self._wake.set()
+                    return item["id"]
+                break
+
+            item = {
+                "id": uuid.uuid4().hex,
+                "chat_id": chat_id,
+                "text": text,
+                "parse_mode": parse_mode,
+                "attempts": 0,
+                "next_attempt": 0.0,
+                "created_at": time.time(),
+            }
+            self._queue.append(item)
+            self._save()
+        self._wake.set()
+        return item["id"]
+
+    def pending_count(self) -> int:
+        with self._lock:
+            return len(self._queue)
+
+    # ---------- 发送 ----------
+
+    def flush(self, timeout: Optional[float] = None) -> Dict[str, int]:
+        """按限速发送队列中的消息，直到队列为空或超时（剩余消息保留在队列中）
+
+        Returns:
+            {'sent': ..., 'retried': ..., 'dropped': ...}
+        """
+        stats = {"sent": 0, "retried": 0, "dropped": 0}
+        deadline = time.monotonic() + timeout if timeout is not None else None
+
+        while not self._stopping:
+            item, wait = self._next_sendable()
+            if item is None:
+                if wait is None:
+                    break  # 队列为空
+                if deadline is not None:
+                    wait = min(wait, deadline - time.monotonic())
+                    if wait <= 0:
+                        break
+                self._wake.wait(timeout=wait)
+                self._wake.clear()
+                continue
+
+            global_wait = self._global_bucket.wait_time()
+            if global_wait > 0:
+                time.sleep(global_wait)
+            self._global_bucket.consume()
+            self._bucket(item["chat_id"]).consume()
+
+            result = telegram_client.send_message(item["chat_id"], item["text"], parse_mode=item["parse_mode"])
+            stats[self._handle_result(item, result)] += 1
+
+        self._prune_buckets()
+        return stats
+
+    def start(self):
+        """启动后台发送线程（入队后自动发送）"""
+        if self._worker is not None:
+            return
+        self._stopping = False
+        self._worker = threading.Thread(target=self._run, name="telegram-dispatcher", daemon=True)
+        self._worker.start()
+
+    def stop(self):
+        self._stopping = True
+        self._wake.set()
+        if self._worker is not None:
+            self._worker.join(timeout=5)
+            self._worker = None
+
+    def _run(self):
+        while not self._stopping:
+            try:
+                self.flush()
+            except Exception as e:
+                print(f"[推送调度] 发送异常: {e}")
+            self._wake.wait()
+            self._wake.clear()
+
+    def _next_sendable(self):
+        """取出下一条可发送的消息；没有时返回需要等待的秒数（队列为空时为 None）"""
+        now = time.time()
+        with self._lock:
+            if not any(not item.get("sending") for item in self._queue):
+                return None, None
+            wait = None
+            for item in self._queue:
+                if item.get("sending"):
+                    continue
+                due_in = item["next_attempt"] - now
+                bucket_wait = self._bucket(item["chat_id"]).wait_time()
+                item_wait = max(due_in, bucket_wait, 0.0)
+                if item_wait == 0:
+                    # 发送中的消息仍保留在持久化队列中，但期间新入队的消息不会合并进来
+                    item["sending"] = True
+                    return item, None
+                wait = item_wait if wait is None else min(wait, item_wait)
+            return None, wait
+
+    def _handle_result(self, item: Dict[str, Any], result: Dict[str, Any]) -> str:
+        if result.get("success"):
+            with self._lock:
+                self._remove(item)
+                self._save()
+            return "sent"
+
+        item["attempts"] += 1
+        error_code = result.get("error_code")
+        retry_after = result.get("retry_after")
+        if retry_after is not None:
+            # 429：该 chat 暂停 retry_after 秒，消息不计入失败次数上限
+            item["attempts"] -= 1
+            item["next_attempt"] = time.time() + float(retry_after)
+            self._bucket(item["chat_id"]).pause(float(retry_after))
+            print(f"[推送调度] {item['chat_id']} 触发限流，{retry_after} 秒后重试")
+        elif (error_code is not None and 400 <= int(error_code) < 500) or item["attempts"] >= self.max_attempts:
+            # 其他 4xx（如用户已屏蔽机器人）重试无意义
+            print(f"[推送调度] 丢弃发往 {item['chat_id']} 的消息（第 {item['attempts']} 次）: {result.get('error')}")
+            with self._lock:
+                self._remove(item)
+                self._save()
+            return "dropped"
+        else:
+            item["next_attempt"] = time.time() + self.backoff_base ** item["attempts"]
+            print(f"[推送调度] 发往 {item['chat_id']} 失败，稍后重试（第 {item['attempts']} 次）: {result.get('error')}")
+
+        with self._lock:
+            self._requeue(item)
+            self._save()
+        return "retried"
+
+    def _remove(self, item: Dict[str, Any]):
+        self._queue = [other for other in self._queue if other["id"] != item["id"]]
+
+    def _requeue(self, item: Dict[str, Any]):
+        """放回队首，并把期间新入队的同 chat 消息合并到其后"""
+        item["sending"] = False
+        self._remove(item)
+        for index, other in enumerate(self._queue):
+            if other["chat_id"] != item["chat_id"]:
+                continue
+            if other["parse_mode"] != item["parse_mode"]:
+                break
+            if len(item["text"]) + len(COALESCE_SEPARATOR) + len(other["text"]) <= MAX_MESSAGE_LENGTH:
+                item["text"] += COALESCE_SEPARATOR + other["text"]
+                item["coalesced"] = item.get("coalesced", 1) + other.get("coalesced", 1)
+                del self._queue[index]
+            break
+        self._queue.insert(0, item)
+
+    def _bucket(self, chat_id: str) -> TokenBucket:
+        bucket = self._chat_buckets.get(chat_id)
+        if bucket is None:
+            rate = self.group_rate if chat_id.startswith("-") else self.chat_rate
+            bucket = self._chat_buckets[chat_id] = TokenBucket(rate, 1)
+        return bucket
+
+    def _prune_buckets(self):
+        with self._lock:
+            active = {item["chat_id"] for item in self._queue}
+            for chat_id in [c for c, b in self._chat_buckets.items() if c not in active and b.is_full]:
+                del self._chat_buckets[chat_id]
+
+    # ---------- 持久化 ----------
+
+    def _load(self) -> List[Dict[str, Any]]:
+        if not os.path.exists(self.outbox_path):
+            return []
+        try:
+            with open(self.outbox_path, "r", encoding="utf-8") as f:
+                queue = json.load(f)
+            # 上次退出时正在发送的消息视为未发送
+            for item in queue:
+                item["sending"] = False
+            return queue
+        except Exception as e:
+            print(f"[推送调度] 读取待发送队列失败: {e}")
+            return []
+
+    def _save(self):
+        tmp_path = self.outbox_path + ".tmp"
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(self._queue, f, ensure_ascii=False)
+            os.replace(tmp_path, self.outbox_path)
+        except Exception as e:
+            print(f"[推送调度] 保存待发送队列失败: {e}")
+
+
+# 全局实例（定时任务推送使用；独立进程请使用各自的 outbox_path）
+outbound_dispatcher = OutboundDispatcher()
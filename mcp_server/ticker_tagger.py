@@ -0,0 +1,158 @@
+"""
+新闻股票代码标注 - 入库时用一个预编译正则匹配股票代码与公司名称，填充新闻的 tickers 字段
+
+词典来源：自选股（watchlist）、护城河白名单、data/universes/ 下的股票池（含公司名称列时一并收录）
+"""
+import os
+import re
+import threading
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from .state_store import WATCHLIST_FILE, get_watchlist
+from .tools.data_providers.universe_provider import (
+    MOAT_TICKERS, UNIVERSE_DIR, list_universes, load_universe, load_universe_names,
+)
+
+# 护城河白名单的常用公司名称（股票池 CSV 中的名称会自动补充）
+COMPANY_NAMES = {
+    "NVDA": ["Nvidia"], "AMD": ["Advanced Micro Devices"], "TSM": ["TSMC", "Taiwan Semiconductor"],
+    "ASML": ["ASML"], "AVGO": ["Broadcom"], "QCOM": ["Qualcomm"],
+    "MSFT": ["Microsoft"], "AMZN": ["Amazon"], "GOOGL": ["Alphabet", "Google"],
+    "META": ["Meta Platforms", "Facebook"], "ORCL": ["Oracle"], "SNOW": ["Snowflake"], "CRM": ["Salesforce"],
+    "AAPL": ["Apple"], "TSLA": ["Tesla"], "MCD": ["McDonald's", "McDonalds"], "SBUX": ["Starbucks"],
+    "KO": ["Coca-Cola"], "JNJ": ["Johnson & Johnson"], "PG": ["Procter & Gamble"],
+    "COST": ["Costco"], "WMT": ["Walmart"], "HD": ["Home Depot"],
+    "V": ["Visa"], "MA": ["Mastercard"], "PYPL": ["PayPal"], "SOFI": ["SoFi"],
+}
+
+# 与常见英文缩写/单词相同的代码：只在 $NVDA、(V)、NYSE:V 这类明确写法中识别
+AMBIGUOUS_SYMBOLS = {
+    "A", "AI", "ALL", "AM", "AN", "ARE", "AT", "BE", "BIG", "BY", "CAR", "CEO", "CPI", "DO", "EPS",
+    "ETF", "EV", "FAST", "FOR", "FUN", "GDP", "GO", "GOOD", "HAS", "HE", "IN", "IPO", "IS", "IT",
+    "KEY", "LOW", "ME", "MY", "NEW", "NO", "NOW", "ON", "ONE", "OPEN", "OR", "PLAY", "REAL", "SO",
+    "TECH", "TRUE", "UP", "US", "USA", "WE", "WELL",
+}
+
+# 公司名称中去掉的后缀（"Apple Inc." -> "Apple"）
+_NAME_SUFFIX = re.compile(
+    r"[,.]?\s+(Inc|Incorporated|Corp|Corporation|Co|Company|Ltd|Limited|plc|PLC|Holdings?|Group|"
+    r"N\.V|S\.A|AG|SE|Class [A-C]|\(The\))\.?$"
+)
+
+
+def _clean_name(name: str) -> str:
+    previous = None
+    while previous != name:
+        previous, name = name, _NAME_SUFFIX.sub("", name).strip()
+    return name
+
+
+def _alternation(words: Iterable[str]) -> str:
+    # 长的优先，避免 "Meta" 抢先匹配 "Meta Platforms"
+    return "|".join(re.escape(w) for w in sorted(set(words), key=len, reverse=True))
+
+
+class TickerTagger:
+    """股票代码标注器
+
+    所有代码与公司名称编译为一个正则，对标题+摘要只扫描一遍：
+    - 明确写法：$NVDA、(NVDA)、NASDAQ:NVDA —— 识别全部代码
+    - 裸写的大写代码：NVDA —— 仅识别非歧义代码（AMBIGUOUS_SYMBOLS 及 2 个字母以内的除外）
+    - 公司名称：整词匹配；单个单词的名称（Apple、Visa、Target）区分大小写，
+      避免 "apple pie"、"visa application" 之类的普通词被标注；多个单词的名称不区分大小写
+    """
+
+    def __init__(self, symbols: Iterable[str], names: Optional[Dict[str, List[str]]] = None):
+        self._by_symbol: Dict[str, str] = {}
+        for symbol in symbols:
+            symbol = symbol.upper()
+            self._by_symbol[symbol] = symbol
+            if "-" in symbol:
+                self._by_symbol[symbol.replace("-", ".")] = symbol  # BRK-B 在新闻中通常写作 BRK.B
+
+        self._by_name: Dict[str, str] = {}  # 多单词名称，键为小写
+        self._by_word: Dict[str, str] = {}  # 单单词名称，键保留原始大小写
+        for symbol, aliases in (names or {}).items():
+            for alias in aliases:
+                alias = _clean_name(alias)
+                if len(alias) < 3:
+                    continue
+                if re.search(r"\s", alias):
+                    self._by_name[alias.lower()] = symbol.upper()
+                else:
+                    self._by_word[alias] = symbol.upper()
+
+        safe = [s for s in self._by_symbol if len(s) > 2 and s not in AMBIGUOUS_SYMBOLS]
+        parts = []
+        if self._by_symbol:
+            all_symbols = _alternation(self._by_symbol)
+            parts.append(
+                rf"(?:\$|\b(?:NYSE|NASDAQ|Nasdaq|NYSEARCA|AMEX)\s?:\s?)(?P<explicit>{all_symbols})(?![\w.-])"
+                rf"|\((?P<paren>{all_symbols})\)"
+            )
+        if safe:
+            parts.append(rf"(?<![\w$.-])(?P<bare>{_alternation(safe)})(?![\w-]|\.\w)")
+        if self._by_name:
+            parts.append(rf"(?i:(?<!\w)(?P<name>{_alternation(self._by_name)})(?!\w))")
+        if self._by_word:
+            parts.append(rf"(?<!\w)(?P<word>{_alternation(self._by_word)})(?!\w)")
+        self._pattern = re.compile("|".join(parts)) if parts else None
+
+    def tag(self, text: str) -> List[str]:
+        """返回文本中提到的股票代码（按首次出现顺序去重）"""
+        if not text or self._pattern is None:
+            return []
+        found: Dict[str, None] = {}
+        for match in self._pattern.finditer(text):
+            kind = match.lastgroup
+            if kind == "name":
+                symbol = self._by_name.get(match.group(kind).lower())
+            elif kind == "word":
+                symbol = self._by_word.get(match.group(kind))
+            else:
+                symbol = self._by_symbol.get(match.group(kind))
+            if symbol:
+                found[symbol] = None
+        return list(found)
+
+    def tag_event(self, event: Dict) -> Dict:
+        """填充新闻事件的 tickers 字段（保留已有的代码）"""
+        tickers = self.tag(f"{event.get('title', '')}\n{event.get('summary', '')}")
+        event["tickers"] = list(dict.fromkeys(list(event.get("tickers") or []) + tickers))
+        return event
+
+
+def _dictionary_version() -> Tuple:
+    """词典来源文件的修改时间，变化时重建标注器"""
+    paths = [WATCHLIST_FILE] + [str(UNIVERSE_DIR / f"{name}.csv") for name in list_universes()]
+    return tuple((p, os.path.getmtime(p)) for p in paths if os.path.exists(p))
+
+
+def build_default_tagger() -> TickerTagger:
+    """由自选股、护城河白名单和全部本地股票池构建标注器"""
+    symbols = list(MOAT_TICKERS) + list(get_watchlist())
+    names: Dict[str, List[str]] = {symbol: list(aliases) for symbol, aliases in COMPANY_NAMES.items()}
+    for universe in list_universes():
+        try:
+            symbols.extend(load_universe(universe))
+            for symbol, name in load_universe_names(universe).items():
+                names.setdefault(symbol, []).append(name)
+        except Exception as e:
+            print(f"[代码标注] 读取股票池 {universe} 失败: {e}")
+    return TickerTagger(symbols, names)
+
+
+_tagger: Optional[TickerTagger] = None
+_tagger_version: Optional[Tuple] = None
+_tagger_lock = threading.Lock()
+
+
+def get_tagger() -> TickerTagger:
+    """获取标注器（自选股或股票池文件变化后自动重建）"""
+    global _tagger, _tagger_version
+    version = _dictionary_version()
+    with _tagger_lock:
+        if _tagger is None or version != _tagger_version:
+            _tagger = build_default_tagger()
+            _tagger_version = version
+        return _tagger
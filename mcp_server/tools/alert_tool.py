@@ -5,6 +5,7 @@ from langchain.tools import BaseTool
 from typing import Optional
 from pydantic import BaseModel, Field
 from ..alert_manager import alert_manager
+from .async_utils import run_blocking
 
 class AlertInput(BaseModel):
     """Alert tool input schema"""
@@ -132,5 +133,8 @@ class SmartAlertTool(BaseTool):
         
         return output
     
-    def _arun(self, **kwargs):
-        raise NotImplementedError("异步暂不支持")
+    async def _arun(self, action: str, user_id: str = "default", symbol: str = None,
+                    alert_type: str = None, threshold: float = None) -> str:
+        """异步执行：行情获取与文件读写放到共享线程池"""
+        return await run_blocking(self._run, action=action, user_id=user_id, symbol=symbol,
+                                  alert_type=alert_type, threshold=threshold)
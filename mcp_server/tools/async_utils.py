@@ -0,0 +1,20 @@
+"""
+工具异步执行辅助 - 将阻塞调用（yfinance、文件 I/O、绘图）放到共享线程池，避免阻塞事件循环
+"""
+import asyncio
+import functools
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable
+
+# 所有工具共享的有界线程池，限制同时进行的阻塞调用数量
+_executor = ThreadPoolExecutor(
+    max_workers=int(os.getenv("TOOL_THREAD_WORKERS", "16")),
+    thread_name_prefix="tool-worker",
+)
+
+
+async def run_blocking(func: Callable[..., Any], *args, **kwargs) -> Any:
+    """在共享线程池中执行阻塞函数并等待结果"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_executor, functools.partial(func, *args, **kwargs))
@@ -4,13 +4,18 @@
 from langchain.tools import BaseTool
 from typing import Optional
 from pydantic import BaseModel, Field
-import yfinance as yf
 import matplotlib
 matplotlib.use('Agg')  # 使用非交互式后端
 import matplotlib.pyplot as plt
 import pandas_ta as ta
+import threading
 from datetime import datetime
 from pathlib import Path
+from .data_providers.price_cache import price_cache
+from .async_utils import run_blocking
+
+# pyplot 使用全局状态，非线程安全：并发生成图表时串行绘图（数据获取在锁外进行）
+_PLOT_LOCK = threading.Lock()
 
 class ChartInput(BaseModel):
     """Chart tool input schema"""
@@ -65,11 +70,10 @@ class ChartGeneratorTool(BaseTool):
         
         symbol = symbol.upper()
         
-        # 获取数据
-        ticker = yf.Ticker(symbol)
-        hist = ticker.history(period=period)
+        # 获取数据（经本地日线缓存）
+        hist = price_cache.get_history(symbol, period)
         
-        if hist.empty:
+        if hist is None:
             return f"❌ 无法获取 {symbol} 的历史数据"
         
         data_points = len(hist)
@@ -90,45 +94,47 @@ class ChartGeneratorTool(BaseTool):
         if show_sma200:
             hist['SMA200'] = ta.sma(hist['Close'], length=200)
         
-        # 创建图表
-        fig, ax = plt.subplots(figsize=(12, 6))
-        
-        # 绘制价格
-        ax.plot(hist.index, hist['Close'], label='Price', linewidth=2, color='#2E86DE')
-        
-        # 绘制可用的均线（只绘制非NaN部分）
-        if show_sma20:
-            valid_sma20 = hist['SMA20'].dropna()
-            if len(valid_sma20) > 0:
-                ax.plot(valid_sma20.index, valid_sma20, label='SMA20', 
-                       linewidth=1.5, color='#FFA502', alpha=0.8)
-        
-        if show_sma50:
-            valid_sma50 = hist['SMA50'].dropna()
-            if len(valid_sma50) > 0:
-                ax.plot(valid_sma50.index, valid_sma50, label='SMA50', 
-                       linewidth=1.5, color='#FF6B6B', alpha=0.8)
-        
-        if show_sma200:
-            valid_sma200 = hist['SMA200'].dropna()
-            if len(valid_sma200) > 0:
-                ax.plot(valid_sma200.index, valid_sma200, label='SMA200', 
-                       linewidth=1.5, color='#4ECDC4', alpha=0.8)
-        
-        # 设置标题和标签
-        title = f'{symbol} Price Chart ({period}, {data_points} days)'
-        ax.set_title(title, fontsize=16, fontweight='bold')
-        ax.set_xlabel('Date', fontsize=12)
-        ax.set_ylabel('Price ($)', fontsize=12)
-        ax.legend(loc='best')
-        ax.grid(True, alpha=0.3)
-        
-        # 保存图表
-        filename = f"{symbol}_price_{datetime.now().strftime('%Y%m%d_%H%M%S')}.png"
-        filepath = self.chart_dir / filename
-        plt.tight_layout()
-        plt.savefig(filepath, dpi=100, bbox_inches='tight')
-        plt.close()
+        # 只在绘图与保存期间持有 pyplot 锁，数据获取与指标计算可并发
+        with _PLOT_LOCK:
+            # 创建图表
+            fig, ax = plt.subplots(figsize=(12, 6))
+        
+            # 绘制价格
+            ax.plot(hist.index, hist['Close'], label='Price', linewidth=2, color='#2E86DE')
+        
+            # 绘制可用的均线（只绘制非NaN部分）
+            if show_sma20:
+                valid_sma20 = hist['SMA20'].dropna()
+                if len(valid_sma20) > 0:
+                    ax.plot(valid_sma20.index, valid_sma20, label='SMA20', 
+                           linewidth=1.5, color='#FFA502', alpha=0.8)
+        
+            if show_sma50:
+                valid_sma50 = hist['SMA50'].dropna()
+                if len(valid_sma50) > 0:
+                    ax.plot(valid_sma50.index, valid_sma50, label='SMA50', 
+                           linewidth=1.5, color='#FF6B6B', alpha=0.8)
+        
+            if show_sma200:
+                valid_sma200 = hist['SMA200'].dropna()
+                if len(valid_sma200) > 0:
+                    ax.plot(valid_sma200.index, valid_sma200, label='SMA200', 
+                           linewidth=1.5, color='#4ECDC4', alpha=0.8)
+        
+            # 设置标题和标签
+            title = f'{symbol} Price Chart ({period}, {data_points} days)'
+            ax.set_title(title, fontsize=16, fontweight='bold')
+            ax.set_xlabel('Date', fontsize=12)
+            ax.set_ylabel('Price ($)', fontsize=12)
+            ax.legend(loc='best')
+            ax.grid(True, alpha=0.3)
+        
+            # 保存图表
+            filename = f"{symbol}_price_{datetime.now().strftime('%Y%m%d_%H%M%S')}.png"
+            filepath = self.chart_dir / filename
+            plt.tight_layout()
+            plt.savefig(filepath, dpi=100, bbox_inches='tight')
+            plt.close()
         
         # 生成结果信息
         result = f"✅ 图表已生成: {filepath}\n\n"
@@ -157,11 +163,10 @@ class ChartGeneratorTool(BaseTool):
         
         symbol = symbol.upper()
         
-        # 获取数据
-        ticker = yf.Ticker(symbol)
-        hist = ticker.history(period=period)
+        # 获取数据（经本地日线缓存）
+        hist = price_cache.get_history(symbol, period)
         
-        if hist.empty:
+        if hist is None:
             return f"❌ 无法获取 {symbol} 的历史数据"
         
         data_points = len(hist)
@@ -180,56 +185,58 @@ class ChartGeneratorTool(BaseTool):
             hist['SMA200'] = ta.sma(hist['Close'], length=200)
         hist['RSI'] = ta.rsi(hist['Close'], length=14)
         
-        # 创建子图
-        fig, (ax1, ax2) = plt.subplots(2, 1, figsize=(12, 8), 
-                                        gridspec_kw={'height_ratios': [3, 1]})
-        
-        # 上图：价格和均线
-        ax1.plot(hist.index, hist['Close'], label='Price', linewidth=2, color='#2E86DE')
-        
-        # 绘制可用的均线
-        if show_sma20:
-            valid_sma20 = hist['SMA20'].dropna()
-            if len(valid_sma20) > 0:
-                ax1.plot(valid_sma20.index, valid_sma20, label='SMA20', 
-                        linewidth=1.5, color='#FFA502', alpha=0.8)
-        
-        if show_sma50:
-            valid_sma50 = hist['SMA50'].dropna()
-            if len(valid_sma50) > 0:
-                ax1.plot(valid_sma50.index, valid_sma50, label='SMA50', 
-                        linewidth=1.5, color='#FF6B6B', alpha=0.8)
-        
-        if show_sma200:
-            valid_sma200 = hist['SMA200'].dropna()
-            if len(valid_sma200) > 0:
-                ax1.plot(valid_sma200.index, valid_sma200, label='SMA200', 
-                        linewidth=1.5, color='#4ECDC4', alpha=0.8)
-        
-        title = f'{symbol} Price & RSI Chart ({period}, {data_points} days)'
-        ax1.set_title(title, fontsize=16, fontweight='bold')
-        ax1.set_ylabel('Price ($)', fontsize=12)
-        ax1.legend(loc='best')
-        ax1.grid(True, alpha=0.3)
-        
-        # 下图：RSI
-        ax2.plot(hist.index, hist['RSI'], label='RSI', linewidth=2, color='#9B59B6')
-        ax2.axhline(y=70, color='r', linestyle='--', alpha=0.5, label='Overbought (70)')
-        ax2.axhline(y=30, color='g', linestyle='--', alpha=0.5, label='Oversold (30)')
-        ax2.fill_between(hist.index, 30, 70, alpha=0.1, color='gray')
-        
-        ax2.set_xlabel('Date', fontsize=12)
-        ax2.set_ylabel('RSI', fontsize=12)
-        ax2.set_ylim(0, 100)
-        ax2.legend(loc='best')
-        ax2.grid(True, alpha=0.3)
-        
-        # 保存图表
-        filename = f"{symbol}_price_rsi_{datetime.now().strftime('%Y%m%d_%H%M%S')}.png"
-        filepath = self.chart_dir / filename
-        plt.tight_layout()
-        plt.savefig(filepath, dpi=100, bbox_inches='tight')
-        plt.close()
+        # 只在绘图与保存期间持有 pyplot 锁，数据获取与指标计算可并发
+        with _PLOT_LOCK:
+            # 创建子图
+            fig, (ax1, ax2) = plt.subplots(2, 1, figsize=(12, 8), 
+                                            gridspec_kw={'height_ratios': [3, 1]})
+        
+            # 上图：价格和均线
+            ax1.plot(hist.index, hist['Close'], label='Price', linewidth=2, color='#2E86DE')
+        
+            # 绘制可用的均线
+            if show_sma20:
+                valid_sma20 = hist['SMA20'].dropna()
+                if len(valid_sma20) > 0:
+                    ax1.plot(valid_sma20.index, valid_sma20, label='SMA20', 
+                            linewidth=1.5, color='#FFA502', alpha=0.8)
+        
+            if show_sma50:
+                valid_sma50 = hist['SMA50'].dropna()
+                if len(valid_sma50) > 0:
+                    ax1.plot(valid_sma50.index, valid_sma50, label='SMA50', 
+                            linewidth=1.5, color='#FF6B6B', alpha=0.8)
+        
+            if show_sma200:
+                valid_sma200 = hist['SMA200'].dropna()
+                if len(valid_sma200) > 0:
+                    ax1.plot(valid_sma200.index, valid_sma200, label='SMA200', 
+                            linewidth=1.5, color='#4ECDC4', alpha=0.8)
+        
+            title = f'{symbol} Price & RSI Chart ({period}, {data_points} days)'
+            ax1.set_title(title, fontsize=16, fontweight='bold')
+            ax1.set_ylabel('Price ($)', fontsize=12)
+            ax1.legend(loc='best')
+            ax1.grid(True, alpha=0.3)
+        
+            # 下图：RSI
+            ax2.plot(hist.index, hist['RSI'], label='RSI', linewidth=2, color='#9B59B6')
+            ax2.axhline(y=70, color='r', linestyle='--', alpha=0.5, label='Overbought (70)')
+            ax2.axhline(y=30, color='g', linestyle='--', alpha=0.5, label='Oversold (30)')
+            ax2.fill_between(hist.index, 30, 70, alpha=0.1, color='gray')
+        
+            ax2.set_xlabel('Date', fontsize=12)
+            ax2.set_ylabel('RSI', fontsize=12)
+            ax2.set_ylim(0, 100)
+            ax2.legend(loc='best')
+            ax2.grid(True, alpha=0.3)
+        
+            # 保存图表
+            filename = f"{symbol}_price_rsi_{datetime.now().strftime('%Y%m%d_%H%M%S')}.png"
+            filepath = self.chart_dir / filename
+            plt.tight_layout()
+            plt.savefig(filepath, dpi=100, bbox_inches='tight')
+            plt.close()
         
         current_price = hist['Close'].iloc[-1]
         current_rsi = hist['RSI'].iloc[-1]
@@ -247,16 +254,7 @@ class ChartGeneratorTool(BaseTool):
         
         # 获取当前价格并计算市值
         symbols = list(set(h["symbol"] for h in holdings))
-        current_prices = {}
-        
-        for symbol in symbols:
-            try:
-                ticker = yf.Ticker(symbol)
-                hist = ticker.history(period="1d")
-                if not hist.empty:
-                    current_prices[symbol] = hist['Close'].iloc[-1]
-            except:
-                current_prices[symbol] = None
+        current_prices = price_cache.get_latest_prices(symbols)
         
         # 计算每只股票的市值
         values = {}
@@ -269,31 +267,36 @@ class ChartGeneratorTool(BaseTool):
         if not values:
             return "❌ 无法获取持仓股票的当前价格"
         
-        # 创建饼图
-        fig, ax = plt.subplots(figsize=(10, 8))
+        # 只在绘图与保存期间持有 pyplot 锁，数据获取与指标计算可并发
+        with _PLOT_LOCK:
+            # 创建饼图
+            fig, ax = plt.subplots(figsize=(10, 8))
         
-        labels = list(values.keys())
-        sizes = list(values.values())
-        colors = plt.cm.Set3(range(len(labels)))
+            labels = list(values.keys())
+            sizes = list(values.values())
+            colors = plt.cm.Set3(range(len(labels)))
         
-        # 计算百分比
-        total = sum(sizes)
-        percentages = [f'{label}\n${size:,.0f}\n({size/total*100:.1f}%)' 
-                      for label, size in zip(labels, sizes)]
+            # 计算百分比
+            total = sum(sizes)
+            percentages = [f'{label}\n${size:,.0f}\n({size/total*100:.1f}%)' 
+                          for label, size in zip(labels, sizes)]
         
-        ax.pie(sizes, labels=percentages, colors=colors, autopct='',
-               startangle=90, textprops={'fontsize': 10})
-        ax.set_title(f'Portfolio Distribution (Total: ${total:,.0f})', 
-                    fontsize=16, fontweight='bold')
+            ax.pie(sizes, labels=percentages, colors=colors, autopct='',
+                   startangle=90, textprops={'fontsize': 10})
+            ax.set_title(f'Portfolio Distribution (Total: ${total:,.0f})', 
+                        fontsize=16, fontweight='bold')
         
-        # 保存图表
-        filename = f"portfolio_{datetime.now().strftime('%Y%m%d_%H%M%S')}.png"
-        filepath = self.chart_dir / filename
-        plt.tight_layout()
-        plt.savefig(filepath, dpi=100, bbox_inches='tight')
-        plt.close()
+            # 保存图表
+            filename = f"portfolio_{datetime.now().strftime('%Y%m%d_%H%M%S')}.png"
+            filepath = self.chart_dir / filename
+            plt.tight_layout()
+            plt.savefig(filepath, dpi=100, bbox_inches='tight')
+            plt.close()
         
         return f"✅ 持仓饼图已生成: {filepath}\n\n总市值: ${total:,.2f}"
     
-    def _arun(self, **kwargs):
-        raise NotImplementedError("异步暂不支持")
+    async def _arun(self, chart_type: str, symbol: str = None, period: str = "3mo",
+                    user_id: str = "default") -> str:
+        """异步执行：数据获取与绘图（CPU 密集）放到共享线程池"""
+        return await run_blocking(self._run, chart_type=chart_type, symbol=symbol,
+                                  period=period, user_id=user_id)
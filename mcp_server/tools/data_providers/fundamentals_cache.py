@@ -0,0 +1,96 @@
+"""
+季度财务数据缓存 - 按股票持久化营收/盈利/自由现金流序列
+"""
+import json
+import os
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Dict, Optional
+
+import pandas as pd
+
+SERIES_KEYS = ("revenue", "earnings", "fcf")
+
+
+class FundamentalsCache:
+    """财务数据缓存
+
+    - 每只股票一个 JSON 文件：{cache_dir}/{SYMBOL}.json
+    - 超过 TTL，或已过下一次财报日（含宽限期）时失效
+    """
+
+    def __init__(self, cache_dir: str = "data/fundamentals", ttl_days: Optional[int] = None,
+                 earnings_grace_days: Optional[int] = None):
+        self.cache_dir = Path(cache_dir)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.ttl = timedelta(days=ttl_days if ttl_days is not None
+                             else int(os.getenv("FUNDAMENTALS_TTL_DAYS", "30")))
+        # 财报发布后 yfinance 的季度报表通常滞后几天才更新
+        self.earnings_grace = timedelta(days=earnings_grace_days if earnings_grace_days is not None
+                                        else int(os.getenv("FUNDAMENTALS_EARNINGS_GRACE_DAYS", "3")))
+
+    def _path(self, symbol: str) -> Path:
+        return self.cache_dir / f"{symbol.upper()}.json"
+
+    def get(self, symbol: str) -> Optional[Dict[str, pd.Series]]:
+        """读取未过期的缓存
+
+        Returns:
+            {'revenue': Series, 'earnings': Series, 'fcf': Series}，无缓存或已过期时返回 None
+        """
+        path = self._path(symbol)
+        if not path.exists():
+            return None
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                entry = json.load(f)
+
+            now = datetime.now()
+            if now - datetime.fromisoformat(entry["fetched_at"]) > self.ttl:
+                return None
+            next_earnings = entry.get("next_earnings_date")
+            if next_earnings and now > datetime.fromisoformat(next_earnings) + self.earnings_grace:
+                return None
+
+            return {key: self._to_series(entry["series"][key]) for key in SERIES_KEYS}
+        except Exception as e:
+            print(f"读取 {symbol} 财务缓存失败: {e}")
+            return None
+
+    def put(self, symbol: str, revenue: pd.Series, earnings: pd.Series, fcf: pd.Series,
+            next_earnings_date: Optional[datetime] = None):
+        """写入缓存（先写临时文件再替换，避免并发读到半个文件）"""
+        entry = {
+            "symbol": symbol.upper(),
+            "fetched_at": datetime.now().isoformat(),
+            "next_earnings_date": next_earnings_date.isoformat() if next_earnings_date else None,
+            "series": {
+                "revenue": self._from_series(revenue),
+                "earnings": self._from_series(earnings),
+                "fcf": self._from_series(fcf),
+            },
+        }
+        path = self._path(symbol)
+        tmp_path = path.with_suffix(".json.tmp")
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(entry, f, ensure_ascii=False, indent=2)
+            os.replace(tmp_path, path)
+        except Exception as e:
+            print(f"写入 {symbol} 财务缓存失败: {e}")
+
+    def _from_series(self, series: pd.Series) -> list:
+        """Series -> [[日期, 数值], ...]，保持原有顺序（最新季度在前）"""
+        return [[str(index), float(value)] for index, value in series.items()]
+
+    def _to_series(self, pairs: list) -> pd.Series:
+        index = [key for key, _ in pairs]
+        try:
+            index = pd.to_datetime(index, format="ISO8601")
+        except (ValueError, TypeError):
+            pass  # 旧版 quarterly_earnings 的索引为 '2Q2023' 形式
+        return pd.Series([value for _, value in pairs], index=index, dtype=float)
+
+
+# 全局实例
+fundamentals_cache = FundamentalsCache()
@@ -0,0 +1,72 @@
+"""
+向量化技术指标引擎 - 对 (股票 × 交易日) 收盘价矩阵一次性计算最新 SMA / RSI
+"""
+from typing import Dict, Sequence
+
+import numpy as np
+
+
+def build_close_matrix(closes: Sequence[np.ndarray]) -> np.ndarray:
+    """将各股票的收盘价序列右对齐为矩阵，较短的序列左侧以 NaN 填充
+
+    右对齐只要求每行的最后一列是该股票的最新收盘价，不要求各股票交易日历一致。
+    """
+    if not closes:
+        return np.empty((0, 0))
+    width = max(len(c) for c in closes)
+    matrix = np.full((len(closes), width), np.nan)
+    for i, close in enumerate(closes):
+        if len(close):
+            matrix[i, width - len(close):] = close
+    return matrix
+
+
+def latest_sma(matrix: np.ndarray, length: int) -> np.ndarray:
+    """每行最近 length 个收盘价的均值；窗口不足或含 NaN 时为 NaN（同 rolling(length).mean()）"""
+    if matrix.shape[1] < length:
+        return np.full(matrix.shape[0], np.nan)
+    return matrix[:, -length:].mean(axis=1)
+
+
+def latest_rsi(matrix: np.ndarray, length: int = 14) -> np.ndarray:
+    """每行最新的 RSI，与 pandas_ta.rsi 的默认算法一致
+
+    pandas_ta 以 ewm(alpha=1/length, adjust=True) 平滑涨跌幅，其最新值是带权平均：
+    第 i 个涨跌幅的权重为 (1 - alpha) ** (T - 1 - i)。涨、跌两侧的归一化分母相同，
+    RSI = 100 * 涨幅加权和 / (涨幅加权和 + 跌幅加权和)，可用一次矩阵-向量乘法得到。
+    """
+    rows = matrix.shape[0]
+    if matrix.shape[1] < 2:
+        return np.full(rows, np.nan)
+
+    diff = np.diff(matrix, axis=1)
+    valid = ~np.isnan(diff)
+    gains = np.where(valid, np.clip(diff, 0, None), 0.0)
+    losses = np.where(valid, np.clip(-diff, 0, None), 0.0)
+
+    alpha = 1.0 / length
+    weights = (1.0 - alpha) ** np.arange(diff.shape[1] - 1, -1, -1, dtype=float)
+    gain_sum = gains @ weights
+    loss_sum = losses @ weights
+
+    total = gain_sum + loss_sum
+    with np.errstate(invalid='ignore', divide='ignore'):
+        rsi = 100.0 * gain_sum / total
+    # 与 ewm(min_periods=length) 一致：有效涨跌幅不足 length 个时无值
+    rsi[valid.sum(axis=1) < length] = np.nan
+    rsi[total == 0] = np.nan
+    return rsi
+
+
+def compute_latest_indicators(matrix: np.ndarray, sma_lengths: Sequence[int] = (50, 200),
+                              rsi_length: int = 14) -> Dict[str, np.ndarray]:
+    """一次计算整个矩阵的最新指标
+
+    Returns:
+        {'price': ..., 'sma50': ..., 'sma200': ..., 'rsi': ...}，每个值为长度等于行数的数组
+    """
+    result = {'price': matrix[:, -1] if matrix.size else np.empty(0)}
+    for length in sma_lengths:
+        result[f'sma{length}'] = latest_sma(matrix, length)
+    result['rsi'] = latest_rsi(matrix, rsi_length)
+    return result
@@ -0,0 +1,337 @@
+"""
+本地日线缓存 - 按股票以 Parquet 列式存储 OHLCV，只增量拉取最新K线
+"""
+import json
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import pandas as pd
+import yfinance as yf
+
+OHLCV_COLUMNS = ['Open', 'High', 'Low', 'Close', 'Volume']
+
+# yfinance period -> 自然日跨度
+PERIOD_DAYS = {
+    "1d": 1, "5d": 5, "1mo": 31, "3mo": 92, "6mo": 183,
+    "1y": 366, "2y": 731, "5y": 1827, "10y": 3653,
+}
+
+# yf.download 内部使用模块级共享状态，多线程并发调用需串行化
+_DOWNLOAD_LOCK = threading.Lock()
+
+
+class PriceCache:
+    """日线数据缓存
+
+    - 每只股票一个 Parquet 文件：{cache_dir}/{SYMBOL}.parquet
+    - 再次请求时只下载最后已存K线之后的数据并追加
+    - 增量数据与已存数据在重叠K线上的收盘价不一致（分红/拆股复权）时整体重拉
+    """
+
+    def __init__(self, cache_dir: str = "data/price_cache", refresh_interval: Optional[int] = None):
+        self.cache_dir = Path(cache_dir)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        # 同一只股票两次联网刷新的最小间隔（秒）
+        self.refresh_interval = (
+            refresh_interval if refresh_interval is not None
+            else int(os.getenv("PRICE_CACHE_REFRESH_SEC", "60"))
+        )
+        self._coverage_file = self.cache_dir / "_coverage.json"
+        self._coverage: Optional[Dict[str, str]] = None
+        # 分片子进程中不直接写索引文件，更新暂存于此，由父进程统一合并（见 defer_coverage）
+        self._deferred_coverage: Optional[Dict[str, str]] = None
+        self._locks: Dict[str, threading.Lock] = {}
+        self._guard = threading.Lock()
+
+    # ---------- 对外接口 ----------
+
+    def get_history(self, symbol: str, period: str = "2y") -> Optional[pd.DataFrame]:
+        """获取单只股票的日线数据（优先读缓存，按需增量刷新）"""
+        return self.get_bulk_history([symbol], period).get(symbol.upper())
+
+    def get_bulk_history(self, symbols: List[str], period: str = "2y") -> Dict[str, pd.DataFrame]:
+        """批量获取日线数据，需要联网的股票合并为最多两次批量下载
+
+        Returns:
+            {SYMBOL: DataFrame}，无数据的股票不在结果中
+        """
+        symbols = list(dict.fromkeys(s.upper() for s in symbols if s))
+        start = self._period_start(period)
+        frames: Dict[str, pd.DataFrame] = {}
+        need_full: List[str] = []
+        need_tail: Dict[str, pd.DataFrame] = {}
+
+        # 按固定顺序加锁，避免并发批量请求互相死锁
+        locks = [self._lock_for(s) for s in sorted(symbols)]
+        for lock in locks:
+            lock.acquire()
+        try:
+            for symbol in symbols:
+                hist = self._load(symbol)
+                if hist is None or not self._covers(symbol, start):
+                    need_full.append(symbol)
+                elif self._is_stale(symbol):
+                    need_tail[symbol] = hist
+                else:
+                    frames[symbol] = hist
+
+            # 1. 增量：从倒数第二根已存K线开始拉取（最后一根可能是盘中未收盘数据）
+            if need_tail:
+                since = min(self._overlap_date(h) for h in need_tail.values())
+                fetched = self._fetch(list(need_tail), since)
+                for symbol, hist in need_tail.items():
+                    tail = fetched.get(symbol)
+                    merged = self._merge_tail(hist, tail)
+                    if merged is None:
+                        need_full.append(symbol)  # 复权变动，整体重拉
+                        continue
+                    self._save(symbol, merged)
+                    frames[symbol] = merged
+
+            # 2. 全量：无缓存、覆盖区间不足或复权变动
+            if need_full:
+                full_start = start
+                for symbol in need_full:
+                    if symbol in self._load_coverage():
+                        full_start = self._earliest(full_start, self._coverage_start(symbol))
+                fetched = self._fetch(need_full, full_start)
+                for symbol in need_full:
+                    hist = fetched.get(symbol)
+                    if hist is None:
+                        continue
+                    self._save(symbol, hist)
+                    self._set_coverage(symbol, full_start)
+                    frames[symbol] = hist
+        finally:
+            for lock in locks:
+                lock.release()
+
+        result: Dict[str, pd.DataFrame] = {}
+        for symbol in symbols:
+            hist = frames.get(symbol)
+            if hist is None:
+                continue
+            hist = self._slice_period(hist, period, start)
+            if not hist.empty:
+                result[symbol] = hist.copy()
+        return result
+
+    def get_latest_prices(self, symbols: List[str]) -> Dict[str, float]:
+        """获取最新收盘价 {SYMBOL: price}"""
+        frames = self.get_bulk_history(symbols, period="5d")
+        return {symbol: float(hist['Close'].iloc[-1]) for symbol, hist in frames.items()}
+
+    # ---------- 缓存读写 ----------
+
+    def _path(self, symbol: str) -> Path:
+        return self.cache_dir / f"{symbol}.parquet"
+
+    def _load(self, symbol: str) -> Optional[pd.DataFrame]:
+        path = self._path(symbol)
+        if not path.exists():
+            return None
+        try:
+            hist = pd.read_parquet(path)
+            return hist if not hist.empty else None
+        except Exception as e:
+            print(f"读取 {symbol} 日线缓存失败: {e}")
+            return None
+
+    def _save(self, symbol: str, hist: pd.DataFrame):
+        # 先写临时文件再原子替换：其他进程不会读到半个文件，写入中断也不会损坏已有缓存
+        path = self._path(symbol)
+        tmp_path = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+        try:
+            hist.to_parquet(tmp_path)
+            os.replace(tmp_path, path)
+        except Exception as e:
+            print(f"写入 {symbol} 日线缓存失败: {e}")
+            try:
+                tmp_path.unlink()
+            except OSError:
+                pass
+
+    def _is_stale(self, symbol: str) -> bool:
+        try:
+            return time.time() - self._path(symbol).stat().st_mtime > self.refresh_interval
+        except OSError:
+            return True
+
+    def _lock_for(self, symbol: str) -> threading.Lock:
+        with self._guard:
+            return self._locks.setdefault(symbol, threading.Lock())
+
+    # ---------- 覆盖区间 ----------
+
+    def _load_coverage(self) -> Dict[str, str]:
+        if self._coverage is None:
+            try:
+                with open(self._coverage_file, 'r', encoding='utf-8') as f:
+                    self._coverage = json.load(f)
+            except Exception:
+                self._coverage = {}
+        return self._coverage
+
+    def _coverage_start(self, symbol: str) -> Optional[pd.Timestamp]:
+        value = self._load_coverage().get(symbol)
+        if value is None:
+            return None
+        return None if value == "max" else pd.Timestamp(value)
+
+    def _covers(self, symbol: str, start: Optional[pd.Timestamp]) -> bool:
+        """缓存是否已覆盖到请求的起始日期（上市较晚的股票以请求记录为准）"""
+        if symbol not in self._load_coverage():
+            return False
+        covered = self._coverage_start(symbol)
+        if covered is None:
+            return True
+        return start is not None and covered <= start
+
+    def _set_coverage(self, symbol: str, start: Optional[pd.Timestamp]):
+        value = "max" if start is None else start.strftime("%Y-%m-%d")
+        with self._guard:
+            if self._deferred_coverage is not None:
+                self._load_coverage()[symbol] = value
+                self._deferred_coverage[symbol] = value
+                return
+        self.merge_coverage({symbol: value})
+
+    def defer_coverage(self):
+        """此后的覆盖区间更新只记在内存，由 pop_coverage_updates() 取出
+
+        分片扫描的子进程使用：多个进程各自读改写同一个索引文件会互相覆盖，
+        改为把更新随分片结果返回，由父进程调用 merge_coverage() 写入
+        """
+        with self._guard:
+            if self._deferred_coverage is None:
+                self._deferred_coverage = {}
+
+    def pop_coverage_updates(self) -> Dict[str, str]:
+        """取出并清空暂存的覆盖区间更新"""
+        with self._guard:
+            updates = self._deferred_coverage or {}
+            if self._deferred_coverage is not None:
+                self._deferred_coverage = {}
+        return updates
+
+    def merge_coverage(self, updates: Dict[str, str]):
+        """合并覆盖区间更新：先读取磁盘上的最新内容，再原子替换索引文件"""
+        if not updates:
+            return
+        with self._guard:
+            self._coverage = None
+            coverage = self._load_coverage()
+            coverage.update(updates)
+            tmp_path = self._coverage_file.with_suffix(f".{os.getpid()}.tmp")
+            try:
+                with open(tmp_path, 'w', encoding='utf-8') as f:
+                    json.dump(coverage, f, ensure_ascii=False, indent=2)
+                os.replace(tmp_path, self._coverage_file)
+            except Exception as e:
+                print(f"写入日线缓存索引失败: {e}")
+
+    # ---------- 下载与合并 ----------
+
+    def _fetch(self, symbols: List[str], start: Optional[pd.Timestamp]) -> Dict[str, pd.DataFrame]:
+        """下载 start 之后的日线；start 为 None 时下载全部历史"""
+        kwargs = {"period": "max"} if start is None else {"start": start.strftime("%Y-%m-%d")}
+        frames: Dict[str, pd.DataFrame] = {}
+        try:
+            if len(symbols) == 1:
+                raw = yf.Ticker(symbols[0]).history(**kwargs)
+                hist = self._normalize(raw)
+                if hist is not None:
+                    frames[symbols[0]] = hist
+                return frames
+
+            with _DOWNLOAD_LOCK:
+                data = yf.download(
+                    tickers=symbols,
+                    group_by="ticker",
+                    auto_adjust=True,  # 与 Ticker.history 默认一致
+                    threads=True,
+                    progress=False,
+                    **kwargs,
+                )
+        except Exception as e:
+            print(f"下载日线数据失败 ({', '.join(symbols[:5])}{'...' if len(symbols) > 5 else ''}): {e}")
+            return frames
+
+        for symbol in symbols:
+            hist = self._normalize(self._slice_download(data, symbol))
+            if hist is not None:
+                frames[symbol] = hist
+        return frames
+
+    def _slice_download(self, data: pd.DataFrame, symbol: str) -> Optional[pd.DataFrame]:
+        """从 yf.download 的结果中切出单只股票的数据"""
+        if data is None or data.empty:
+            return None
+        if isinstance(data.columns, pd.MultiIndex):
+            if symbol not in data.columns.get_level_values(0):
+                return None
+            return data[symbol]
+        # 旧版 yfinance 单只股票时返回单层列
+        return data
+
+    def _normalize(self, hist: Optional[pd.DataFrame]) -> Optional[pd.DataFrame]:
+        """统一为无时区日期索引 + OHLCV 列"""
+        if hist is None or hist.empty:
+            return None
+        hist = hist[[c for c in OHLCV_COLUMNS if c in hist.columns]].dropna(how='all')
+        if hist.empty or 'Close' not in hist.columns:
+            return None
+        index = pd.DatetimeIndex(hist.index)
+        if index.tz is not None:
+            index = index.tz_localize(None)
+        hist = hist.set_axis(index.normalize())
+        return hist[~hist.index.duplicated(keep='last')].sort_index()
+
+    def _overlap_date(self, hist: pd.DataFrame) -> pd.Timestamp:
+        return hist.index[-2] if len(hist) > 1 else hist.index[-1]
+
+    def _merge_tail(self, hist: pd.DataFrame, tail: Optional[pd.DataFrame]) -> Optional[pd.DataFrame]:
+        """追加增量数据；重叠K线收盘价不一致说明历史已复权，返回 None"""
+        if tail is None:
+            return hist
+        overlap = self._overlap_date(hist)
+        if overlap in tail.index and len(hist) > 1:
+            old_close = float(hist.at[overlap, 'Close'])
+            new_close = float(tail.at[overlap, 'Close'])
+            if old_close and abs(new_close / old_close - 1) > 1e-4:
+                return None
+        return pd.concat([hist[hist.index < tail.index[0]], tail])
+
+    def _earliest(self, a: Optional[pd.Timestamp], b: Optional[pd.Timestamp]) -> Optional[pd.Timestamp]:
+        """较早的起始日期，None 表示全部历史"""
+        if a is None or b is None:
+            return None
+        return min(a, b)
+
+    def _period_start(self, period: str) -> Optional[pd.Timestamp]:
+        """period 对应的自然日起点；"1d"/"5d" 按交易日计，预留周末和节假日"""
+        today = pd.Timestamp.today().normalize()
+        if period == "max":
+            return None
+        if period == "ytd":
+            return pd.Timestamp(year=today.year, month=1, day=1)
+        days = PERIOD_DAYS.get(period)
+        if days is None:
+            raise ValueError(f"不支持的时间周期: {period}")
+        if period.endswith("d"):
+            days = days * 2 + 4
+        return today - pd.Timedelta(days=days)
+
+    def _slice_period(self, hist: pd.DataFrame, period: str, start: Optional[pd.Timestamp]) -> pd.DataFrame:
+        if period.endswith("d") and period in PERIOD_DAYS:
+            return hist.tail(PERIOD_DAYS[period])
+        if start is None:
+            return hist
+        return hist[hist.index >= start]
+
+
+# 全局实例
+price_cache = PriceCache()
@@ -3,8 +3,11 @@
 """
 import yfinance as yf
 import pandas as pd
-from typing import Dict, Optional, Tuple
+from typing import Dict, List, Optional, Tuple
 from dataclasses import dataclass
+from datetime import datetime
+from .price_cache import price_cache
+from .fundamentals_cache import fundamentals_cache
 
 @dataclass
 class StockBasicInfo:
@@ -28,14 +31,20 @@ class FinancialData:
 class StockDataProvider:
     """股票数据提供者"""
     
-    def get_basic_info(self, symbol: str) -> Optional[StockBasicInfo]:
-        """获取股票基础信息"""
+    def get_basic_info(self, symbol: str, hist: Optional[pd.DataFrame] = None) -> Optional[StockBasicInfo]:
+        """获取股票基础信息
+        
+        Args:
+            symbol: 股票代码
+            hist: 已获取的历史价格数据（可选），最新收盘价直接取自该数据，避免重复请求
+        """
         try:
-            ticker = yf.Ticker(symbol)
-            hist = ticker.history(period="5d")
-            if hist.empty:
+            if hist is None:
+                hist = self.get_historical_data(symbol)
+            if hist is None or hist.empty:
                 return None
                 
+            ticker = yf.Ticker(symbol)
             info = ticker.info
             price = hist['Close'].iloc[-1]
             market_cap = info.get('marketCap', 0)
@@ -51,18 +60,33 @@ class StockDataProvider:
             return None
     
     def get_historical_data(self, symbol: str, period: str = "2y") -> Optional[pd.DataFrame]:
-        """获取历史价格数据"""
+        """获取历史价格数据（经本地日线缓存，增量刷新）"""
         try:
-            ticker = yf.Ticker(symbol)
-            hist = ticker.history(period=period)
-            return hist if not hist.empty else None
+            return price_cache.get_history(symbol, period)
         except Exception as e:
             print(f"获取 {symbol} 历史数据失败: {e}")
             return None
     
+    def get_bulk_historical_data(self, symbols: List[str], period: str = "2y") -> Dict[str, pd.DataFrame]:
+        """批量获取历史价格数据（经本地日线缓存，需联网的股票合并为批量下载）
+        
+        Returns:
+            {symbol: DataFrame}，下载失败或无数据的股票不在结果中
+        """
+        frames = price_cache.get_bulk_history(symbols, period)
+        
+        missing = len(symbols) - len(frames)
+        if missing:
+            print(f"批量获取历史数据：{missing}/{len(symbols)} 只股票无数据")
+        return frames
+    
     def get_financial_data(self, symbol: str) -> Optional[FinancialData]:
-        """获取财务数据并计算增长率"""
+        """获取财务数据并计算增长率（季度报表经本地缓存，过期或过财报日后重新拉取）"""
         try:
+            cached = fundamentals_cache.get(symbol)
+            if cached:
+                return self._build_financial_data(cached['revenue'], cached['earnings'], cached['fcf'])
+            
             ticker = yf.Ticker(symbol)
             
             # 获取财务报表
@@ -83,28 +107,57 @@ class StockDataProvider:
             if fcf_series is None:
                 return None
             
-            # 计算增长率
-            revenue_growth = self._calc_growth(revenue_series.iloc[:2])
-            earnings_growth = self._calc_growth(earnings_series.iloc[:2])
-            
-            # 现金流分析
-            fcf_positive = fcf_series.iloc[0] > 0  # 最新季度为正
-            fcf_growth = fcf_series.pct_change().iloc[1] > 0 if len(fcf_series) > 1 else False
-            
-            return FinancialData(
-                revenue_series=revenue_series,
-                earnings_series=earnings_series,
-                fcf_series=fcf_series,
-                revenue_growth=revenue_growth,
-                earnings_growth=earnings_growth,
-                fcf_positive=fcf_positive,
-                fcf_growth=fcf_growth
+            fundamentals_cache.put(
+                symbol, revenue_series, earnings_series, fcf_series,
+                next_earnings_date=self._get_next_earnings_date(ticker)
             )
+            return self._build_financial_data(revenue_series, earnings_series, fcf_series)
             
         except Exception as e:
             print(f"获取 {symbol} 财务数据失败: {e}")
             return None
     
+    def _build_financial_data(self, revenue_series: pd.Series, earnings_series: pd.Series,
+                              fcf_series: pd.Series) -> FinancialData:
+        """由季度序列计算增长率"""
+        # 计算增长率
+        revenue_growth = self._calc_growth(revenue_series.iloc[:2])
+        earnings_growth = self._calc_growth(earnings_series.iloc[:2])
+        
+        # 现金流分析
+        fcf_positive = fcf_series.iloc[0] > 0  # 最新季度为正
+        fcf_growth = fcf_series.pct_change().iloc[1] > 0 if len(fcf_series) > 1 else False
+        
+        return FinancialData(
+            revenue_series=revenue_series,
+            earnings_series=earnings_series,
+            fcf_series=fcf_series,
+            revenue_growth=revenue_growth,
+            earnings_growth=earnings_growth,
+            fcf_positive=fcf_positive,
+            fcf_growth=fcf_growth
+        )
+    
+    def _get_next_earnings_date(self, ticker) -> Optional[datetime]:
+        """获取下一次财报日，兼容新旧 calendar 格式；无未来日期或失败返回 None"""
+        try:
+            calendar = ticker.calendar
+            if isinstance(calendar, dict):
+                dates = calendar.get('Earnings Date') or []
+            elif calendar is not None and not calendar.empty and 'Earnings Date' in calendar.index:
+                dates = list(calendar.loc['Earnings Date'].dropna())
+            else:
+                dates = []
+            
+            dates = [pd.Timestamp(d) for d in dates]
+            dates = [d.tz_localize(None) if d.tz is not None else d for d in dates]
+            # 刚发布财报后 calendar 常仍列出已过去的日期，只取今天及以后的
+            today = pd.Timestamp.now().normalize()
+            dates = [d for d in dates if d >= today]
+            return min(dates).to_pydatetime() if dates else None
+        except Exception:
+            return None
+    
     def _extract_series(self, dataframe, field_name: str, symbol: str) -> Optional[pd.Series]:
         """安全提取数据序列"""
         if dataframe is None or dataframe.empty or field_name not in dataframe.index:
@@ -0,0 +1,211 @@
+"""
+流式技术指标 - 按股票维护可序列化的 SMA50 / SMA200 / RSI14 滚动状态，新收盘价 O(1) 更新
+"""
+import json
+import math
+import os
+import threading
+from collections import deque
+from pathlib import Path
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+import pandas as pd
+
+SMA_SHORT = 50
+SMA_LONG = 200
+RSI_LENGTH = 14
+
+
+class IndicatorState:
+    """单只股票的滚动指标状态
+
+    - SMA：保留最近 200 个收盘价和两个窗口的滚动和
+    - RSI：Wilder 平滑（alpha=1/14），维护涨/跌幅的衰减加权和，
+      与 indicator_engine / pandas_ta 的 ewm(adjust=True) 结果一致
+    - 同一交易日的多次报价视为修正当日K线，新的交易日才追加
+    """
+
+    def __init__(self, symbol: str):
+        self.symbol = symbol.upper()
+        self.closes: deque = deque(maxlen=SMA_LONG)
+        self.sum_short = 0.0
+        self.sum_long = 0.0
+        self.gain_sum = 0.0
+        self.loss_sum = 0.0
+        self.diff_count = 0
+        self.prev_close: Optional[float] = None  # 当日K线之前的收盘价
+        self.last_gain = 0.0  # 当日K线对涨/跌幅加权和的贡献，用于修正
+        self.last_loss = 0.0
+        self.last_bar_date: Optional[str] = None
+
+    # ---------- 更新 ----------
+
+    def update(self, close: float, bar_date: str) -> bool:
+        """用一根K线的收盘价更新状态
+
+        Args:
+            close: 收盘价（盘中为最新价）
+            bar_date: K线日期 'YYYY-MM-DD'
+
+        Returns:
+            是否被采纳（早于当前K线的报价会被忽略）
+        """
+        close = float(close)
+        if self.last_bar_date is None or bar_date > self.last_bar_date:
+            self._append(close)
+            self.last_bar_date = bar_date
+            return True
+        if bar_date == self.last_bar_date:
+            self._revise(close)
+            return True
+        return False
+
+    def _append(self, close: float):
+        decay = 1.0 - 1.0 / RSI_LENGTH
+        if self.closes:
+            last_close = self.closes[-1]
+            diff = close - last_close
+            self.last_gain = max(diff, 0.0)
+            self.last_loss = max(-diff, 0.0)
+            self.gain_sum = self.gain_sum * decay + self.last_gain
+            self.loss_sum = self.loss_sum * decay + self.last_loss
+            self.diff_count += 1
+            self.prev_close = last_close
+        else:
+            self.last_gain = self.last_loss = 0.0
+            self.prev_close = None
+
+        if len(self.closes) >= SMA_SHORT:
+            self.sum_short -= self.closes[-SMA_SHORT]
+        if len(self.closes) == SMA_LONG:
+            self.sum_long -= self.closes[0]
+        self.closes.append(close)
+        self.sum_short += close
+        self.sum_long += close
+
+    def _revise(self, close: float):
+        old = self.closes[-1]
+        self.closes[-1] = close
+        self.sum_short += close - old
+        self.sum_long += close - old
+
+        if self.prev_close is not None:
+            diff = close - self.prev_close
+            gain, loss = max(diff, 0.0), max(-diff, 0.0)
+            self.gain_sum += gain - self.last_gain
+            self.loss_sum += loss - self.last_loss
+            self.last_gain, self.last_loss = gain, loss
+
+    # ---------- 读取 ----------
+
+    @property
+    def price(self) -> float:
+        return self.closes[-1] if self.closes else math.nan
+
+    @property
+    def sma50(self) -> float:
+        return self.sum_short / SMA_SHORT if len(self.closes) >= SMA_SHORT else math.nan
+
+    @property
+    def sma200(self) -> float:
+        return self.sum_long / SMA_LONG if len(self.closes) >= SMA_LONG else math.nan
+
+    @property
+    def rsi(self) -> float:
+        total = self.gain_sum + self.loss_sum
+        if self.diff_count < RSI_LENGTH or total <= 0:
+            return math.nan
+        return 100.0 * self.gain_sum / total
+
+    # ---------- 构造与序列化 ----------
+
+    @classmethod
+    def from_bars(cls, symbol: str, bars: Iterable[Tuple[str, float]]) -> "IndicatorState":
+        """由 (日期, 收盘价) 序列回放构造"""
+        state = cls(symbol)
+        for bar_date, close in bars:
+            if not pd.isna(close):
+                state.update(close, bar_date)
+        return state
+
+    @classmethod
+    def from_history(cls, symbol: str, hist: pd.DataFrame) -> "IndicatorState":
+        """由日线数据构造（使用 Close 列）"""
+        return cls.from_bars(symbol, zip(hist.index.strftime("%Y-%m-%d"), hist['Close'].to_numpy(dtype=float)))
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "symbol": self.symbol,
+            "closes": list(self.closes),
+            "gain_sum": self.gain_sum,
+            "loss_sum": self.loss_sum,
+            "diff_count": self.diff_count,
+            "prev_close": self.prev_close,
+            "last_gain": self.last_gain,
+            "last_loss": self.last_loss,
+            "last_bar_date": self.last_bar_date,
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "IndicatorState":
+        state = cls(data["symbol"])
+        state.closes.extend(data.get("closes", []))
+        # 滚动和由窗口重新求和，消除累计的浮点误差
+        closes = list(state.closes)
+        state.sum_short = math.fsum(closes[-SMA_SHORT:])
+        state.sum_long = math.fsum(closes)
+        state.gain_sum = data.get("gain_sum", 0.0)
+        state.loss_sum = data.get("loss_sum", 0.0)
+        state.diff_count = data.get("diff_count", 0)
+        state.prev_close = data.get("prev_close")
+        state.last_gain = data.get("last_gain", 0.0)
+        state.last_loss = data.get("last_loss", 0.0)
+        state.last_bar_date = data.get("last_bar_date")
+        return state
+
+
+class IndicatorStateStore:
+    """指标状态存储：内存常驻 + 每只股票一个 JSON 文件"""
+
+    def __init__(self, state_dir: str = "data/indicator_states"):
+        self.state_dir = Path(state_dir)
+        self.state_dir.mkdir(parents=True, exist_ok=True)
+        self._states: Dict[str, IndicatorState] = {}
+        self._lock = threading.Lock()
+
+    def _path(self, symbol: str) -> Path:
+        return self.state_dir / f"{symbol.upper()}.json"
+
+    def get(self, symbol: str) -> Optional[IndicatorState]:
+        symbol = symbol.upper()
+        with self._lock:
+            state = self._states.get(symbol)
+            if state is not None:
+                return state
+            path = self._path(symbol)
+            if not path.exists():
+                return None
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    state = IndicatorState.from_dict(json.load(f))
+            except Exception as e:
+                print(f"读取 {symbol} 指标状态失败: {e}")
+                return None
+            self._states[symbol] = state
+            return state
+
+    def put(self, state: IndicatorState):
+        with self._lock:
+            self._states[state.symbol] = state
+            path = self._path(state.symbol)
+            tmp_path = path.with_suffix(".json.tmp")
+            try:
+                with open(tmp_path, 'w', encoding='utf-8') as f:
+                    json.dump(state.to_dict(), f)
+                os.replace(tmp_path, path)
+            except Exception as e:
+                print(f"写入 {state.symbol} 指标状态失败: {e}")
+
+
+# 全局实例
+indicator_state_store = IndicatorStateStore()
@@ -2,9 +2,11 @@
 技术指标数据提供者
 """
 import pandas as pd
-import pandas_ta as ta
 from typing import Optional, Dict
 from dataclasses import dataclass
+from .indicator_engine import build_close_matrix, compute_latest_indicators
+from .price_cache import price_cache
+from .streaming_indicators import IndicatorState, indicator_state_store
 
 @dataclass
 class TechnicalIndicators:
@@ -21,31 +23,101 @@ class TechnicalIndicators:
 class TechnicalDataProvider:
     """技术指标数据提供者"""
     
+    # 计算指标所需的最少K线数
+    min_bars = 250
+    
     def get_technical_indicators(self, hist_data: pd.DataFrame) -> Optional[TechnicalIndicators]:
         """计算技术指标"""
+        return self.get_bulk_technical_indicators({'_': hist_data}).get('_')
+    
+    def get_bulk_technical_indicators(self, hist_map: Dict[str, pd.DataFrame]) -> Dict[str, TechnicalIndicators]:
+        """批量计算技术指标：所有股票的收盘价组成矩阵，一次向量化计算
+        
+        Returns:
+            {symbol: TechnicalIndicators}，数据不足或指标无效的股票不在结果中
+        """
         try:
-            if hist_data is None or hist_data.empty or len(hist_data) < 250:
-                return None
-                
-            price = hist_data['Close'].iloc[-1]
+            eligible = {
+                symbol: hist for symbol, hist in hist_map.items()
+                if hist is not None and not hist.empty and len(hist) >= self.min_bars
+            }
+            if not eligible:
+                return {}
             
-            # 计算技术指标
-            sma200 = ta.sma(hist_data['Close'], length=200).iloc[-1]
-            sma50 = ta.sma(hist_data['Close'], length=50).iloc[-1]
-            rsi = ta.rsi(hist_data['Close'], length=14).iloc[-1]
+            matrix = build_close_matrix([hist['Close'].to_numpy(dtype=float) for hist in eligible.values()])
+            values = compute_latest_indicators(matrix, sma_lengths=(50, 200), rsi_length=14)
             
-            indicators = TechnicalIndicators(
-                sma200=sma200,
-                sma50=sma50,
-                rsi=rsi,
-                price=price
-            )
-            
-            return indicators if indicators.is_valid() else None
+            results = {}
+            for i, symbol in enumerate(eligible):
+                indicators = TechnicalIndicators(
+                    sma200=float(values['sma200'][i]),
+                    sma50=float(values['sma50'][i]),
+                    rsi=float(values['rsi'][i]),
+                    price=float(values['price'][i])
+                )
+                if indicators.is_valid():
+                    results[symbol] = indicators
+            return results
             
         except Exception as e:
             print(f"技术指标计算失败: {e}")
+            return {}
+    
+    def update_live_indicators(self, symbol: str, close: float, bar_date: str) -> Optional[TechnicalIndicators]:
+        """用一个新报价 O(1) 更新该股票的滚动指标
+        
+        Args:
+            symbol: 股票代码
+            close: 最新价（同一交易日内多次报价视为修正当日K线）
+            bar_date: K线日期 'YYYY-MM-DD'
+        
+        Returns:
+            最新指标（数据不足的字段为 NaN）；无状态且无法获取历史数据时返回 None
+        """
+        state = indicator_state_store.get(symbol)
+        if state is None:
+            state = self._seed_state(symbol)
+            if state is None:
+                return None
+        state.update(close, bar_date)
+        indicator_state_store.put(state)
+        return self._state_to_indicators(state)
+    
+    def sync_live_indicators(self, symbol: str, recent_hist: pd.DataFrame) -> Optional[TechnicalIndicators]:
+        """用最近几根日线同步滚动指标，只回放状态中最后一根K线及之后的数据
+        
+        状态缺失，或与最近数据之间有缺口（长时间未更新）时，从本地日线缓存重新构造。
+        """
+        if recent_hist is None or recent_hist.empty:
             return None
+        
+        dates = recent_hist.index.strftime("%Y-%m-%d")
+        state = indicator_state_store.get(symbol)
+        if state is None or state.last_bar_date not in set(dates):
+            state = self._seed_state(symbol)
+            if state is None:
+                return None
+        
+        for bar_date, close in zip(dates, recent_hist['Close'].to_numpy(dtype=float)):
+            if bar_date >= state.last_bar_date and not pd.isna(close):
+                state.update(close, bar_date)
+        indicator_state_store.put(state)
+        return self._state_to_indicators(state)
+    
+    def _seed_state(self, symbol: str) -> Optional[IndicatorState]:
+        """由 2 年日线构造初始状态"""
+        hist = price_cache.get_history(symbol, period="2y")
+        if hist is None:
+            return None
+        return IndicatorState.from_history(symbol, hist)
+    
+    def _state_to_indicators(self, state: IndicatorState) -> TechnicalIndicators:
+        return TechnicalIndicators(
+            sma200=state.sma200,
+            sma50=state.sma50,
+            rsi=state.rsi,
+            price=state.price
+        )
     
     def analyze_trend(self, indicators: TechnicalIndicators) -> Dict[str, bool]:
         """分析趋势"""
@@ -0,0 +1,87 @@
+"""
+股票池提供者 - 从本地 CSV 加载指数成分股（如 S&P 500、Nasdaq-100）
+"""
+import csv
+from pathlib import Path
+from typing import Dict, List
+
+UNIVERSE_DIR = Path("data/universes")
+
+# 识别代码列 / 公司名称列的候选列名（按优先级）
+SYMBOL_COLUMNS = ("Symbol", "symbol", "Ticker", "ticker", "代码")
+NAME_COLUMNS = ("Security", "Name", "name", "Company", "company", "名称")
+
+# 扩展白名单（行业龙头）
+MOAT_TICKERS = [
+    "NVDA", "AMD", "TSM", "ASML", "AVGO", "QCOM",  # 半导体
+    "MSFT", "AMZN", "GOOGL", "META", "ORCL", "SNOW", "CRM",  # 云/AI
+    "AAPL", "TSLA", "MCD", "SBUX", "KO", "JNJ", "PG", "COST", "WMT", "HD",  # 消费/现金牛
+    "V", "MA", "PYPL", "SOFI"  # 金融
+]
+
+
+def list_universes() -> List[str]:
+    """列出 data/universes/ 下可用的股票池名称"""
+    if not UNIVERSE_DIR.exists():
+        return []
+    return sorted(p.stem for p in UNIVERSE_DIR.glob("*.csv"))
+
+
+def _universe_path(name: str) -> Path:
+    path = Path(name)
+    if path.suffix.lower() != ".csv":
+        path = UNIVERSE_DIR / f"{name.lower()}.csv"
+    if not path.exists():
+        available = ", ".join(list_universes()) or "无"
+        raise FileNotFoundError(f"股票池文件不存在: {path}（可用股票池: {available}）")
+    return path
+
+
+def _normalize_symbol(symbol: str) -> str:
+    return symbol.strip().upper().replace(".", "-")
+
+
+def load_universe(name: str) -> List[str]:
+    """加载股票池
+
+    Args:
+        name: 股票池名称（对应 data/universes/{name}.csv）或 CSV 文件路径。
+            CSV 需包含 Symbol/Ticker 列，否则取第一列。
+
+    Returns:
+        去重后的股票代码列表（保持文件顺序），'.' 转为 yfinance 使用的 '-'（如 BRK.B -> BRK-B）
+    """
+    path = _universe_path(name)
+    with open(path, 'r', encoding='utf-8-sig', newline='') as f:
+        reader = csv.DictReader(f)
+        fields = reader.fieldnames or []
+        if not fields:
+            return []
+        column = next((c for c in SYMBOL_COLUMNS if c in fields), fields[0])
+        raw = [row.get(column) or "" for row in reader]
+
+    symbols = [_normalize_symbol(s) for s in raw if s and s.strip()]
+    return list(dict.fromkeys(symbols))
+
+
+def load_universe_names(name: str) -> Dict[str, str]:
+    """加载股票池中的公司名称
+
+    Returns:
+        {代码: 公司名称}；CSV 没有名称列（Security/Name/Company）时返回空字典
+    """
+    path = _universe_path(name)
+    with open(path, 'r', encoding='utf-8-sig', newline='') as f:
+        reader = csv.DictReader(f)
+        fields = reader.fieldnames or []
+        if not fields:
+            return {}
+        symbol_column = next((c for c in SYMBOL_COLUMNS if c in fields), fields[0])
+        name_column = next((c for c in NAME_COLUMNS if c in fields), None)
+        if name_column is None:
+            return {}
+        return {
+            _normalize_symbol(row[symbol_column]): row[name_column].strip()
+            for row in reader
+            if (row.get(symbol_column) or "").strip() and (row.get(name_column) or "").strip()
+        }
@@ -1,28 +1,66 @@
 """
 重构后的漏斗策略工具 - 使用分层架构
 """
+import os
 from langchain.tools import BaseTool
-from typing import List, Dict, Any
-from .strategies.funnel_strategy import FunnelStrategy
+from datetime import datetime
+from typing import List, Dict, Any, Optional
+from .strategies.funnel_strategy import FunnelStrategy, StrategyResult
+from .strategies.sharded_scan import ShardedScanExecutor
+from .data_providers.universe_provider import load_universe, MOAT_TICKERS
+from .async_utils import run_blocking
+from ..state_store import save_screen_snapshot, load_screen_snapshot
+
+def run_screen(universe: str = "moat", strategy: Optional[FunnelStrategy] = None,
+               resume: bool = True, sharded: bool = False) -> List[StrategyResult]:
+    """执行完整扫描并保存快照，返回全部结果
+    
+    Args:
+        universe: 'moat' 护城河白名单，或 data/universes/ 下的股票池名称
+        strategy: 复用的策略对象（可选）
+        resume: 分片扫描时是否复用当天已完成的分片；False 时清除当天分片重新扫描
+        sharded: 是否使用多进程分片扫描（盘后定时任务用）。默认在当前进程内用线程池扫描，
+                 避免 Agent/Webhook 进程每次对话触发扫描都要启动一批重新导入整个应用的子进程
+    """
+    universe = (universe or "moat").lower()
+    tickers = MOAT_TICKERS if universe == "moat" else load_universe(universe)
+    if universe != "moat" and sharded:
+        scan_id = f"{universe}_{datetime.now().strftime('%Y%m%d')}"
+        results = ShardedScanExecutor().run(tickers, scan_id=scan_id, resume=resume)
+    else:
+        results = (strategy or FunnelStrategy()).analyze_many(tickers)
+    
+    save_screen_snapshot(universe, [r.to_dict() for r in results])
+    return results
+
+
+def load_screen(universe: str = "moat", max_age_hours: Optional[float] = None):
+    """读取未过期的扫描快照
+    
+    Returns:
+        (结果列表, 生成时间)；无快照或已过期时返回 (None, None)
+    """
+    if max_age_hours is None:
+        max_age_hours = float(os.getenv("SCREEN_SNAPSHOT_MAX_AGE_HOURS", "72"))
+    snapshot = load_screen_snapshot((universe or "moat").lower())
+    if not snapshot:
+        return None, None
+    generated_at = datetime.fromisoformat(snapshot["generated_at"])
+    if (datetime.now() - generated_at).total_seconds() > max_age_hours * 3600:
+        return None, None
+    return [StrategyResult.from_dict(item) for item in snapshot["results"]], generated_at
 
-# 扩展白名单（行业龙头）
-MOAT_TICKERS = [
-    "NVDA", "AMD", "TSM", "ASML", "AVGO", "QCOM",  # 半导体
-    "MSFT", "AMZN", "GOOGL", "META", "ORCL", "SNOW", "CRM",  # 云/AI
-    "AAPL", "TSLA", "MCD", "SBUX", "KO", "JNJ", "PG", "COST", "WMT", "HD",  # 消费/现金牛
-    "V", "MA", "PYPL", "SOFI"  # 金融
-]
 
 class FunnelStrategyToolV2(BaseTool):
     name = "funnel_stock_strategy_v2"
-    description = "执行'三张王牌 + 两根线'漏斗选股策略（重构版）。输入：mode ('scan' 全扫描, 'check' 单股如 NVDA), symbol (可选)。输出：详细的买/卖/观望建议。"
+    description = "执行'三张王牌 + 两根线'漏斗选股策略（重构版）。输入：mode ('scan' 全扫描, 'check' 单股如 NVDA), symbol (可选), universe (可选，扫描的股票池：默认 'moat' 护城河白名单，或 data/universes/ 下的指数成分股如 'sp500'、'nasdaq100'), fresh (可选，默认 false 直接返回盘后扫描快照；true 强制实时重新扫描)。输出：详细的买/卖/观望建议。"
 
     def __init__(self):
         super().__init__()
         # 使用 object.__setattr__ 绕过 Pydantic 限制
         object.__setattr__(self, 'strategy', FunnelStrategy())
 
-    def _run(self, mode: str = "scan", symbol: str = None) -> str:
+    def _run(self, mode: str = "scan", symbol: str = None, universe: str = "moat", fresh: bool = False) -> str:
         try:
             # 懒加载策略对象
             if not hasattr(self, 'strategy'):
@@ -31,9 +69,17 @@ class FunnelStrategyToolV2(BaseTool):
             if mode == "check" and symbol:
                 result = self.strategy.analyze_single(symbol.upper())
                 return self._format_single_result(result)
-            else:
-                results = self.strategy.scan_all(MOAT_TICKERS)
-                return self._format_scan_results(results)
+            
+            # 扫描模式：默认使用盘后快照，fresh=true 时实时重新扫描
+            fresh = str(fresh).strip().lower() in ("true", "1", "yes")
+            results, generated_at = (None, None) if fresh else load_screen(universe)
+            if results is None:
+                # 对话内的扫描在本进程线程池中执行（不复用分片结果，也不启动子进程）
+                results = run_screen(universe, self.strategy)
+                return self._format_scan_results(self.strategy.select_top(results))
+            
+            output = self._format_scan_results(self.strategy.select_top(results))
+            return f"{output}\n\n🕒 数据来自 {generated_at.strftime('%Y-%m-%d %H:%M')} 的盘后扫描快照（如需实时扫描请指定 fresh=true）"
         except Exception as e:
             return f"执行错误：{str(e)}"
 
@@ -63,5 +109,6 @@ class FunnelStrategyToolV2(BaseTool):
                 lines.append(f"{i}. {self._format_single_result(result)}")
             return "\n".join(lines)
 
-    def _arun(self, **kwargs):
-        raise NotImplementedError("异步暂不支持")
+    async def _arun(self, mode: str = "scan", symbol: str = None, universe: str = "moat", fresh: bool = False) -> str:
+        # yfinance 没有异步接口，放到共享线程池执行
+        return await run_blocking(self._run, mode=mode, symbol=symbol, universe=universe, fresh=fresh)
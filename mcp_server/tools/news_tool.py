@@ -5,8 +5,9 @@ from langchain.tools import BaseTool
 from typing import List, Dict, Any, Optional
 import requests
 from datetime import datetime, timedelta
-from ..news_ingestor import ingest_once
-from ..state_store import read_latest_news
+from ..news_ingestor import ingest_once, ingest_once_async
+from ..state_store import news_term_hits, read_latest_news, search_news
+from .async_utils import run_blocking
 
 class NewsTranslator:
     """新闻翻译器 - 简单的关键词翻译"""
@@ -61,57 +62,88 @@ class NewsTranslator:
 
 class NewsRetrievalTool(BaseTool):
     name = "get_financial_news"
-    description = "获取最新的财经新闻。输入：hours (获取最近N小时的新闻，默认24), limit (最大条数，默认10), keywords (可选的关键词过滤)。输出：中文翻译的新闻摘要。"
+    description = "获取最新的财经新闻。输入：hours (获取最近N小时的新闻，默认24), limit (最大条数，默认10), keywords (可选的关键词过滤), symbol (可选，只看提及该股票的新闻，如 NVDA)。输出：中文翻译的新闻摘要。"
 
     def __init__(self):
         super().__init__()
         # 使用 object.__setattr__ 绕过 Pydantic 限制
         object.__setattr__(self, 'translator', NewsTranslator())
 
-    def _run(self, hours: int = 24, limit: int = 10, keywords: str = None) -> str:
+    def _run(self, hours: int = 24, limit: int = 10, keywords: str = None, symbol: str = None) -> str:
         try:
             # 1. 先尝试从本地获取新闻
-            news_items = read_latest_news(limit=limit * 2)  # 多获取一些，便于过滤
+            news_items = self._read_news(hours, limit, symbol, keywords)
             
             # 2. 如果本地新闻不够新，先抓取一次
-            if not news_items or self._is_news_stale(news_items[0], hours):
+            if self._needs_ingest(news_items, hours, symbol, keywords):
                 print("本地新闻过期，正在抓取最新新闻...")
                 ingest_once()  # 抓取最新新闻
-                news_items = read_latest_news(limit=limit * 2)
+                news_items = self._read_news(hours, limit, symbol, keywords)
             
-            if not news_items:
-                return "暂时无法获取新闻，请稍后再试。"
-            
-            # 3. 过滤时间范围
-            cutoff_time = datetime.utcnow() - timedelta(hours=hours)
-            recent_news = []
+            return self._build_response(news_items, hours, limit, keywords, symbol)
             
-            for item in news_items:
-                try:
-                    pub_time = datetime.fromisoformat(item['published_at'].replace('Z', '+00:00'))
-                    if pub_time.replace(tzinfo=None) > cutoff_time:
-                        recent_news.append(item)
-                except:
-                    continue  # 跳过时间解析失败的新闻
-            
-            if not recent_news:
-                return f"最近 {hours} 小时内暂无新闻更新。"
+        except Exception as e:
+            return f"获取新闻时出错：{str(e)}"
+
+    async def _arun(self, hours: int = 24, limit: int = 10, keywords: str = None, symbol: str = None) -> str:
+        """异步执行：数据库读取放到线程池，新闻抓取使用非阻塞 HTTP 并发拉取各源"""
+        try:
+            news_items = await run_blocking(self._read_news, hours, limit, symbol, keywords)
             
-            # 4. 关键词过滤
-            if keywords:
-                filtered_news = self._filter_by_keywords(recent_news, keywords)
-                if filtered_news:
-                    recent_news = filtered_news
-                else:
-                    return f"最近 {hours} 小时内没有包含 '{keywords}' 的相关新闻。"
+            if await run_blocking(self._needs_ingest, news_items, hours, symbol, keywords):
+                print("本地新闻过期，正在抓取最新新闻...")
+                await ingest_once_async()
+                news_items = await run_blocking(self._read_news, hours, limit, symbol, keywords)
             
-            # 5. 限制数量并翻译
-            recent_news = recent_news[:limit]
-            return self._format_news_response(recent_news, hours, keywords)
+            return self._build_response(news_items, hours, limit, keywords, symbol)
             
         except Exception as e:
             return f"获取新闻时出错：{str(e)}"
 
+    def _read_news(self, hours: int, limit: int, symbol: Optional[str],
+                   keywords: Optional[str] = None) -> List[Dict]:
+        """读取最近的新闻；指定 symbol 时走股票代码索引，指定 keywords 时走关键词倒排索引"""
+        ticker = symbol.strip().upper() if symbol else None
+        if keywords:
+            return search_news(self._split_keywords(keywords), limit=limit, hours=hours, ticker=ticker)
+        return read_latest_news(limit=limit * 2, hours=hours, ticker=ticker)
+
+    def _needs_ingest(self, news_items: List[Dict], hours: int, symbol: Optional[str],
+                      keywords: Optional[str] = None) -> bool:
+        """本地新闻是否过期；按股票/关键词查询时以全部新闻的时效为准（没有匹配的新闻不代表需要抓取）"""
+        if symbol or keywords:
+            news_items = read_latest_news(limit=1, hours=hours)
+        return not news_items or self._is_news_stale(news_items[0], hours)
+
+    def _build_response(self, news_items: List[Dict], hours: int, limit: int, keywords: Optional[str],
+                        symbol: Optional[str] = None) -> str:
+        """按时间范围过滤并格式化（同步/异步共用）"""
+        if not news_items and keywords:
+            return f"最近 {hours} 小时内没有包含 '{keywords}' 的相关新闻。"
+        if not news_items and symbol:
+            return f"最近 {hours} 小时内暂无提及 {symbol.strip().upper()} 的新闻。"
+        if not news_items:
+            return "暂时无法获取新闻，请稍后再试。"
+        
+        # 3. 过滤时间范围
+        cutoff_time = datetime.utcnow() - timedelta(hours=hours)
+        recent_news = []
+        
+        for item in news_items:
+            try:
+                pub_time = datetime.fromisoformat(item['published_at'].replace('Z', '+00:00'))
+                if pub_time.replace(tzinfo=None) > cutoff_time:
+                    recent_news.append(item)
+            except:
+                continue  # 跳过时间解析失败的新闻
+        
+        if not recent_news:
+            return f"最近 {hours} 小时内暂无新闻更新。"
+        
+        # 4. 限制数量并翻译
+        recent_news = recent_news[:limit]
+        return self._format_news_response(recent_news, hours, keywords, symbol)
+
     def _is_news_stale(self, latest_news: Dict, max_hours: int) -> bool:
         """检查新闻是否过期"""
         try:
@@ -121,24 +153,17 @@ class NewsRetrievalTool(BaseTool):
         except:
             return True
 
-    def _filter_by_keywords(self, news_items: List[Dict], keywords: str) -> List[Dict]:
-        """根据关键词过滤新闻"""
-        keywords_list = [kw.strip().lower() for kw in keywords.split(',')]
-        filtered = []
-        
-        for item in news_items:
-            title_lower = item.get('title', '').lower()
-            summary_lower = item.get('summary', '').lower()
-            
-            # 检查是否包含任一关键词
-            if any(kw in title_lower or kw in summary_lower for kw in keywords_list):
-                filtered.append(item)
-        
-        return filtered
+    @staticmethod
+    def _split_keywords(keywords: str) -> List[str]:
+        """逗号分隔的关键词列表（多词关键词要求各词都出现）"""
+        return [kw.strip() for kw in keywords.split(',') if kw.strip()]
 
-    def _format_news_response(self, news_items: List[Dict], hours: int, keywords: Optional[str]) -> str:
+    def _format_news_response(self, news_items: List[Dict], hours: int, keywords: Optional[str],
+                              symbol: Optional[str] = None) -> str:
         """格式化新闻响应"""
         header_parts = [f"📰 最近 {hours} 小时财经新闻"]
+        if symbol:
+            header_parts.append(f"(股票: {symbol.strip().upper()})")
         if keywords:
             header_parts.append(f"(关键词: {keywords})")
         header_parts.append(f"(共 {len(news_items)} 条)\n")
@@ -166,9 +191,6 @@ class NewsRetrievalTool(BaseTool):
         
         return "\n".join(lines)
 
-    def _arun(self, **kwargs):
-        raise NotImplementedError("异步暂不支持")
-
 
 class MarketNewsAnalysisTool(BaseTool):
     name = "analyze_market_sentiment"
@@ -181,12 +203,12 @@ class MarketNewsAnalysisTool(BaseTool):
 
     def _run(self, hours: int = 24, focus: str = None) -> str:
         try:
-            # 获取新闻
-            news_tool = NewsRetrievalTool()
-            keywords = self._get_focus_keywords(focus) if focus else None
-            
-            # 获取原始新闻数据
-            news_items = read_latest_news(limit=50)
+            # 获取新闻：指定关注领域时只分析命中该领域关键词的新闻
+            if focus:
+                keywords = NewsRetrievalTool._split_keywords(self._get_focus_keywords(focus))
+                news_items = search_news(keywords, limit=50, hours=hours)
+            else:
+                news_items = read_latest_news(limit=50, hours=hours)
             if not news_items:
                 return "无法获取新闻数据进行情绪分析。"
             
@@ -209,9 +231,10 @@ class MarketNewsAnalysisTool(BaseTool):
         return focus_map.get(focus.lower(), focus)
 
     def _analyze_sentiment(self, news_items: List[Dict], hours: int, focus: Optional[str]) -> Dict:
-        """简单的情绪分析"""
-        positive_words = ['beats', 'exceeds', 'strong', 'growth', 'profit', 'gains', 'rises', 'up']
-        negative_words = ['misses', 'falls', 'decline', 'loss', 'down', 'weak', 'concern', 'risk']
+        """简单的情绪分析（情绪词命中通过倒排索引一次查出，按整词匹配）"""
+        positive_words = {'beats', 'exceeds', 'strong', 'growth', 'profit', 'gains', 'rises', 'up'}
+        negative_words = {'misses', 'falls', 'decline', 'loss', 'down', 'weak', 'concern', 'risk'}
+        term_hits = news_term_hits(positive_words | negative_words, hours=hours)
         
         sentiment_scores = []
         relevant_news = []
@@ -223,14 +246,11 @@ class MarketNewsAnalysisTool(BaseTool):
                 pub_time = datetime.fromisoformat(item['published_at'].replace('Z', '+00:00'))
                 if pub_time.replace(tzinfo=None) <= cutoff_time:
                     continue
-                    
-                title_lower = item.get('title', '').lower()
-                summary_lower = item.get('summary', '').lower()
-                text = f"{title_lower} {summary_lower}"
                 
                 # 计算情绪得分
-                pos_count = sum(1 for word in positive_words if word in text)
-                neg_count = sum(1 for word in negative_words if word in text)
+                hits = term_hits.get(item.get('dedup_key'), set())
+                pos_count = len(hits & positive_words)
+                neg_count = len(hits & negative_words)
                 
                 if pos_count > 0 or neg_count > 0:
                     score = (pos_count - neg_count) / (pos_count + neg_count + 1)
@@ -303,5 +323,6 @@ class MarketNewsAnalysisTool(BaseTool):
         
         return "\n".join(lines)
 
-    def _arun(self, **kwargs):
-        raise NotImplementedError("异步暂不支持")
+    async def _arun(self, hours: int = 24, focus: str = None) -> str:
+        """异步执行：新闻读取与情绪统计放到共享线程池"""
+        return await run_blocking(self._run, hours=hours, focus=focus)
@@ -4,8 +4,9 @@
 from langchain.tools import BaseTool
 from typing import Optional
 from pydantic import BaseModel, Field
-import yfinance as yf
 from ..portfolio_manager import portfolio_manager
+from .data_providers.price_cache import price_cache
+from .async_utils import run_blocking
 
 class PortfolioInput(BaseModel):
     """Portfolio tool input schema"""
@@ -81,16 +82,7 @@ class PortfolioManagementTool(BaseTool):
         
         # 获取当前价格
         symbols = list(set(h["symbol"] for h in holdings))
-        current_prices = {}
-        
-        for symbol in symbols:
-            try:
-                ticker = yf.Ticker(symbol)
-                hist = ticker.history(period="1d")
-                if not hist.empty:
-                    current_prices[symbol] = hist['Close'].iloc[-1]
-            except:
-                current_prices[symbol] = None
+        current_prices = price_cache.get_latest_prices(symbols)
         
         # 计算盈亏
         pnl_data = portfolio_manager.calculate_pnl(user_id, current_prices)
@@ -139,9 +131,7 @@ class PortfolioManagementTool(BaseTool):
         
         # 获取当前价格
         try:
-            ticker = yf.Ticker(symbol)
-            hist = ticker.history(period="1d")
-            current_price = hist['Close'].iloc[-1] if not hist.empty else None
+            current_price = price_cache.get_latest_prices([symbol]).get(symbol)
         except:
             current_price = None
         
@@ -175,5 +165,8 @@ class PortfolioManagementTool(BaseTool):
         
         return output
     
-    def _arun(self, **kwargs):
-        raise NotImplementedError("异步暂不支持")
+    async def _arun(self, action: str, user_id: str = "default", symbol: str = None,
+                    quantity: float = None, buy_price: float = None) -> str:
+        """异步执行：行情获取与文件读写放到共享线程池"""
+        return await run_blocking(self._run, action=action, user_id=user_id, symbol=symbol,
+                                  quantity=quantity, buy_price=buy_price)
@@ -1,7 +1,10 @@
 """
 漏斗选股策略 - 纯策略逻辑，不依赖数据获取
 """
-from typing import Dict, Any, List
+import os
+import pandas as pd
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Dict, Any, List, Optional
 from dataclasses import dataclass
 from ..data_providers.stock_data_provider import StockDataProvider, StockBasicInfo, FinancialData
 from ..data_providers.technical_data_provider import TechnicalDataProvider, TechnicalIndicators
@@ -14,11 +17,34 @@ class StrategyResult:
     confidence: float  # 0-1
     reason: str
     details: Dict[str, Any]
+    
+    def to_dict(self) -> Dict[str, Any]:
+        """转为可 JSON 序列化的字典（numpy 数值转为 Python 原生类型）"""
+        return {
+            'symbol': self.symbol,
+            'action': self.action,
+            'confidence': float(self.confidence),
+            'reason': self.reason,
+            'details': {k: v.item() if hasattr(v, 'item') else v for k, v in self.details.items()}
+        }
+    
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "StrategyResult":
+        return cls(
+            symbol=data['symbol'],
+            action=data['action'],
+            confidence=data['confidence'],
+            reason=data['reason'],
+            details=data.get('details', {})
+        )
+
+# 筛选阶段，按单只股票的数据获取成本从低到高排列
+FILTER_STAGES = ('price', 'trend', 'market_cap', 'fundamentals')
 
 class FunnelStrategy:
     """三张王牌 + 两根线漏斗策略"""
     
-    def __init__(self):
+    def __init__(self, max_workers: Optional[int] = None):
         self.stock_provider = StockDataProvider()
         self.tech_provider = TechnicalDataProvider()
         
@@ -29,42 +55,64 @@ class FunnelStrategy:
         self.min_market_cap = 20e9
         self.rsi_range = (38, 55)
         self.sma50_tolerance = 0.08  # 8%
+        
+        # 并发扫描参数（yfinance 请求以网络 I/O 为主，适合线程池）
+        self.max_workers = max_workers or int(os.getenv("FUNNEL_SCAN_WORKERS", "8"))
+        self.last_scan_eliminations: Dict[str, int] = {}
     
-    def analyze_single(self, symbol: str) -> StrategyResult:
-        """分析单只股票"""
-        # 1. 获取基础信息
-        basic_info = self.stock_provider.get_basic_info(symbol)
-        if not basic_info:
-            return StrategyResult(
-                symbol=symbol,
-                action='skip',
-                confidence=0.0,
-                reason='无法获取基础数据',
-                details={}
+    def analyze_single(self, symbol: str, hist_data: Optional[pd.DataFrame] = None,
+                       tech_indicators: Optional[TechnicalIndicators] = None,
+                       early_exit: bool = False) -> StrategyResult:
+        """分析单只股票
+        
+        筛选按成本从低到高进行（见 FILTER_STAGES）：价格下限 → 200日趋势 → 市值 → 基本面，
+        被淘汰的结果在 details['eliminated_at'] 中记录所在阶段。
+        
+        Args:
+            symbol: 股票代码
+            hist_data: 预先批量获取的历史价格数据（可选），缺省时单独请求
+            tech_indicators: 预先批量计算的技术指标（可选），缺省时由 hist_data 计算
+            early_exit: 是否在趋势破坏时提前淘汰（扫描模式使用，省去市值和财报请求）；
+                单股分析时保持完整流程，给出卖出建议
+        """
+        # 1. 价格下限（本地日线数据）
+        if hist_data is None:
+            hist_data = self.stock_provider.get_historical_data(symbol)
+        if hist_data is None or hist_data.empty:
+            return self._eliminate(symbol, 'price', '无法获取价格数据', {})
+        
+        price = float(hist_data['Close'].iloc[-1])
+        if price < self.min_price:
+            return self._eliminate(symbol, 'price', f'仙股 (价格: ${price:.2f})', {'price': price})
+        
+        # 2. 200日趋势（向量化指标，无网络请求）
+        if tech_indicators is None:
+            tech_indicators = self.tech_provider.get_technical_indicators(hist_data)
+        if early_exit and tech_indicators and tech_indicators.price <= tech_indicators.sma200:
+            return self._eliminate(
+                symbol, 'trend',
+                f'趋势破坏（低于200日均线 ${tech_indicators.sma200:.2f}），提前淘汰',
+                {'price': price, 'sma200': tech_indicators.sma200}
             )
         
-        # 2. 基础筛选
-        if basic_info.price < self.min_price or basic_info.market_cap < self.min_market_cap:
-            return StrategyResult(
-                symbol=symbol,
-                action='skip',
-                confidence=0.0,
-                reason=f'仙股或市值过小 (价格: ${basic_info.price:.2f}, 市值: {basic_info.market_cap/1e9:.1f}B)',
-                details={'price': basic_info.price, 'market_cap': basic_info.market_cap}
+        # 3. 市值（需要 ticker.info 请求）
+        basic_info = self.stock_provider.get_basic_info(symbol, hist_data)
+        if not basic_info:
+            return self._eliminate(symbol, 'market_cap', '无法获取基础数据', {'price': price})
+        
+        if basic_info.market_cap < self.min_market_cap:
+            return self._eliminate(
+                symbol, 'market_cap',
+                f'市值过小 (价格: ${basic_info.price:.2f}, 市值: {basic_info.market_cap/1e9:.1f}B)',
+                {'price': basic_info.price, 'market_cap': basic_info.market_cap}
             )
         
-        # 3. 获取财务数据
+        # 4. 基本面（季度报表，最慢）
         financial_data = self.stock_provider.get_financial_data(symbol)
         if not financial_data:
-            return StrategyResult(
-                symbol=symbol,
-                action='skip',
-                confidence=0.0,
-                reason='财务数据不足',
-                details={'price': basic_info.price}
-            )
+            return self._eliminate(symbol, 'fundamentals', '财务数据不足', {'price': basic_info.price})
         
-        # 4. 三张王牌检查
+        # 三张王牌检查
         moat_result = self._check_three_cards(financial_data)
         if not moat_result['pass']:
             return StrategyResult(
@@ -77,22 +125,12 @@ class FunnelStrategy:
                     'revenue_growth': financial_data.revenue_growth,
                     'earnings_growth': financial_data.earnings_growth,
                     'fcf_positive': financial_data.fcf_positive,
-                    'fcf_growth': financial_data.fcf_growth
+                    'fcf_growth': financial_data.fcf_growth,
+                    'eliminated_at': 'fundamentals'
                 }
             )
         
-        # 5. 获取技术指标
-        hist_data = self.stock_provider.get_historical_data(symbol)
-        if hist_data is None:
-            return StrategyResult(
-                symbol=symbol,
-                action='hold',
-                confidence=0.5,
-                reason='基本面优秀，但无法获取技术数据',
-                details={'price': basic_info.price}
-            )
-        
-        tech_indicators = self.tech_provider.get_technical_indicators(hist_data)
+        # 5. 技术指标
         if not tech_indicators:
             return StrategyResult(
                 symbol=symbol,
@@ -107,18 +145,86 @@ class FunnelStrategy:
         
         return self._generate_final_result(symbol, basic_info, financial_data, tech_indicators, timing_result)
     
-    def scan_all(self, tickers: List[str]) -> List[StrategyResult]:
-        """扫描股票池"""
-        results = []
-        for ticker in tickers:
-            result = self.analyze_single(ticker)
-            results.append(result)
-        
-        # 按买入信号和置信度排序
+    def _eliminate(self, symbol: str, stage: str, reason: str, details: Dict[str, Any]) -> StrategyResult:
+        """在筛选阶段淘汰"""
+        return StrategyResult(
+            symbol=symbol,
+            action='skip',
+            confidence=0.0,
+            reason=reason,
+            details={**details, 'eliminated_at': stage}
+        )
+    
+    def scan_all(self, tickers: List[str], max_workers: Optional[int] = None) -> List[StrategyResult]:
+        """扫描股票池（有界线程池并发），返回买入信号优先、按置信度排序的前5个结果
+        
+        Args:
+            tickers: 股票代码列表
+            max_workers: 最大并发数，默认使用 self.max_workers；传 1 则退化为顺序扫描
+        """
+        return self.select_top(self.analyze_many(tickers, max_workers))
+    
+    def analyze_many(self, tickers: List[str], max_workers: Optional[int] = None) -> List[StrategyResult]:
+        """并发分析多只股票，返回全部结果（与输入顺序一致）"""
+        workers = max(1, min(max_workers or self.max_workers, len(tickers) or 1))
+        results: List[Optional[StrategyResult]] = [None] * len(tickers)
+        
+        # 一次批量下载整个股票池的日线数据，缺失的股票在分析时单独补取
+        prefetched = self.stock_provider.get_bulk_historical_data(tickers)
+        # 整个股票池的技术指标一次向量化计算
+        indicators = self.tech_provider.get_bulk_technical_indicators(prefetched)
+        
+        if workers == 1:
+            for i, ticker in enumerate(tickers):
+                results[i] = self._safe_analyze(ticker, prefetched.get(ticker), indicators.get(ticker), True)
+        else:
+            with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="funnel-scan") as executor:
+                futures = {
+                    executor.submit(self._safe_analyze, ticker, prefetched.get(ticker), indicators.get(ticker), True): i
+                    for i, ticker in enumerate(tickers)
+                }
+                for future in as_completed(futures):
+                    results[futures[future]] = future.result()
+        
+        failed = [r.symbol for r in results if r.details.get('error')]
+        if failed:
+            print(f"[漏斗扫描] {len(failed)}/{len(tickers)} 只股票分析失败: {', '.join(failed)}")
+        self.last_scan_eliminations = self.summarize_eliminations(results)
+        print(f"[漏斗扫描] 各阶段淘汰数: {self.last_scan_eliminations}")
+        
+        return results
+    
+    def select_top(self, results: List[StrategyResult], limit: int = 5) -> List[StrategyResult]:
+        """按买入信号和置信度排序（排序稳定，无买入信号时保持输入顺序）"""
         buy_signals = [r for r in results if r.action == 'buy']
         buy_signals.sort(key=lambda x: x.confidence, reverse=True)
         
-        return buy_signals[:5] if buy_signals else results[:5]
+        return buy_signals[:limit] if buy_signals else results[:limit]
+    
+    def summarize_eliminations(self, results: List[StrategyResult]) -> Dict[str, int]:
+        """统计各筛选阶段淘汰的股票数（按 FILTER_STAGES 顺序）"""
+        counts = {stage: 0 for stage in FILTER_STAGES}
+        for result in results:
+            stage = result.details.get('eliminated_at')
+            if stage in counts:
+                counts[stage] += 1
+        return counts
+    
+    def _safe_analyze(self, symbol: str, hist_data: Optional[pd.DataFrame] = None,
+                      tech_indicators: Optional[TechnicalIndicators] = None,
+                      early_exit: bool = False) -> StrategyResult:
+        """分析单只股票，异常转为 skip 结果，避免中断整个扫描"""
+        try:
+            return self.analyze_single(symbol, hist_data, tech_indicators, early_exit)
+        except Exception as e:
+            print(f"[漏斗扫描] 分析 {symbol} 失败: {e}")
+            return StrategyResult(
+                symbol=symbol,
+                action='skip',
+                confidence=0.0,
+                reason=f'分析失败: {e}',
+                details={'error': str(e)}
+            )
     
     def _check_three_cards(self, financial_data: FinancialData) -> Dict[str, Any]:
         """检查三张王牌"""
@@ -0,0 +1,121 @@
+"""
+分片扫描执行器 - 将大股票池拆分到多个进程，分片结果落盘，中断后可续扫
+"""
+import json
+import multiprocessing
+import os
+import shutil
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from ..data_providers.price_cache import price_cache
+from .funnel_strategy import FunnelStrategy, StrategyResult
+
+
+def _scan_shard(tickers: List[str], shard_path: str) -> Tuple[int, Dict[str, str]]:
+    """子进程入口：分析一个分片并写入结果文件
+
+    Returns:
+        (结果数, 日线缓存覆盖区间更新)；索引文件由父进程统一写入，避免多进程互相覆盖
+    """
+    price_cache.defer_coverage()
+    strategy = FunnelStrategy()
+    results = strategy.analyze_many(tickers)
+    _write_json(Path(shard_path), [r.to_dict() for r in results])
+    return len(results), price_cache.pop_coverage_updates()
+
+
+def _write_json(path: Path, data) -> None:
+    """先写临时文件再替换，中断时不会留下半个文件"""
+    tmp_path = path.with_suffix(path.suffix + ".tmp")
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, ensure_ascii=False)
+    os.replace(tmp_path, path)
+
+
+class ShardedScanExecutor:
+    """分片扫描执行器
+
+    - 股票池按 shard_size 拆分，每个分片由进程池中的一个进程分析（进程内仍为线程池并发）
+    - 每个分片完成后写入 {run_dir}/{scan_id}/shard_XXXX.json
+    - 再次以相同 scan_id 运行时跳过已完成的分片
+    """
+
+    def __init__(self, shard_size: Optional[int] = None, processes: Optional[int] = None,
+                 run_dir: str = "data/scans"):
+        self.shard_size = shard_size or int(os.getenv("FUNNEL_SHARD_SIZE", "50"))
+        self.processes = processes or int(os.getenv("FUNNEL_SCAN_PROCESSES", str(min(4, os.cpu_count() or 1))))
+        self.run_dir = Path(run_dir)
+
+    def run(self, tickers: List[str], scan_id: Optional[str] = None, resume: bool = True) -> List[StrategyResult]:
+        """执行（或续扫）分片扫描
+
+        Args:
+            tickers: 股票池
+            scan_id: 扫描任务标识，默认按当天日期生成，同一天重复运行即续扫
+            resume: False 时清除已有分片结果重新扫描
+
+        Returns:
+            全部股票的分析结果（与股票池顺序一致）
+        """
+        scan_id = scan_id or f"scan_{datetime.now().strftime('%Y%m%d')}"
+        scan_dir = self.run_dir / scan_id
+        shards = self._prepare(scan_dir, tickers, resume)
+
+        pending = {i: shard for i, shard in enumerate(shards) if not self._shard_path(scan_dir, i).exists()}
+        done = len(shards) - len(pending)
+        print(f"[分片扫描] {scan_id}: {len(tickers)} 只股票，{len(shards)} 个分片，已完成 {done}，待扫描 {len(pending)}")
+
+        if pending:
+            workers = max(1, min(self.processes, len(pending)))
+            # spawn：调用方（如运行盘后定时任务的服务进程）可能已有多个线程，fork 不安全
+            with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn")) as executor:
+                futures = {
+                    executor.submit(_scan_shard, shard, str(self._shard_path(scan_dir, i))): i
+                    for i, shard in pending.items()
+                }
+                for future in as_completed(futures):
+                    i = futures[future]
+                    try:
+                        count, coverage = future.result()
+                        price_cache.merge_coverage(coverage)
+                        done += 1
+                        print(f"[分片扫描] 分片 {i} 完成（{count} 只），进度 {done}/{len(shards)}")
+                    except Exception as e:
+                        # 失败的分片不落盘，下次续扫时重试
+                        print(f"[分片扫描] 分片 {i} 失败: {e}")
+
+        return self.load_results(scan_id)
+
+    def load_results(self, scan_id: str) -> List[StrategyResult]:
+        """读取已完成分片的结果（未完成的分片不包含在内）"""
+        scan_dir = self.run_dir / scan_id
+        results: List[StrategyResult] = []
+        for path in sorted(scan_dir.glob("shard_*.json")):
+            with open(path, 'r', encoding='utf-8') as f:
+                results.extend(StrategyResult.from_dict(item) for item in json.load(f))
+        return results
+
+    def _prepare(self, scan_dir: Path, tickers: List[str], resume: bool) -> List[List[str]]:
+        """准备任务目录；清单与本次股票池/分片大小不一致时重新开始"""
+        manifest_path = scan_dir / "manifest.json"
+        manifest: Dict = {"tickers": tickers, "shard_size": self.shard_size}
+
+        if scan_dir.exists():
+            existing = None
+            if resume and manifest_path.exists():
+                with open(manifest_path, 'r', encoding='utf-8') as f:
+                    existing = json.load(f)
+            if existing != manifest:
+                shutil.rmtree(scan_dir)
+
+        if not scan_dir.exists():
+            scan_dir.mkdir(parents=True, exist_ok=True)
+            _write_json(manifest_path, manifest)
+
+        return [tickers[i:i + self.shard_size] for i in range(0, len(tickers), self.shard_size)]
+
+    def _shard_path(self, scan_dir: Path, index: int) -> Path:
+        return scan_dir / f"shard_{index:04d}.json"
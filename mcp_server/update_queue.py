@@ -0,0 +1,99 @@
+"""
+Telegram 更新工作队列 - Webhook 立即应答，更新交由后台工作协程处理
+
+- 同一 chat 的更新严格按到达顺序依次处理
+- 不同 chat 之间并发处理，单个耗时的 /agent 查询不会拖慢其他用户
+"""
+import asyncio
+import os
+from collections import deque
+from typing import Any, Awaitable, Callable, Deque, Dict, List, Optional
+
+UpdateHandler = Callable[[Dict[str, Any]], Awaitable[Dict[str, Any]]]
+
+
+def _chat_key(update: Dict[str, Any]) -> str:
+    """提取更新所属的 chat；无法解析时按 update_id 单独成组"""
+    message = (
+        update.get("message")
+        or update.get("edited_message")
+        or update.get("channel_post")
+        or update.get("edited_channel_post")
+        or {}
+    )
+    chat_id = (message.get("chat") or {}).get("id")
+    if chat_id is not None:
+        return f"chat:{chat_id}"
+    return f"update:{update.get('update_id')}"
+
+
+class UpdateQueue:
+    """按 chat 分组的有序工作队列
+
+    每个 chat 维护一个待处理队列；chat 有待处理更新时进入就绪队列，
+    由某个工作协程取走并顺序处理完该 chat 的全部更新后释放。
+    """
+
+    def __init__(self, handler: UpdateHandler, workers: Optional[int] = None):
+        self.handler = handler
+        self.workers = workers or int(os.getenv("TELEGRAM_UPDATE_WORKERS", "8"))
+        self._pending: Dict[str, Deque[Dict[str, Any]]] = {}
+        self._ready: Optional[asyncio.Queue] = None
+        self._tasks: List[asyncio.Task] = []
+
+    def start(self):
+        """在当前事件循环中启动工作协程"""
+        if self._tasks:
+            return
+        self._ready = asyncio.Queue()
+        self._tasks = [asyncio.create_task(self._worker(i)) for i in range(self.workers)]
+        print(f"[更新队列] 已启动 {self.workers} 个工作协程")
+
+    async def stop(self, timeout: float = 30):
+        """等待已入队的更新处理完毕（最多 timeout 秒）后停止"""
+        if not self._tasks:
+            return
+        try:
+            await asyncio.wait_for(self._ready.join(), timeout=timeout)
+        except asyncio.TimeoutError:
+            print(f"[更新队列] 停止超时，仍有 {self.pending_count()} 条更新未处理")
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        print("[更新队列] 已停止")
+
+    def submit(self, update: Dict[str, Any]):
+        """入队一条更新（不等待处理结果）"""
+        if self._ready is None:
+            raise RuntimeError("更新队列尚未启动")
+        key = _chat_key(update)
+        queue = self._pending.get(key)
+        if queue is not None:
+            # 该 chat 已在就绪队列中或正在处理，追加到末尾即可
+            queue.append(update)
+            return
+        self._pending[key] = deque([update])
+        self._ready.put_nowait(key)
+
+    def pending_count(self) -> int:
+        return sum(len(q) for q in self._pending.values())
+
+    async def _worker(self, index: int):
+        while True:
+            key = await self._ready.get()
+            try:
+                queue = self._pending[key]
+                while queue:
+                    update = queue[0]
+                    try:
+                        result = await self.handler(update)
+                        if not result.get("success", True):
+                            print(f"[更新队列] 处理失败 ({key}): {result.get('error')}")
+                    except Exception as e:
+                        print(f"[更新队列] 处理异常 ({key}): {e}")
+                    queue.popleft()
+                # 队列已空：释放该 chat，后续更新会重新进入就绪队列
+                del self._pending[key]
+            finally:
+                self._ready.task_done()
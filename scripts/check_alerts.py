@@ -1,11 +1,17 @@
 """
-定时检查提醒脚本
-每隔一段时间检查所有用户的提醒，触发时通过 Telegram 发送通知
+提醒检查服务
+订阅行情推送流，股票价格变化时只评估该股票的提醒，触发时通过 Telegram 发送通知
+
+使用方法：
+1. 轮询行情（默认）: python scripts/check_alerts.py
+2. 回放行情文件:     python scripts/check_alerts.py --replay data/replay/prices.jsonl [--speed 10]
+3. 全量检查一次:     python scripts/check_alerts.py --once
 """
 import os
 import sys
 import time
 from pathlib import Path
+from typing import Dict, List
 from dotenv import load_dotenv
 
 # 加载环境变量
@@ -17,64 +23,88 @@ if str(ROOT_DIR) not in sys.path:
     sys.path.insert(0, str(ROOT_DIR))
 
 from mcp_server.alert_manager import alert_manager
-from mcp_server.telegram_bot import send_telegram_message
+from mcp_server.price_feed import PollingPriceFeed, ReplayPriceFeed
+from mcp_server.telegram_dispatcher import OutboundDispatcher
 
-def check_all_alerts():
-    """检查所有用户的提醒"""
-    alert_dir = Path("data/alerts")
-    
-    if not alert_dir.exists():
-        print("[Info] 提醒目录不存在")
-        return
-    
-    # 遍历所有用户的提醒文件
-    for alert_file in alert_dir.glob("*.json"):
-        user_id = alert_file.stem
-        
+# 本进程独立的待发送队列：同一用户的多条提醒合并发送，限流/失败的消息下一轮继续重试
+dispatcher = OutboundDispatcher("data/outbox/alerts.json")
+
+def notify(results: Dict[str, List[Dict]]):
+    """将触发的提醒按用户加入推送队列"""
+    for user_id, triggered in results.items():
+        print(f"[Alert] 用户 {user_id} 有 {len(triggered)} 个提醒被触发")
+
+        # 发送 Telegram 通知
+        message = f"🔔 **提醒通知**\n\n"
+
+        for alert in triggered:
+            trigger_msg = alert.get("trigger_message", "提醒已触发")
+            message += f"• {trigger_msg}\n"
+
+        message += f"\n共 {len(triggered)} 个提醒已触发"
+
+        # 如果 user_id 是 Telegram chat_id，直接发送
+        # 否则发送到默认 chat_id
         try:
-            # 检查该用户的提醒
-            triggered = alert_manager.check_alerts(user_id)
-            
-            if triggered:
-                print(f"[Alert] 用户 {user_id} 有 {len(triggered)} 个提醒被触发")
-                
-                # 发送 Telegram 通知
-                message = f"🔔 **提醒通知**\n\n"
-                
-                for alert in triggered:
-                    trigger_msg = alert.get("trigger_message", "提醒已触发")
-                    message += f"• {trigger_msg}\n"
-                
-                message += f"\n共 {len(triggered)} 个提醒已触发"
-                
-                # 如果 user_id 是 Telegram chat_id，直接发送
-                # 否则发送到默认 chat_id
-                try:
-                    chat_id = user_id if user_id.isdigit() else os.getenv("TELEGRAM_CHAT_ID")
-                    if chat_id:
-                        send_telegram_message(message, chat_id=chat_id)
-                        print(f"[Success] 已发送提醒通知到 {chat_id}")
-                except Exception as e:
-                    print(f"[Error] 发送 Telegram 通知失败: {str(e)}")
-        
+            chat_id = user_id if user_id.isdigit() else os.getenv("TELEGRAM_CHAT_ID")
+            if chat_id:
+                dispatcher.enqueue(chat_id, message)
+                print(f"[Queued] 提醒通知已加入推送队列: {chat_id}")
         except Exception as e:
-            print(f"[Error] 检查用户 {user_id} 的提醒时出错: {str(e)}")
+            print(f"[Error] 加入 Telegram 推送队列失败: {str(e)}")
+
+def check_all_alerts():
+    """全量检查所有用户的提醒（一次）"""
+    # 本轮共享的行情快照：全部用户提醒涉及的股票去重后批量获取一次
+    snapshot = alert_manager.new_snapshot()
+    notify(alert_manager.check_all_alerts(snapshot))
+    print(f"[Quotes] 本轮获取 {len(snapshot)} 只股票行情，缺失 {len(snapshot.missing)} 只")
+
+    # 按限速发送本轮（及之前未发出）的通知，最多等待 60 秒，剩余消息保留到下次运行
+    stats = dispatcher.flush(timeout=60)
+    print(f"[Telegram] 已发送 {stats['sent']} 条，待重试 {stats['retried']} 条，丢弃 {stats['dropped']} 条，"
+          f"队列剩余 {dispatcher.pending_count()} 条")
+
+def run_feed(feed):
+    """消费行情推送流：每条更新只评估对应股票的提醒"""
+    dispatcher.start()
+    try:
+        for update in feed.updates():
+            try:
+                notify(alert_manager.on_price_update(update.symbol, update.price, update.rsi))
+            except Exception as e:
+                print(f"[Error] 处理 {update.symbol} 行情时出错: {str(e)}")
+    finally:
+        feed.stop()
+        # 回放结束或退出前等待已入队的通知发完（最多 60 秒，剩余消息保留到下次运行）
+        deadline = time.monotonic() + 60
+        while dispatcher.pending_count() and time.monotonic() < deadline:
+            time.sleep(0.5)
+        dispatcher.stop()
 
 def main():
-    """主循环"""
-    print("[Start] 提醒检查服务已启动")
-    print(f"[Info] 检查间隔: 5 分钟")
-    
-    while True:
-        try:
-            print(f"\n[Check] {time.strftime('%Y-%m-%d %H:%M:%S')} 开始检查提醒...")
-            check_all_alerts()
-            print("[Done] 检查完成")
-        except Exception as e:
-            print(f"[Error] 检查过程出错: {str(e)}")
-        
-        # 等待 5 分钟
-        time.sleep(300)
+    """主入口"""
+    args = sys.argv[1:]
+
+    if "--once" in args:
+        print(f"[Check] {time.strftime('%Y-%m-%d %H:%M:%S')} 全量检查提醒...")
+        check_all_alerts()
+        return
+
+    if "--replay" in args:
+        path = args[args.index("--replay") + 1]
+        speed = float(args[args.index("--speed") + 1]) if "--speed" in args else 0.0
+        print(f"[Start] 回放行情文件: {path}（速度 {speed or '不限'}）")
+        feed = ReplayPriceFeed(path, speed=speed)
+    else:
+        feed = PollingPriceFeed(alert_manager.watched_symbols)
+        print("[Start] 提醒检查服务已启动")
+        print(f"[Info] 行情轮询间隔: {feed.interval:.0f} 秒（仅价格变化的股票会评估提醒）")
+
+    try:
+        run_feed(feed)
+    except KeyboardInterrupt:
+        print("[Stop] 提醒检查服务已停止")
 
 if __name__ == "__main__":
     main()
@@ -25,7 +25,7 @@ def main() -> None:
     loop = asyncio.new_event_loop()
     asyncio.set_event_loop(loop)
 
-    # 启动所有定时任务（新闻抓取 + 晨报 + 晚报）
+    # 启动所有定时任务（新闻抓取 + 晨报 + 晚报 + 盘后选股扫描）
     start_scheduler()
 
     try:
@@ -0,0 +1,53 @@
+#!/usr/bin/env python3
+"""
+指数成分股分片扫描（支持中断续扫）
+
+使用方法：
+1. 扫描股票池: python scripts/run_universe_scan.py sp500
+2. 重新扫描:   python scripts/run_universe_scan.py sp500 --fresh
+3. 查看股票池: python scripts/run_universe_scan.py list
+
+股票池文件放在 data/universes/{name}.csv，需包含 Symbol 或 Ticker 列。
+同一天内重复运行会跳过已完成的分片（结果位于 data/scans/{name}_YYYYMMDD/）。
+"""
+import sys
+from datetime import datetime
+from pathlib import Path
+
+from dotenv import load_dotenv
+
+# 加载环境变量
+load_dotenv()
+
+ROOT_DIR = Path(__file__).resolve().parents[1]
+if str(ROOT_DIR) not in sys.path:
+    sys.path.insert(0, str(ROOT_DIR))
+
+from mcp_server.tools.data_providers.universe_provider import list_universes, load_universe
+from mcp_server.tools.strategies.funnel_strategy import FunnelStrategy
+from mcp_server.tools.strategies.sharded_scan import ShardedScanExecutor
+
+
+def main():
+    if len(sys.argv) < 2:
+        print("使用方法：")
+        print(f"  {sys.argv[0]} <universe> [--fresh]   # 分片扫描股票池")
+        print(f"  {sys.argv[0]} list                  # 列出可用股票池")
+        return
+
+    name = sys.argv[1].lower()
+    if name == "list":
+        print("可用股票池:", ", ".join(list_universes()) or "无（请在 data/universes/ 下放置 CSV）")
+        return
+
+    tickers = load_universe(name)
+    scan_id = f"{name}_{datetime.now().strftime('%Y%m%d')}"
+    results = ShardedScanExecutor().run(tickers, scan_id=scan_id, resume="--fresh" not in sys.argv[2:])
+
+    print(f"\n扫描完成：{len(results)}/{len(tickers)} 只股票有结果")
+    for i, result in enumerate(FunnelStrategy().select_top(results, limit=10), 1):
+        print(f"{i}. {result.symbol} [{result.action}] {result.reason}")
+
+
+if __name__ == "__main__":
+    main()
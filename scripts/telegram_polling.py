@@ -3,7 +3,6 @@ import sys
 import time
 from pathlib import Path
 
-import requests
 from dotenv import load_dotenv
 
 # 先加载 .env 中的环境变量，确保本地 LLM 与 Telegram 配置生效
@@ -14,22 +13,12 @@ if str(ROOT_DIR) not in sys.path:
     sys.path.insert(0, str(ROOT_DIR))
 
 from mcp_server.telegram_bot import handle_telegram_update, _get_bot_token
+from mcp_server.telegram_client import telegram_client
 
-TELEGRAM_API_BASE = "https://api.telegram.org"
 
-
-def fetch_updates(token: str, offset: int | None) -> dict:
-    params = {"timeout": 30}
-    if offset is not None:
-        params["offset"] = offset
-    resp = requests.get(
-        f"{TELEGRAM_API_BASE}/bot{token}/getUpdates",
-        params=params,
-        timeout=35,
-    )
-    # 检查HTTP响应状态码
-    resp.raise_for_status() 
-    return resp.json()
+def fetch_updates(offset: int | None) -> dict:
+    # 长轮询与消息发送共用同一个 keep-alive 连接池
+    return telegram_client.get_updates(offset, timeout=30)
 
 
 def main():
@@ -40,15 +29,16 @@ def main():
     offset = None
     while True:
         try:
-            data = fetch_updates(token, offset)
+            data = fetch_updates(offset)
+            if not data.get("success"):
+                print(f"[Polling] 获取更新失败: {data.get('error')}")
+                time.sleep(5)
+                continue
             for update in data.get("result", []):
                 offset = update["update_id"] + 1
                 result = handle_telegram_update(update)
                 if not result.get("success", True):
                     print(f"[Polling] 处理失败: {result.get('error')}")
-        except requests.RequestException as exc:
-            print(f"[Polling] 网络错误: {exc}")
-            time.sleep(5)
         except Exception as exc:
             print(f"[Polling] 未知错误: {exc}")
             time.sleep(1)
@@ -9,6 +9,7 @@ Telegram Webhook 服务器
 3. 设置 Webhook URL
 """
 import sys
+from contextlib import asynccontextmanager
 from pathlib import Path
 
 from fastapi import FastAPI, Request, HTTPException
@@ -23,9 +24,23 @@ ROOT_DIR = Path(__file__).resolve().parents[1]
 if str(ROOT_DIR) not in sys.path:
     sys.path.insert(0, str(ROOT_DIR))
 
-from mcp_server.telegram_bot import handle_telegram_update, _get_bot_token
+from mcp_server.telegram_bot import ahandle_telegram_update, _get_bot_token
+from mcp_server.telegram_client import telegram_client
+from mcp_server.update_queue import UpdateQueue
 
-app = FastAPI(title="EquiMind Telegram Webhook")
+# 后台工作队列：同一 chat 顺序处理，不同 chat 并发处理（TELEGRAM_UPDATE_WORKERS 个工作协程）
+update_queue = UpdateQueue(ahandle_telegram_update)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    update_queue.start()
+    yield
+    await update_queue.stop()
+    await telegram_client.aclose()
+
+
+app = FastAPI(title="EquiMind Telegram Webhook", lifespan=lifespan)
 
 
 @app.get("/")
@@ -34,7 +49,8 @@ async def root():
     return {
         "status": "ok",
         "service": "EquiMind Telegram Webhook",
-        "message": "Webhook server is running"
+        "message": "Webhook server is running",
+        "pending_updates": update_queue.pending_count(),
     }
 
 
@@ -43,20 +59,15 @@ async def telegram_webhook(request: Request):
     """
     接收 Telegram 的 Webhook 推送
     
-    Telegram 会将消息 POST 到这个端点
+    Telegram 会将消息 POST 到这个端点。
+    更新入队后立即应答，由后台工作协程处理（处理结果在队列中记录日志）。
     """
     try:
         # 获取请求体
         update = await request.json()
         
-        # 处理更新
-        result = handle_telegram_update(update)
-        
-        if result.get("success"):
-            return {"ok": True}
-        else:
-            print(f"[Webhook] 处理失败: {result.get('error')}")
-            return {"ok": False, "error": result.get("error")}
+        update_queue.submit(update)
+        return {"ok": True}
             
     except Exception as e:
         print(f"[Webhook] 异常: {str(e)}")
@@ -66,20 +77,14 @@ async def telegram_webhook(request: Request):
 @app.get("/webhook/info")
 async def webhook_info():
     """查看当前 Webhook 配置信息"""
-    import requests
-    
     token = _get_bot_token()
     if not token:
         return {"error": "TELEGRAM_BOT_TOKEN 未配置"}
     
-    try:
-        resp = requests.get(
-            f"https://api.telegram.org/bot{token}/getWebhookInfo",
-            timeout=10
-        )
-        return resp.json()
-    except Exception as e:
-        return {"error": str(e)}
+    result = await telegram_client.arequest("getWebhookInfo")
+    if result.get("success"):
+        return {"ok": True, "result": result.get("result")}
+    return {"error": result.get("error")}
 
 
 if __name__ == "__main__":
@@ -242,7 +242,7 @@ def print_summary():
     print("="*60)
     print("图表: data/charts/")
     print("持仓: data/portfolios/")
-    print("提醒: data/alerts/")
+    print("提醒: data/alerts.db")
     print("新闻: data/news.json")
 
 if __name__ == "__main__":